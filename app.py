@@ -6,27 +6,58 @@ Autor: Micaías Viola
 """
 
 import os
+import json
+import math
+import time
 import logging
 import secrets
-from dotenv import load_dotenv
+import functools
 from flask import (
-    Flask, render_template, request, jsonify,
-    session, redirect, url_for, send_from_directory
+    Flask, render_template, request, jsonify, Response, g,
+    session, redirect, url_for, send_from_directory, stream_with_context
 )
 
 # ----- Imports da minha aplicação -----
 # Função principal que processa e classifica o email
-from utils.fluxo_email import processar_email_com_resposta
+from utils.fluxo_email import nivel_publico, processar_email_com_resposta
 
-# Função para extrair texto de PDFs
-from utils.email_processor import extract_text_from_pdf
+# Classificação em lote (vários emails numa chamada)
+from utils.classifier import classificar_emails, BATCH_SIZE
+
+# Contadores do cache de resultados
+from utils.cache import cache_resultados
+
+# Respostas aprovadas (reaproveitadas em emails parecidos)
+from utils.respostas import (
+    obter_indice_respostas, IndiceCheio,
+    RESPOSTA_APROVADA_MAX_EMAIL, RESPOSTA_APROVADA_MAX_RESPOSTA
+)
+
+# Resultados exibidos em /result (o cookie guarda só o id)
+from utils.resultados import obter_armazem, adicionar_ao_historico
+
+# Fila de jobs em segundo plano
+from utils.jobs import GerenciadorJobs, FilaCheia, ESTADOS_FINAIS, ERRO
+
+# Leitura dos uploads (.txt/.pdf) conferindo o conteúdo, sem carregar tudo
+from utils.uploads import ler_upload
+
+# Limite de requisições por cliente (chave de API ou IP)
+from utils.limites import verificar_limite, ip_cliente, chave_api_valida, CHAVES_API
+
+# Métricas (/metrics, Server-Timing) e configuração do logging
+from utils import metricas
+
+# Aquecimento (WARMUP) e verificação de prontidão (/readyz)
+from utils.inicializacao import iniciar_aquecimento, registrar_aquecimento, verificar_prontidao
 
 # ===== Ambiente / Logging =====
-load_dotenv()  # Carrega variáveis do arquivo .env
+# O .env é carregado uma única vez por utils/config.py (ao importar utils)
 
-# Busca API_KEY do ambiente (não usada diretamente aqui)
+# Busca API_KEY do ambiente (identifica clientes no limite e autoriza as rotas
+# administrativas, ver utils/limites.py)
 API_KEY = os.environ.get("API_KEY")
-logging.basicConfig(level=logging.INFO)  # Configura nível de log
+metricas.configurar_logging()            # Nível por LOG_LEVEL, formato por LOG_FORMAT
 logger = logging.getLogger(__name__)     # Instancia logger para o app
 
 def _gerar_secret_key() -> str:
@@ -46,6 +77,40 @@ app = Flask(__name__)  # Cria instância do Flask
 # Define chave secreta para sessões
 app.config["SECRET_KEY"] = _gerar_secret_key()
 app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024  # Limita uploads a 16MB
+# Limita quantos emails cabem numa chamada de /api/classify/batch
+app.config["BATCH_MAX_ITEMS"] = int(os.environ.get("BATCH_MAX_ITEMS", 500))
+
+def _guardar_resultado(preview: str, resultado: dict) -> str:
+    """Guarda o resultado no store do servidor e devolve o id."""
+    return obter_armazem().guardar(
+        preview,
+        resultado.get("categoria", "Improdutivo"),
+        resultado.get("resposta", "Não foi possível gerar a resposta."),
+        sub_label=resultado.get("subrotulo"),
+        reply_tier=nivel_publico(resultado.get("nivel_resposta")),
+    )
+
+
+def _processar_e_guardar(conteudo: str, preview: str, ao_parcial=None) -> dict:
+    """Fluxo completo de um job; o resultado final também vai para o store."""
+    resultado = processar_email_com_resposta(conteudo, ao_parcial=ao_parcial)
+    resultado["resultado_id"] = _guardar_resultado(preview, resultado)
+    return resultado
+
+
+# Jobs rodam o mesmo fluxo completo do /classify, fora da requisição,
+# publicando a classificação e a resposta em streaming conforme saem
+jobs = GerenciadorJobs(_processar_e_guardar, parcial=True)
+
+@registrar_aquecimento
+def _compilar_templates():
+    """Compila os templates Jinja junto com o aquecimento (antes do fork, com --preload)."""
+    for nome in app.jinja_env.list_templates(extensions=["html"]):
+        app.jinja_env.get_template(nome)
+
+
+# Clientes e modelos nascem no primeiro uso, a não ser que WARMUP peça antes
+iniciar_aquecimento()
 
 # ===== Helpers =====
 def _obter_conteudo_email_da_requisicao(req) -> str:
@@ -70,18 +135,127 @@ def _obter_conteudo_email_da_requisicao(req) -> str:
 
         logger.info(f"Processando arquivo: {nome}")
 
-        if nome.endswith(".txt"):
-            # Lê arquivo txt como UTF-8
-            return arquivo.read().decode("utf-8", errors="ignore").strip()
-        if nome.endswith(".pdf"):
-            # Extrai texto de PDF
-            return extract_text_from_pdf(arquivo).strip()
-
-        raise ValueError("Formato não suportado. Envie .txt ou .pdf.")
+        # Confere o tipo pelos primeiros bytes; .txt lido só até o limite,
+        # .pdf extraído sob demanda (ver utils/uploads.py)
+        return ler_upload(arquivo).strip()
 
     # Se não há texto nem arquivo
     raise ValueError("Nenhum conteúdo fornecido.")
 
+def _preview(conteudo: str, limite: int = 1000) -> str:
+    """Trecho do conteúdo original exibido na página de resultado."""
+    return conteudo if len(conteudo) <= limite else f"{conteudo[:limite]}..."
+
+
+def _lembrar_resultado(resultado_id: str):
+    """Cookie de sessão: id do último resultado e ids do histórico (sem o conteúdo)."""
+    session["result_id"] = resultado_id
+    session["history"] = adicionar_ao_historico(session.get("history"), resultado_id)
+
+
+def _resultado_para_json(registro: dict) -> dict:
+    """Formato público de um resultado nas rotas /api/results."""
+    return {
+        "id": registro["id"],
+        "classification": registro["classification"],
+        "sub_label": registro.get("sub_label"),
+        "response": registro["response"],
+        "reply_tier": registro.get("reply_tier"),
+        "original_content_preview": registro["original_content"],
+        "created_at": registro["criado_em"],
+        "result_url": url_for("result", id=registro["id"]),
+    }
+
+
+def _job_para_json(job: dict) -> dict:
+    """Formato público de um job nas rotas /api/jobs."""
+    dados = {"id": job["id"], "status": job["estado"]}
+    if job["resultado"] is not None:
+        dados["classification"] = job["resultado"].get("categoria", "Improdutivo")
+        dados["response"] = job["resultado"].get(
+            "resposta", "Não foi possível gerar a resposta.")
+        resultado_id = job["resultado"].get("resultado_id")
+        dados["result_id"] = resultado_id
+        dados["result_url"] = (url_for("result", id=resultado_id) if resultado_id
+                               else url_for("result", job=job["id"]))
+    elif job.get("parcial", {}).get("categoria"):
+        dados["classification"] = job["parcial"]["categoria"]
+    if job["erro"]:
+        dados["error"] = job["erro"]
+    return dados
+
+# ===== Limite por cliente =====
+def limitar_por_cliente(custo=None):
+    """
+    Decorator das rotas que chamam os modelos: token bucket por chave de API
+    (header X-API-Key) ou IP. Sem fichas → 429 com Retry-After.
+    `custo(request)` diz quantas fichas a requisição gasta (padrão 1).
+    """
+    def decorador(rota):
+        @functools.wraps(rota)
+        def envolvida(*args, **kwargs):
+            espera = verificar_limite(
+                request.headers.get("X-API-Key"),
+                ip_cliente(request.remote_addr, request.headers.get("X-Forwarded-For")),
+                request.endpoint or "none",
+                custo(request) if custo is not None else 1.0,
+            )
+            if espera:
+                resposta = jsonify({"error": "Muitas requisições. Tente novamente em instantes."})
+                resposta.headers["Retry-After"] = str(math.ceil(espera))
+                return resposta, 429
+            return rota(*args, **kwargs)
+        return envolvida
+    return decorador
+
+
+def exigir_chave_api(rota):
+    """
+    Decorator das rotas que alteram o comportamento para todos os usuários:
+    exige no header X-API-Key uma das chaves de API_KEY. Sem API_KEY
+    configurada a rota fica desativada (403).
+    """
+    @functools.wraps(rota)
+    def envolvida(*args, **kwargs):
+        if not CHAVES_API:
+            return jsonify({"error": "Rota desativada: defina API_KEY no servidor."}), 403
+        if not chave_api_valida(request.headers.get("X-API-Key")):
+            return jsonify({"error": "Chave de API ausente ou inválida (header X-API-Key)."}), 401
+        return rota(*args, **kwargs)
+    return envolvida
+
+
+def _custo_lote(req) -> float:
+    """Um lote custa uma ficha por chamada ao modelo (BATCH_SIZE emails cada)."""
+    emails = (req.get_json(silent=True) or {}).get("emails")
+    if not isinstance(emails, list) or not emails:
+        return 1.0
+    return float(math.ceil(len(emails) / BATCH_SIZE))
+
+# ===== Instrumentação =====
+@app.before_request
+def _iniciar_medicao():
+    """Zera os tempos por etapa desta requisição (ver utils/metricas.py)."""
+    g.inicio_requisicao = time.perf_counter()
+    metricas.iniciar_coleta()
+
+
+@app.after_request
+def _registrar_medicao(response):
+    """Histograma por rota + header Server-Timing com os tempos por etapa."""
+    inicio = g.get("inicio_requisicao")
+    if inicio is None:
+        return response
+    total = time.perf_counter() - inicio
+    metricas.requisicoes_http.observar(
+        total, endpoint=request.endpoint or "none", method=request.method,
+        status=response.status_code)
+    etapas = metricas.server_timing()
+    response.headers["Server-Timing"] = (
+        f"{etapas}, total;dur={total * 1000:.1f}" if etapas else f"total;dur={total * 1000:.1f}")
+    return response
+
+
 # ===== Rotas =====
 @app.route("/")
 def index():
@@ -89,12 +263,14 @@ def index():
     return render_template("index.html")  # Renderiza página principal
 
 @app.route("/classify", methods=["POST"])
+@limitar_por_cliente()
 def classify():
     """
     Recebe o email (texto ou arquivo), roda o fluxo completo:
     - classifica (Produtivo/Improdutivo)
     - gera resposta sugerida
-    Armazena na sessão e devolve JSON com URL para a página de resultado.
+    Guarda o resultado no servidor (o cookie de sessão leva só o id) e
+    devolve JSON com a URL da página de resultado.
     """
     try:
         conteudo = _obter_conteudo_email_da_requisicao(
@@ -107,20 +283,14 @@ def classify():
         resposta = resultado.get(
             "resposta", "Não foi possível gerar a resposta.")  # Pega resposta
 
-        # Guarda um preview do conteúdo original (até 1000 caracteres)
-        preview = conteudo if len(
-            conteudo) <= 1000 else f"{conteudo[:1000]}..."
-
-        # Salva resultado na sessão do usuário
-        session["result"] = {
-            "original_content": preview,
-            "classification": categoria,
-            "response": resposta,
-        }
+        # Guarda o resultado com um preview do conteúdo original (até 1000 caracteres)
+        resultado_id = _guardar_resultado(_preview(conteudo), resultado)
+        _lembrar_resultado(resultado_id)
 
         logger.info(f"Email classificado como: {categoria}")
         # Retorna URL para página de resultado
-        return jsonify({"success": True, "redirect": url_for("result")})
+        return jsonify({"success": True, "result_id": resultado_id,
+                        "redirect": url_for("result", id=resultado_id)})
 
     except ValueError as e:
         # Erros esperados do usuário (ex: arquivo inválido)
@@ -133,8 +303,40 @@ def classify():
 
 @app.route("/result")
 def result():
-    """Exibe os resultados da última classificação/geração."""
-    data = session.get("result")
+    """
+    Exibe um resultado: ?id=<resultado>, ?job=<job> (acompanha o job em
+    andamento) ou, sem parâmetros, o último resultado desta sessão.
+    """
+    job_id = request.args.get("job")
+    stream_url = status_url = None
+    data = None
+    if job_id:
+        job = jobs.obter(job_id)
+        if not job or job["estado"] == ERRO:
+            return redirect(url_for("index"))
+        if job["resultado"] is None:
+            # Ainda processando: a página acompanha o job e mostra a resposta em streaming
+            stream_url = url_for("api_jobs_stream", job_id=job_id)
+            status_url = url_for("api_jobs_status", job_id=job_id)
+            data = {
+                "original_content": job["preview"],
+                "classification": job.get("parcial", {}).get("categoria", ""),
+                "response": "",
+            }
+        else:
+            data = {
+                "original_content": job["preview"],
+                "classification": job["resultado"].get("categoria", "Improdutivo"),
+                "response": job["resultado"].get("resposta", "Não foi possível gerar a resposta."),
+            }
+            if job["resultado"].get("resultado_id"):
+                _lembrar_resultado(job["resultado"]["resultado_id"])
+    else:
+        resultado_id = request.args.get("id") or session.get("result_id")
+        if resultado_id:
+            data = obter_armazem().obter(resultado_id)
+            if data and request.args.get("id"):
+                _lembrar_resultado(resultado_id)
     if not data:
         # Se não há resultado, volta para início
         return redirect(url_for("index"))
@@ -144,14 +346,19 @@ def result():
         original_content=data["original_content"],
         classification=data["classification"],
         response=data["response"],
+        stream_url=stream_url,
+        status_url=status_url,
     )
 
 @app.route("/api/classify", methods=["POST"])
+@limitar_por_cliente()
 def api_classify():
     """
     Endpoint JSON (programático).
     Espera: { "email_content": "..." }
-    Retorna: { success, classification, response, original_content_preview }
+    Retorna: { success, classification, sub_label, response, reply_tier,
+               original_content_preview }
+    reply_tier: template | approved | cache | llm | fallback
     """
     try:
         payload = request.get_json(silent=True) or {}
@@ -167,7 +374,9 @@ def api_classify():
             {
                 "success": True,
                 "classification": resultado.get("categoria", "Improdutivo"),
+                "sub_label": resultado.get("subrotulo"),
                 "response": resultado.get("resposta", "Não foi possível gerar a resposta."),
+                "reply_tier": nivel_publico(resultado.get("nivel_resposta")),
                 "original_content_preview": preview,
             }
         )
@@ -176,6 +385,234 @@ def api_classify():
         logger.exception("Erro na API /api/classify:")
         return jsonify({"error": f"Erro interno do servidor: {str(e)}"}), 500
 
+@app.route("/api/classify/batch", methods=["POST"])
+@limitar_por_cliente(custo=_custo_lote)
+def api_classify_batch():
+    """
+    Classificação em lote (sem gerar resposta).
+    Espera: { "emails": ["...", "..."] }
+    Retorna: { success, results: [{ classification, origin, sub_label, score, time_ms }],
+               total_time_ms }
+    na mesma ordem da entrada.
+    """
+    try:
+        payload = request.get_json(silent=True) or {}
+        emails = payload.get("emails")
+        if not isinstance(emails, list) or not emails:
+            return jsonify({"error": "Lista 'emails' não fornecida."}), 400
+        if len(emails) > app.config["BATCH_MAX_ITEMS"]:
+            return jsonify(
+                {"error": f"Máximo de {app.config['BATCH_MAX_ITEMS']} emails por lote."}
+            ), 400
+        if not all(isinstance(e, str) for e in emails):
+            return jsonify({"error": "Todos os itens de 'emails' devem ser texto."}), 400
+
+        inicio = time.perf_counter()
+        resultados = classificar_emails(emails)
+        total_ms = round((time.perf_counter() - inicio) * 1000, 3)
+
+        logger.info(f"Lote de {len(emails)} emails classificado em {total_ms} ms")
+        return jsonify(
+            {
+                "success": True,
+                "results": [
+                    {
+                        "classification": r["categoria"],
+                        "origin": r["origem"],
+                        "sub_label": r["subrotulo"],
+                        "score": r["score"],
+                        "time_ms": r["tempo_ms"],
+                    }
+                    for r in resultados
+                ],
+                "total_time_ms": total_ms,
+            }
+        )
+
+    except Exception as e:
+        logger.exception("Erro na API /api/classify/batch:")
+        return jsonify({"error": f"Erro interno do servidor: {str(e)}"}), 500
+
+@app.route("/api/replies/approve", methods=["POST"])
+@exigir_chave_api
+@limitar_por_cliente()
+def api_replies_approve():
+    """
+    Aprova uma resposta: emails parecidos passam a recebê-la sem chamar a IA.
+    Exige X-API-Key (ver exigir_chave_api).
+    Espera: { "email_content": "...", "response": "...",
+              "classification": "Produtivo"|"Improdutivo", "sub_label": opcional }
+    Índice cheio (RESPOSTAS_APROVADAS_MAX) → 409.
+    """
+    try:
+        payload = request.get_json(silent=True) or {}
+        conteudo = (payload.get("email_content") or "").strip()
+        resposta = (payload.get("response") or "").strip()
+        categoria = payload.get("classification")
+        if not conteudo or not resposta:
+            return jsonify({"error": "Informe 'email_content' e 'response'."}), 400
+        if categoria not in ("Produtivo", "Improdutivo"):
+            return jsonify({"error": "'classification' deve ser Produtivo ou Improdutivo."}), 400
+        if len(conteudo) > RESPOSTA_APROVADA_MAX_EMAIL:
+            return jsonify(
+                {"error": f"'email_content' com no máximo {RESPOSTA_APROVADA_MAX_EMAIL} caracteres."}
+            ), 400
+        if len(resposta) > RESPOSTA_APROVADA_MAX_RESPOSTA:
+            return jsonify(
+                {"error": f"'response' com no máximo {RESPOSTA_APROVADA_MAX_RESPOSTA} caracteres."}
+            ), 400
+        sub_label = payload.get("sub_label")
+        if sub_label is not None and (not isinstance(sub_label, str) or len(sub_label) > 32):
+            return jsonify({"error": "'sub_label' inválido."}), 400
+
+        indice = obter_indice_respostas()
+        indice.aprovar(conteudo, resposta, categoria, sub_label)
+        return jsonify({"success": True, "approved_total": len(indice)}), 201
+
+    except IndiceCheio as e:
+        logger.warning(f"Aprovação recusada: {e}")
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        logger.exception("Erro na API /api/replies/approve:")
+        return jsonify({"error": f"Erro interno do servidor: {str(e)}"}), 500
+
+@app.route("/api/results/<result_id>")
+def api_results_obter(result_id):
+    """Um resultado guardado (classificação, resposta e preview do email)."""
+    registro = obter_armazem().obter(result_id)
+    if registro is None:
+        return jsonify({"error": "Resultado não encontrado ou expirado."}), 404
+    return jsonify({"success": True, **_resultado_para_json(registro)})
+
+@app.route("/api/results")
+def api_results_historico():
+    """Histórico desta sessão (mais recente primeiro); expirados ficam de fora."""
+    armazem = obter_armazem()
+    registros = (armazem.obter(i) for i in session.get("history", []))
+    return jsonify({"success": True,
+                    "results": [_resultado_para_json(r) for r in registros if r is not None]})
+
+@app.route("/api/cache/stats")
+def api_cache_stats():
+    """Hits/misses do cache de classificação e respostas deste worker."""
+    return jsonify(cache_resultados.estatisticas())
+
+@app.route("/healthz")
+def healthz():
+    """Liveness: o processo está de pé (não consulta nada externo)."""
+    return jsonify({"status": "ok"})
+
+@app.route("/readyz")
+def readyz():
+    """Readiness: configuração válida e aquecimento (WARMUP) concluído."""
+    pronto, verificacoes = verificar_prontidao()
+    return jsonify({"status": "ok" if pronto else "unavailable", "checks": verificacoes}), \
+        (200 if pronto else 503)
+
+@app.route("/metrics")
+def metrics():
+    """Métricas deste worker no formato texto do Prometheus."""
+    return Response(metricas.registro.exportar(),
+                    mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+@app.route("/api/jobs", methods=["POST"])
+@limitar_por_cliente()
+def api_jobs_criar():
+    """
+    Cria um job de classificação e responde na hora (202).
+    Aceita o mesmo formulário do /classify (email_text ou email_file)
+    ou JSON { "email_content": "..." }.
+    Fila cheia ou limite do cliente → 429 com Retry-After.
+    """
+    try:
+        if request.is_json:
+            conteudo = ((request.get_json(silent=True) or {}).get("email_content") or "").strip()
+            if not conteudo:
+                raise ValueError("Conteúdo do email não fornecido.")
+        else:
+            conteudo = _obter_conteudo_email_da_requisicao(request)
+
+        preview = _preview(conteudo)
+        job_id = jobs.submeter(conteudo, preview, extras={"preview": preview})
+        logger.info(f"Job {job_id} criado")
+        return jsonify(
+            {
+                "success": True,
+                "id": job_id,
+                "status_url": url_for("api_jobs_status", job_id=job_id),
+                "stream_url": url_for("api_jobs_stream", job_id=job_id),
+                "result_url": url_for("result", job=job_id),
+            }
+        ), 202
+
+    except FilaCheia as e:
+        logger.warning("Fila de jobs cheia → 429")
+        resposta = jsonify({"error": str(e)})
+        resposta.headers["Retry-After"] = "5"
+        return resposta, 429
+    except ValueError as e:
+        logger.warning(f"Requisição inválida: {e}")
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.exception("Erro ao criar job:")
+        return jsonify({"error": f"Erro interno do servidor: {str(e)}"}), 500
+
+
+@app.route("/api/jobs/<job_id>")
+def api_jobs_status(job_id):
+    """Estado atual do job: pending | running | done | error."""
+    job = jobs.obter(job_id)
+    if job is None:
+        return jsonify({"error": "Job não encontrado ou expirado."}), 404
+    return jsonify(_job_para_json(job))
+
+
+@app.route("/api/jobs/<job_id>/stream")
+def api_jobs_stream(job_id):
+    """
+    Server-Sent Events:
+      - 'status' a cada mudança de estado (ou quando a classificação sai)
+      - 'token' com cada trecho novo da resposta em streaming ({"text": ...})
+    Encerra quando o job termina; o 'status' final traz a resposta definitiva.
+    Comentários de keep-alive evitam timeout de proxies enquanto o modelo processa.
+    """
+    job = jobs.obter(job_id)
+    if job is None:
+        return jsonify({"error": "Job não encontrado ou expirado."}), 404
+
+    def eventos(job):
+        ultimo_status = None
+        enviado = 0  # caracteres da resposta parcial já enviados
+        while True:
+            status = json.dumps(_job_para_json(job), ensure_ascii=False)
+            if status != ultimo_status:
+                yield f"event: status\ndata: {status}\n\n"
+                ultimo_status = status
+            if job["estado"] in ESTADOS_FINAIS:
+                return
+            parcial = job.get("parcial", {}).get("resposta", "")
+            if len(parcial) > enviado:
+                dados = json.dumps({"text": parcial[enviado:]}, ensure_ascii=False)
+                yield f"event: token\ndata: {dados}\n\n"
+                enviado = len(parcial)
+
+            ultimo_envio = job["atualizado_em"]
+            while True:
+                atual = jobs.aguardar_mudanca(job_id, ultimo_envio, timeout=15)
+                if atual is None:
+                    yield 'event: status\ndata: {"status": "error", "error": "Job expirado."}\n\n'
+                    return
+                if atual["atualizado_em"] > ultimo_envio:
+                    job = atual
+                    break
+                yield ": keep-alive\n\n"
+
+    return Response(
+        stream_with_context(eventos(job)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # ===== Tratadores de erro =====
 @app.errorhandler(413)
 def too_large(e):
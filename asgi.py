@@ -0,0 +1,154 @@
+"""
+Entrada ASGI (Starlette) com o fluxo assíncrono de classificação.
+Um único worker atende várias requisições enquanto espera a Hugging Face.
+Uso: uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 2
+Autor: Micaías Viola
+"""
+
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.datastructures import MutableHeaders
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Match, Route
+
+from utils import metricas
+from utils.fluxo_async import criar_cliente_async, processar_email_com_resposta_async
+from utils.fluxo_email import nivel_publico
+from utils.inicializacao import iniciar_aquecimento, verificar_prontidao
+from utils.limites import verificar_limite, ip_cliente
+
+metricas.configurar_logging()
+logger = logging.getLogger(__name__)
+
+
+def rota_da_requisicao(scope) -> str:
+    """
+    Modelo da rota que atende a requisição (ex.: "/api/classify"), ou "other".
+    Rótulo das métricas: o caminho cru criaria uma série nova por URL.
+    """
+    for rota in getattr(scope.get("app"), "routes", ()):
+        correspondencia, _ = rota.matches(scope)
+        if correspondencia != Match.NONE:
+            return rota.path
+    return "other"
+
+
+class MiddlewareMedicao:
+    """Histograma por rota + header Server-Timing (mesmo comportamento do app Flask)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        inicio = time.perf_counter()
+        tempos = metricas.iniciar_coleta()
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                total = time.perf_counter() - inicio
+                metricas.requisicoes_http.observar(
+                    total, endpoint=rota_da_requisicao(scope), method=scope["method"],
+                    status=mensagem["status"])
+                etapas = metricas.server_timing(tempos)
+                MutableHeaders(scope=mensagem).append(
+                    "Server-Timing",
+                    f"{etapas}, total;dur={total * 1000:.1f}" if etapas else f"total;dur={total * 1000:.1f}")
+            await send(mensagem)
+
+        await self.app(scope, receive, enviar)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Um cliente HTTP (pool keep-alive) compartilhado por todas as requisições do worker
+    async with criar_cliente_async() as cliente:
+        app.state.cliente = cliente
+        yield
+
+
+async def api_classify(request: Request):
+    """
+    Mesmo contrato de POST /api/classify do app Flask.
+    Espera: { "email_content": "..." }
+    Retorna: { success, classification, sub_label, response, reply_tier,
+               original_content_preview }
+    Limite por cliente → 429 com Retry-After.
+    """
+    espera = verificar_limite(
+        request.headers.get("X-API-Key"),
+        ip_cliente(request.client.host if request.client else "",
+                   request.headers.get("X-Forwarded-For")),
+        "api_classify",
+    )
+    if espera:
+        return JSONResponse({"error": "Muitas requisições. Tente novamente em instantes."},
+                            status_code=429, headers={"Retry-After": str(math.ceil(espera))})
+    try:
+        try:
+            payload = await request.json()
+        except ValueError:
+            payload = {}
+        conteudo = ((payload or {}).get("email_content") or "").strip()
+        if not conteudo:
+            return JSONResponse({"error": "Conteúdo do email não fornecido."}, status_code=400)
+
+        resultado = await processar_email_com_resposta_async(request.app.state.cliente, conteudo)
+
+        preview = conteudo if len(conteudo) <= 200 else f"{conteudo[:200]}..."
+
+        return JSONResponse(
+            {
+                "success": True,
+                "classification": resultado.get("categoria", "Improdutivo"),
+                "sub_label": resultado.get("subrotulo"),
+                "response": resultado.get("resposta", "Não foi possível gerar a resposta."),
+                "reply_tier": nivel_publico(resultado.get("nivel_resposta")),
+                "original_content_preview": preview,
+            }
+        )
+
+    except Exception as e:
+        logger.exception("Erro na API assíncrona /api/classify:")
+        return JSONResponse({"error": f"Erro interno do servidor: {str(e)}"}, status_code=500)
+
+
+async def healthz(request: Request):
+    """Liveness: o processo está de pé (não consulta nada externo)."""
+    return JSONResponse({"status": "ok"})
+
+
+async def readyz(request: Request):
+    """Readiness: configuração válida e aquecimento (WARMUP) concluído."""
+    pronto, verificacoes = verificar_prontidao()
+    return JSONResponse({"status": "ok" if pronto else "unavailable", "checks": verificacoes},
+                        status_code=200 if pronto else 503)
+
+
+async def metrics(request: Request):
+    """Métricas deste worker no formato texto do Prometheus."""
+    return PlainTextResponse(metricas.registro.exportar(),
+                             media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+app = Starlette(
+    routes=[
+        Route("/api/classify", api_classify, methods=["POST"]),
+        Route("/metrics", metrics),
+        Route("/healthz", healthz),
+        Route("/readyz", readyz),
+    ],
+    middleware=[Middleware(MiddlewareMedicao)],
+    lifespan=lifespan,
+)
+
+# Clientes e modelos nascem no primeiro uso, a não ser que WARMUP peça antes
+iniciar_aquecimento()
@@ -0,0 +1 @@
+"""Benchmarks e ferramentas de medição (rodar com `python -m benchmarks.<script>`)."""
@@ -0,0 +1,82 @@
+"""
+Mede o custo de inicialização: tempo de `import app` (e opcionalmente de
+outros módulos) num interpretador novo a cada repetição, e os módulos que
+mais pesam segundo `python -X importtime`.
+
+Uso:
+    python -m benchmarks.bench_import --repeticoes 10
+    python -m benchmarks.bench_import --modulo asgi --json import.json
+Autor: Micaías Viola
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+from benchmarks.comum import resumir, salvar_json
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CODIGO = ("import time; t = time.perf_counter(); import {modulo}; "
+          "print((time.perf_counter() - t) * 1000)")
+
+
+def _ambiente() -> dict:
+    # Sem tokens: a importação não deve depender deles (nem fazer chamadas de rede)
+    ambiente = dict(os.environ)
+    for variavel in ("HF_API_TOKEN", "HF_TOKEN"):
+        ambiente.pop(variavel, None)
+    return ambiente
+
+
+def medir_importacao(modulo: str, repeticoes: int) -> dict:
+    tempos = []
+    for _ in range(repeticoes):
+        saida = subprocess.run(
+            [sys.executable, "-c", CODIGO.format(modulo=modulo)],
+            cwd=RAIZ, env=_ambiente(), capture_output=True, text=True, check=True)
+        tempos.append(float(saida.stdout.strip().splitlines()[-1]))
+    return resumir(tempos)
+
+
+def modulos_mais_pesados(modulo: str, quantidade: int) -> list:
+    """[(modulo, ms_cumulativo)] dos imports mais caros (saída do -X importtime)."""
+    saida = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {modulo}"],
+        cwd=RAIZ, env=_ambiente(), capture_output=True, text=True, check=True)
+    pesos = []
+    for linha in saida.stderr.splitlines():
+        if not linha.startswith("import time:") or "|" not in linha:
+            continue
+        try:
+            _, cumulativo, nome = linha.split("|")
+            pesos.append((nome.strip(), int(cumulativo) / 1000))
+        except ValueError:
+            continue  # cabeçalho
+    return sorted(pesos, key=lambda p: p[1], reverse=True)[:quantidade]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tempo de importação da aplicação")
+    parser.add_argument("--modulo", default="app")
+    parser.add_argument("--repeticoes", type=int, default=10)
+    parser.add_argument("--top", type=int, default=15, help="módulos mais pesados a listar")
+    parser.add_argument("--json", help="salva os resultados neste arquivo")
+    args = parser.parse_args()
+
+    resultado = medir_importacao(args.modulo, args.repeticoes)
+    resultado["alvo"] = args.modulo
+    print(f"import {args.modulo}: p50={resultado['p50_ms']:.1f} ms  "
+          f"media={resultado['media_ms']:.1f} ms  max={resultado['max_ms']:.1f} ms")
+
+    print("\nMódulos mais pesados (ms, cumulativo):")
+    pesados = modulos_mais_pesados(args.modulo, args.top)
+    for nome, ms in pesados:
+        print(f"  {ms:>8.1f}  {nome}")
+
+    if args.json:
+        resultado["mais_pesados"] = pesados
+        salvar_json(args.json, "import", [resultado], vars(args))
+
+
+if __name__ == "__main__":
+    main()
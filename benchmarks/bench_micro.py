@@ -0,0 +1,98 @@
+"""
+Micro-benchmarks do código da aplicação (sem rede):
+  - heurísticas de palavras-chave (_pre_filtro e motor de palavras-chave)
+  - pós-processamento da resposta (limpar_raciocinio_interno / extrair_resposta_final)
+  - pré-processamento (limpeza + trechos) de emails comuns e gigantes
+  - extração de texto dos PDFs de exemplo
+
+Uso:
+    python -m benchmarks.bench_micro --json micro.json
+Autor: Micaías Viola
+"""
+import argparse
+import glob
+import os
+
+from benchmarks.comum import medir, salvar_json
+from benchmarks.corpus import gerar_corpus, PASTA_PDFS
+from utils.classifier import _pre_filtro
+from utils.email_processor import extract_text_from_pdf
+from utils.hf_response import extrair_resposta_final, limpar_raciocinio_interno
+from utils.palavras_chave import motor_palavras_chave
+from utils.preprocessamento import limpar, dividir_em_trechos
+
+RACIOCINIO = (
+    "Okay, let me think about what the user wants. They want a reply in Portuguese.\n"
+    "I should keep it short. Maybe mention the meeting. So I will write it now.\n"
+)
+RESPOSTA = (
+    "Prezado João,\n\nAgradecemos o envio do relatório. Vamos analisar os documentos "
+    "e retornaremos até sexta-feira.\n\nAtenciosamente,\nEquipe"
+)
+
+
+def saidas_llm() -> dict:
+    """Saídas típicas e patológicas do modelo de chat."""
+    return {
+        "curta": RACIOCINIO + "\n" + RESPOSTA,
+        "longa_raciocinio": RACIOCINIO * 200 + "\n" + RESPOSTA,
+        "sem_saudacao": (RACIOCINIO * 50) + "\n\nObrigado pelo contato, retornaremos em breve.",
+        "linha_gigante": "let me " + ("x" * 200_000) + "\n" + RESPOSTA,
+    }
+
+
+def executar(repeticoes: int) -> list:
+    resultados = []
+
+    def registrar(grupo: str, caso: str, funcao, *args, rep=repeticoes):
+        r = medir(funcao, rep, *args)
+        r.update({"grupo": grupo, "caso": caso})
+        resultados.append(r)
+        print(f"{grupo:<14} {caso:<22} p50={r['p50_ms']:>9.4f} ms  p99={r['p99_ms']:>9.4f} ms")
+
+    # 1) Heurísticas
+    corpus = gerar_corpus(50, semente=7)
+    curto = corpus[0]["email_content"]
+    longo = max((c["email_content"] for c in corpus), key=len)
+    registrar("palavras_chave", "buscar_curto", motor_palavras_chave.buscar, curto)
+    registrar("palavras_chave", "buscar_longo", motor_palavras_chave.buscar, longo)
+    registrar("palavras_chave", "pre_filtro_curto", _pre_filtro, curto)
+    registrar("palavras_chave", "pre_filtro_longo", _pre_filtro, longo)
+
+    # 2) Pós-processamento da resposta
+    for caso, texto in saidas_llm().items():
+        registrar("pos_processo", f"limpar_{caso}", limpar_raciocinio_interno, texto)
+        registrar("pos_processo", f"extrair_{caso}", extrair_resposta_final, texto)
+
+    # 3) Pré-processamento: o custo deve ficar limitado mesmo com entradas enormes
+    citado = longo + "\n\nAtenciosamente,\nJoão\n\nEm seg., Maria escreveu:\n" + "> texto\n" * 500
+    gigante = longo * 2000
+    registrar("preproc", "limpar_longo", limpar, longo)
+    registrar("preproc", "limpar_citado", limpar, citado)
+    registrar("preproc", "limpar_gigante", limpar, gigante, rep=max(1, repeticoes // 10))
+    registrar("preproc", "trechos_gigante", dividir_em_trechos, limpar(gigante),
+              "joeddav/xlm-roberta-large-xnli")
+
+    # 4) Extração de PDF
+    for caminho in sorted(glob.glob(os.path.join(PASTA_PDFS, "*", "*.pdf"))):
+        with open(caminho, "rb") as f:
+            dados = f.read()
+        registrar("pdf", os.path.basename(caminho)[:22], extract_text_from_pdf, dados,
+                  rep=max(1, repeticoes // 10))
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks (sem rede)")
+    parser.add_argument("--repeticoes", type=int, default=200)
+    parser.add_argument("--json", help="salva os resultados neste arquivo")
+    args = parser.parse_args()
+
+    resultados = executar(args.repeticoes)
+    if args.json:
+        salvar_json(args.json, "micro", resultados, {"repeticoes": args.repeticoes})
+
+
+if __name__ == "__main__":
+    main()
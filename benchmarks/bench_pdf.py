@@ -0,0 +1,74 @@
+"""
+Benchmark dos motores de extração de texto de PDF.
+Usa os PDFs de exemplo em "Emails em PDF para teste/" (ou uma pasta informada).
+
+Uso:
+    python -m benchmarks.bench_pdf
+    python -m benchmarks.bench_pdf --repeticoes 50 --max-chars 2000 --json resultado.json
+Autor: Micaías Viola
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import time
+
+from utils.email_processor import MOTORES_PDF, extract_text_from_pdf
+
+PASTA_PADRAO = os.path.join(os.path.dirname(os.path.dirname(__file__)), "Emails em PDF para teste")
+
+
+def medir_motor(motor: str, arquivos: list, repeticoes: int, max_chars: int) -> dict:
+    """Extrai todos os arquivos `repeticoes` vezes e resume os tempos (ms por arquivo)."""
+    tempos = []
+    caracteres = 0
+    for _ in range(repeticoes):
+        for caminho in arquivos:
+            # Lê os bytes antes para medir só a extração, não o disco
+            with open(caminho, "rb") as f:
+                dados = f.read()
+            inicio = time.perf_counter()
+            texto = extract_text_from_pdf(dados, max_chars=max_chars, motor=motor)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+            caracteres += len(texto)
+    tempos.sort()
+    return {
+        "motor": motor,
+        "arquivos": len(arquivos),
+        "repeticoes": repeticoes,
+        "media_ms": round(statistics.mean(tempos), 3),
+        "p50_ms": round(tempos[len(tempos) // 2], 3),
+        "p95_ms": round(tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))], 3),
+        "caracteres_por_arquivo": caracteres // len(tempos),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pasta", default=PASTA_PADRAO, help="pasta com os PDFs (busca recursiva)")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--max-chars", type=int, default=0, help="orçamento de caracteres (0 = sem limite)")
+    parser.add_argument("--motores", default=",".join(MOTORES_PDF), help="lista separada por vírgula")
+    parser.add_argument("--json", help="salva os resultados neste arquivo")
+    args = parser.parse_args()
+
+    arquivos = sorted(glob.glob(os.path.join(args.pasta, "**", "*.pdf"), recursive=True))
+    if not arquivos:
+        raise SystemExit(f"Nenhum PDF encontrado em {args.pasta}")
+
+    resultados = []
+    print(f"{'motor':<12} {'média ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'chars':>8}")
+    for motor in args.motores.split(","):
+        r = medir_motor(motor.strip(), arquivos, args.repeticoes, args.max_chars)
+        resultados.append(r)
+        print(f"{r['motor']:<12} {r['media_ms']:>10} {r['p50_ms']:>10} {r['p95_ms']:>10} "
+              f"{r['caracteres_por_arquivo']:>8}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "pdf", "resultados": resultados}, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
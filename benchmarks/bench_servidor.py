@@ -0,0 +1,164 @@
+"""
+Vazão de cada perfil do gunicorn (gunicorn.conf.py) contra o mock local da
+Hugging Face. Para cada perfil sobe `gunicorn -c gunicorn.conf.py app:app`
+numa porta livre, aquece, dispara as requisições com N clientes simultâneos
+e relata req/s, req/s por núcleo, latências, erros e a memória (PSS, Linux)
+somada do master e dos workers.
+Cada email é único por padrão (sem o cache de resultados, toda requisição
+chega ao mock), então o que se mede é o tempo esperando a "Hugging Face".
+
+Uso:
+    python -m benchmarks.bench_servidor --perfis sync,gthread,gevent --json servidor.json
+    python -m benchmarks.bench_servidor --perfis gthread --workers 2 --threads 16 --latencia-ms 300
+Autor: Micaías Viola
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.comum import salvar_json
+from benchmarks.corpus import gerar_corpus
+from benchmarks.loadtest import chamador_http, medir_carga
+from benchmarks.mock_hf import ConfigMock, ServidorMock
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PERFIS = ("sync", "gthread", "gevent")
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _perfil_disponivel(perfil: str) -> bool:
+    if perfil != "gevent":
+        return True
+    try:
+        import gevent  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _pss_mb(pid_master: int):
+    """PSS (MB) do master + workers: a memória compartilhada entra dividida. None fora do Linux."""
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        return None
+    pids = [pid_master]
+    for entrada in os.listdir("/proc"):
+        if entrada.isdigit():
+            try:
+                with open(f"/proc/{entrada}/stat") as f:
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == pid_master:
+                        pids.append(int(entrada))
+            except (OSError, IndexError, ValueError):
+                continue
+    total_kb = 0
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                total_kb += next(int(l.split()[1]) for l in f if l.startswith("Pss:"))
+        except (OSError, StopIteration):
+            continue
+    return round(total_kb / 1024, 1)
+
+
+def _subir(perfil: str, ambiente: dict, workers: int, threads: int):
+    porta = _porta_livre()
+    env = dict(os.environ, **ambiente, PORT=str(porta), GUNICORN_PERFIL=perfil,
+               RATE_LIMIT_ENABLED="false", LOG_LEVEL="WARNING")
+    if workers:
+        env["WEB_CONCURRENCY"] = str(workers)
+    if threads:
+        env["GUNICORN_THREADS"] = str(threads)
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+        cwd=RAIZ, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return processo, f"http://127.0.0.1:{porta}"
+
+
+def _esperar_pronto(base: str, processo, limite_s: float = 60.0):
+    import requests
+
+    prazo = time.monotonic() + limite_s
+    while time.monotonic() < prazo:
+        if processo.poll() is not None:
+            raise RuntimeError(f"gunicorn saiu com código {processo.returncode}")
+        try:
+            if requests.get(f"{base}/healthz", timeout=1).ok:
+                return
+        except requests.RequestException:
+            time.sleep(0.2)
+    raise RuntimeError("gunicorn não respondeu a tempo")
+
+
+def medir_perfil(perfil: str, ambiente: dict, corpus: list, args) -> dict:
+    processo, base = _subir(perfil, ambiente, args.workers, args.threads)
+    try:
+        _esperar_pronto(base, processo)
+        chamar = chamador_http(base, args.alvo)
+        medir_carga(chamar, [f"{t}\n\nAquecimento {i}" for i, t in enumerate(corpus[:20])],
+                    args.concorrencia)
+        resultado = medir_carga(chamar, corpus, args.concorrencia)
+        resultado["pss_mb"] = _pss_mb(processo.pid)
+    finally:
+        processo.terminate()
+        try:
+            processo.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            processo.kill()
+    nucleos = os.cpu_count() or 1
+    resultado.update({
+        "perfil": perfil,
+        "nucleos": nucleos,
+        "req_por_s_por_nucleo": round(resultado["req_por_s"] / nucleos, 2),
+    })
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vazão dos perfis do gunicorn com mock da Hugging Face")
+    parser.add_argument("--perfis", default=",".join(PERFIS))
+    parser.add_argument("--alvo", default="api_classify", choices=["api_classify", "classify"])
+    parser.add_argument("--requisicoes", type=int, default=400)
+    parser.add_argument("--concorrencia", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=0, help="0 = padrão do perfil")
+    parser.add_argument("--threads", type=int, default=0, help="threads do gthread (0 = padrão)")
+    parser.add_argument("--latencia-ms", type=float, default=150.0)
+    parser.add_argument("--jitter-ms", type=float, default=30.0)
+    parser.add_argument("--com-cache", action="store_true",
+                        help="repete os emails do corpus (mede também o cache de resultados)")
+    parser.add_argument("--json", help="salva os resultados neste arquivo")
+    args = parser.parse_args()
+
+    corpus = [c["email_content"] for c in gerar_corpus(args.requisicoes)]
+    if not args.com_cache:
+        corpus = [f"{texto}\n\nRef. {i}" for i, texto in enumerate(corpus)]
+
+    resultados = []
+    config = ConfigMock(args.latencia_ms, args.jitter_ms)
+    with ServidorMock(config) as mock:
+        ambiente = mock.variaveis_ambiente()
+        print(f"{'perfil':<8} {'req/s':>8} {'req/s/núcleo':>13} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'erros':>6} {'PSS MB':>8}")
+        for perfil in args.perfis.split(","):
+            perfil = perfil.strip()
+            if not _perfil_disponivel(perfil):
+                print(f"{perfil:<8} (ignorado: gevent não instalado)")
+                continue
+            r = medir_perfil(perfil, ambiente, corpus, args)
+            resultados.append(r)
+            print(f"{perfil:<8} {r['req_por_s']:>8} {r['req_por_s_por_nucleo']:>13} "
+                  f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['erros']:>6} "
+                  f"{r['pss_mb'] if r['pss_mb'] is not None else '-':>8}")
+
+    if args.json:
+        salvar_json(args.json, "servidor", resultados, vars(args))
+
+
+if __name__ == "__main__":
+    main()
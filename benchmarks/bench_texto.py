@@ -0,0 +1,150 @@
+"""
+Benchmark do processamento de texto (utils/texto.py) contra a versão anterior:
+  - pós-processamento da saída do chat: várias passadas com `.*` e
+    `[\\s\\S]+` (anterior) x uma passada com padrões compilados (atual)
+  - filtro do streaming: reexame de todo o texto a cada pedaço (anterior)
+    x exame só do pedaço novo (atual)
+  - limpeza de emails longos (atual; a lógica não mudou, só foi movida)
+A versão anterior fica copiada aqui apenas como referência de medição.
+
+Uso:
+    python -m benchmarks.bench_texto --json texto.json
+Autor: Micaías Viola
+"""
+import argparse
+import re
+
+from benchmarks.bench_micro import saidas_llm
+from benchmarks.comum import medir, salvar_json
+from benchmarks.corpus import gerar_corpus
+from utils.texto import FiltroRespostaIncremental, extrair_resposta, limpar_email
+
+# ==============================
+# VERSÃO ANTERIOR (referência)
+# ==============================
+_PADROES_ANTERIORES = [
+    r"(?i)(let me|i should|they want|maybe|so i|alright|let's|okay,|então vou|preciso|vou pensar|deixa eu).*",
+    r"(?i)(analisando|pensando|raciocínio|planejando).*"
+]
+_SAUDACAO_ANTERIOR = r"(?:Prezado|Prezada|Prezados|Olá|Caro|Cara|Bom dia|Boa tarde|Boa noite)"
+
+
+def _limpar_anterior(texto: str) -> str:
+    for padrao in _PADROES_ANTERIORES:
+        texto = re.sub(padrao, "", texto).strip()
+    return texto
+
+
+def extrair_anterior(texto: str) -> str:
+    texto = _limpar_anterior(texto)
+    match = re.search(_SAUDACAO_ANTERIOR + r"[\s\S]+", texto, flags=re.IGNORECASE)
+    if match:
+        return match.group(0).strip()
+    partes = texto.strip().split("\n\n")
+    if len(partes) > 1:
+        return _limpar_anterior(partes[-1].strip())
+    return texto.strip()
+
+
+class _FiltroAnterior:
+    RESERVA = 12
+
+    def __init__(self):
+        self._linhas = ""
+        self._linha = ""
+        self._inicio = None
+        self.mostrado = ""
+        self._padroes = [re.compile(p) for p in _PADROES_ANTERIORES]
+        self._saudacao = re.compile(_SAUDACAO_ANTERIOR, re.IGNORECASE)
+
+    def _limpar_linha(self, linha: str) -> str:
+        for padrao in self._padroes:
+            linha = padrao.sub("", linha)
+        return linha
+
+    def _parte_segura(self) -> str:
+        limite = len(self._linha) - self.RESERVA
+        for padrao in self._padroes:
+            match = padrao.search(self._linha)
+            if match:
+                limite = min(limite, match.start())
+        return self._linha[:max(limite, 0)]
+
+    def adicionar(self, pedaco: str) -> str:
+        *completas, self._linha = (self._linha + pedaco).split("\n")
+        for linha in completas:
+            self._linhas += self._limpar_linha(linha) + "\n"
+        visivel = self._linhas + self._parte_segura()
+        if self._inicio is None:
+            match = self._saudacao.search(visivel)
+            if not match:
+                return ""
+            self._inicio = match.start()
+        novo = visivel[self._inicio:][len(self.mostrado):]
+        self.mostrado += novo
+        return novo
+
+
+# ==============================
+# EXECUÇÃO
+# ==============================
+def _em_pedacos(texto: str, tamanho: int = 4) -> list:
+    """Divide a saída como chegaria no streaming (pedaços de poucos caracteres)."""
+    return [texto[i:i + tamanho] for i in range(0, len(texto), tamanho)]
+
+
+def _consumir(classe, pedacos: list):
+    filtro = classe()
+    for pedaco in pedacos:
+        filtro.adicionar(pedaco)
+
+
+def executar(repeticoes: int) -> list:
+    resultados = []
+
+    def registrar(grupo: str, caso: str, versao: str, funcao, *args, rep=repeticoes):
+        r = medir(funcao, rep, *args)
+        r.update({"grupo": grupo, "caso": caso, "versao": versao})
+        resultados.append(r)
+        print(f"{grupo:<10} {caso:<18} {versao:<9} p50={r['p50_ms']:>10.4f} ms  "
+              f"p99={r['p99_ms']:>10.4f} ms")
+
+    # 1) Pós-processamento da saída completa
+    saidas = saidas_llm()
+    saidas["longa_resposta"] = "Okay, let me think.\n\nPrezado João,\n" + "Seguem os dados. " * 500
+    for caso, texto in saidas.items():
+        registrar("extrair", caso, "anterior", extrair_anterior, texto)
+        registrar("extrair", caso, "atual", extrair_resposta, texto)
+
+    # 2) Streaming: o filtro anterior reexamina tudo a cada pedaço (quadrático)
+    rep_stream = max(1, repeticoes // 20)
+    for caso in ("curta", "longa_raciocinio", "longa_resposta"):
+        pedacos = _em_pedacos(saidas[caso])
+        registrar("streaming", caso, "anterior", _consumir, _FiltroAnterior, pedacos, rep=rep_stream)
+        registrar("streaming", caso, "atual", _consumir, FiltroRespostaIncremental, pedacos,
+                  rep=rep_stream)
+
+    # 3) Limpeza de emails longos
+    corpus = gerar_corpus(50, semente=7)
+    longo = max((c["email_content"] for c in corpus), key=len)
+    citado = longo + "\n\nAtenciosamente,\nJoão\n\nEm seg., Maria escreveu:\n" + "> texto\n" * 500
+    registrar("email", "longo", "atual", limpar_email, longo)
+    registrar("email", "citado", "atual", limpar_email, citado)
+    registrar("email", "gigante", "atual", limpar_email, longo * 2000, rep=max(1, repeticoes // 10))
+
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Processamento de texto: anterior x atual")
+    parser.add_argument("--repeticoes", type=int, default=100)
+    parser.add_argument("--json", help="salva os resultados neste arquivo")
+    args = parser.parse_args()
+
+    resultados = executar(args.repeticoes)
+    if args.json:
+        salvar_json(args.json, "texto", resultados, {"repeticoes": args.repeticoes})
+
+
+if __name__ == "__main__":
+    main()
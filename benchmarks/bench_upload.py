@@ -0,0 +1,128 @@
+"""
+Benchmark da leitura de uploads (utils/uploads.py) contra a versão anterior:
+  - .txt: `read().decode().strip()` do arquivo inteiro (anterior) x prefixo
+    limitado decodificado em blocos (atual)
+  - .pdf: stream do upload entregue ao motor (anterior) x arquivo em disco
+    mapeado em memória (atual)
+Os uploads são montados como o Werkzeug faz (SpooledTemporaryFile de 500 KB).
+Mede o tempo e o pico de memória alocada pelo Python durante a leitura
+(tracemalloc; o que o motor de PDF aloca em C não entra).
+
+Uso:
+    python -m benchmarks.bench_upload --json upload.json
+Autor: Micaías Viola
+"""
+import argparse
+import glob
+import io
+import os
+import tempfile
+import time
+import tracemalloc
+
+from werkzeug.datastructures import FileStorage
+
+from benchmarks.comum import salvar_json
+from utils.email_processor import MOTORES_PDF, PDF_ENGINE, extract_text_from_pdf
+from utils.uploads import ler_upload
+
+PASTA_PDFS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "Emails em PDF para teste")
+MB = 1024 * 1024
+
+
+def _upload(dados: bytes, nome: str) -> FileStorage:
+    """Upload como o Werkzeug entrega: em memória até 500 KB, em disco acima disso."""
+    stream = tempfile.SpooledTemporaryFile(max_size=500 * 1024, mode="rb+")
+    stream.write(dados)
+    stream.seek(0)
+    return FileStorage(stream, filename=nome)
+
+
+def _txt_anterior(arquivo) -> str:
+    return arquivo.read().decode("utf-8", errors="ignore").strip()
+
+
+def _pdf_anterior(arquivo) -> str:
+    # O motor lia direto do stream do upload (sem mmap)
+    stream = arquivo.stream
+    stream.seek(0)
+    paginas = MOTORES_PDF[PDF_ENGINE](stream)
+    try:
+        return "\n".join(paginas)
+    finally:
+        paginas.close()
+
+
+def _pdf_grande(copias: int) -> bytes:
+    """PDF de exemplo repetido `copias` vezes (um arquivo de vários MB)."""
+    import pypdfium2 as pdfium
+
+    arquivos = sorted(glob.glob(os.path.join(PASTA_PDFS, "**", "*.pdf"), recursive=True))
+    if not arquivos:
+        raise SystemExit(f"Nenhum PDF encontrado em {PASTA_PDFS}")
+    origem = pdfium.PdfDocument(arquivos[0])
+    destino = pdfium.PdfDocument.new()
+    for _ in range(copias):
+        destino.import_pages(origem)
+    saida = io.BytesIO()
+    destino.save(saida)
+    return saida.getvalue()
+
+
+def medir_leitura(funcao, dados: bytes, nome: str, repeticoes: int) -> dict:
+    """Tempo médio (ms) e maior pico de memória (MB) lendo o upload."""
+    tempos, picos = [], []
+    for _ in range(repeticoes):
+        arquivo = _upload(dados, nome)  # montado fora da medição
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        funcao(arquivo)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        picos.append(tracemalloc.get_traced_memory()[1] / MB)
+        tracemalloc.stop()
+        arquivo.close()
+    return {"media_ms": round(sum(tempos) / len(tempos), 3), "pico_mb": round(max(picos), 3)}
+
+
+def executar(repeticoes: int, tamanhos_mb: list, copias_pdf: int) -> list:
+    resultados = []
+
+    def registrar(caso: str, versao: str, funcao, dados: bytes, nome: str):
+        r = medir_leitura(funcao, dados, nome, repeticoes)
+        r.update({"caso": caso, "versao": versao, "bytes": len(dados)})
+        resultados.append(r)
+        print(f"{caso:<12} {versao:<9} {r['media_ms']:>10.3f} ms  pico={r['pico_mb']:>8.3f} MB")
+
+    linha = "Prezado João, segue o relatório do projeto com o orçamento revisado.\n".encode("utf-8")
+    for tamanho in tamanhos_mb:
+        dados = linha * (tamanho * MB // len(linha))
+        registrar(f"txt_{tamanho}mb", "anterior", _txt_anterior, dados, "email.txt")
+        registrar(f"txt_{tamanho}mb", "atual", ler_upload, dados, "email.txt")
+
+    dados = _pdf_grande(copias_pdf)
+    caso = f"pdf_{len(dados) // MB}mb"
+    registrar(caso, "anterior", _pdf_anterior, dados, "email.pdf")
+    registrar(caso, "atual", lambda arquivo: extract_text_from_pdf(arquivo, max_chars=0), dados,
+              "email.pdf")
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Leitura de uploads: anterior x atual")
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--tamanhos", default="1,4,16", help="tamanhos dos .txt em MB")
+    parser.add_argument("--copias-pdf", type=int, default=200,
+                        help="quantas vezes o PDF de exemplo é repetido")
+    parser.add_argument("--json", help="salva os resultados neste arquivo")
+    args = parser.parse_args()
+
+    tamanhos = [int(t) for t in args.tamanhos.split(",")]
+    resultados = executar(args.repeticoes, tamanhos, args.copias_pdf)
+    if args.json:
+        salvar_json(args.json, "upload", resultados,
+                    {"repeticoes": args.repeticoes, "tamanhos_mb": tamanhos,
+                     "copias_pdf": args.copias_pdf})
+
+
+if __name__ == "__main__":
+    main()
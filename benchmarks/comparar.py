@@ -0,0 +1,65 @@
+"""
+Compara dois arquivos JSON de benchmark (mesmo tipo) e aponta regressões.
+Casamento pelos campos de identificação (grupo/caso, motor ou alvo).
+Sai com código 1 se alguma métrica piorar além da tolerância.
+
+Uso:
+    python -m benchmarks.comparar base.json atual.json --metrica p95_ms --tolerancia 0.15
+Autor: Micaías Viola
+"""
+import argparse
+import json
+import sys
+
+CAMPOS_CHAVE = ("grupo", "caso", "motor", "alvo", "concorrencia")
+
+
+def _chave(resultado: dict) -> tuple:
+    return tuple(resultado.get(c) for c in CAMPOS_CHAVE)
+
+
+def comparar(base: dict, atual: dict, metrica: str, tolerancia: float) -> list:
+    """Lista de (chave, valor_base, valor_atual, variação) para cada item comum."""
+    anteriores = {_chave(r): r for r in base["resultados"]}
+    linhas = []
+    for r in atual["resultados"]:
+        anterior = anteriores.get(_chave(r))
+        if anterior is None or metrica not in r or metrica not in anterior:
+            continue
+        valor_base, valor_atual = anterior[metrica], r[metrica]
+        variacao = (valor_atual - valor_base) / valor_base if valor_base else 0.0
+        # Para vazão, cair é que é ruim
+        if metrica.endswith("por_s"):
+            variacao = -variacao
+        linhas.append((_chave(r), valor_base, valor_atual, variacao, variacao > tolerancia))
+    return linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara resultados de benchmark")
+    parser.add_argument("base")
+    parser.add_argument("atual")
+    parser.add_argument("--metrica", default="p50_ms")
+    parser.add_argument("--tolerancia", type=float, default=0.10, help="piora aceitável (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.atual, encoding="utf-8") as f:
+        atual = json.load(f)
+
+    regressoes = 0
+    for chave, valor_base, valor_atual, variacao, regrediu in comparar(
+            base, atual, args.metrica, args.tolerancia):
+        nome = " / ".join(str(c) for c in chave if c is not None)
+        marca = "REGRESSÃO" if regrediu else "ok"
+        regressoes += regrediu
+        print(f"{marca:<10} {nome:<45} {valor_base:>12.4f} → {valor_atual:>12.4f} ({variacao:+.1%})")
+
+    print(f"\n{regressoes} regressão(ões) em {args.metrica} "
+          f"({base.get('commit')} → {atual.get('commit')})")
+    sys.exit(1 if regressoes else 0)
+
+
+if __name__ == "__main__":
+    main()
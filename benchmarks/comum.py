@@ -0,0 +1,68 @@
+"""
+Utilidades compartilhadas pelos benchmarks: percentis, resumo de tempos
+e gravação dos resultados em JSON (com metadados para comparar versões).
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+
+def percentil(valores_ordenados: list, p: float) -> float:
+    """Percentil por vizinho mais próximo (valores já ordenados)."""
+    if not valores_ordenados:
+        return 0.0
+    indice = min(len(valores_ordenados) - 1, max(0, round(p / 100 * len(valores_ordenados)) - 1))
+    return valores_ordenados[indice]
+
+
+def resumir(tempos_ms: list) -> dict:
+    """Média e percentis (ms) de uma lista de tempos."""
+    ordenados = sorted(tempos_ms)
+    n = len(ordenados)
+    return {
+        "n": n,
+        "media_ms": round(sum(ordenados) / n, 4) if n else 0.0,
+        "p50_ms": round(percentil(ordenados, 50), 4),
+        "p95_ms": round(percentil(ordenados, 95), 4),
+        "p99_ms": round(percentil(ordenados, 99), 4),
+        "max_ms": round(ordenados[-1], 4) if n else 0.0,
+    }
+
+
+def medir(funcao, repeticoes: int, *args) -> dict:
+    """Chama `funcao(*args)` várias vezes e resume os tempos."""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao(*args)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return resumir(tempos)
+
+
+def _commit_atual() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), timeout=5,
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def salvar_json(caminho: str, benchmark: str, resultados, parametros: dict = None):
+    """Grava os resultados com metadados (commit, Python, máquina, data)."""
+    dados = {
+        "benchmark": benchmark,
+        "commit": _commit_atual(),
+        "python": sys.version.split()[0],
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "data": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "parametros": parametros or {},
+        "resultados": resultados,
+    }
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(dados, f, indent=2, ensure_ascii=False)
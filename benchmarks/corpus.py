@@ -0,0 +1,88 @@
+"""
+Gerador de corpus sintético a partir dos emails de exemplo
+("Emails em PDF para teste/" + exemplos da interface), com variações
+de saudação, assinatura, ordem e tamanho. Determinístico pela semente.
+
+Uso:
+    python -m benchmarks.corpus --quantidade 1000 -o corpus.jsonl
+Autor: Micaías Viola
+"""
+import argparse
+import glob
+import json
+import os
+import random
+
+from utils.email_processor import extract_text_from_pdf
+
+PASTA_PDFS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "Emails em PDF para teste")
+
+# Mesmos exemplos usados pelos botões da interface (static/js/script.js)
+EXEMPLOS_EXTRAS = [
+    ("Produtivo",
+     "Prezados,\n\nEstou com um problema crítico no sistema de login desde ontem à tarde. "
+     "Não consigo acessar minha conta para finalizar um relatório urgente que precisa ser "
+     "entregue hoje.\n\nPor favor, preciso de assistência urgente pois isso está bloqueando "
+     "todo o meu trabalho.\n\nAtenciosamente,\nJoão Silva\nAnalista Financeiro"),
+    ("Improdutivo",
+     "Olá equipe,\n\nGostaria de desejar um feliz natal e um próspero ano novo para todos "
+     "vocês!\n\nAgradeço a todos pelo excelente trabalho realizado este ano e pela dedicação "
+     "de sempre.\n\nGrande abraço,\nMaria Santos\nGerente de Departamento"),
+]
+
+SAUDACOES = ["", "Olá,", "Bom dia,", "Prezados,", "Boa tarde, equipe,"]
+ASSINATURAS = ["", "Atenciosamente,\nCarlos", "Abraços,\nAna", "Obrigado!\n--\nEnviado do meu celular"]
+RODAPE = ("Esta mensagem pode conter informação confidencial. Se você não for o "
+          "destinatário, por favor apague-a e avise o remetente.")
+
+
+def carregar_exemplos(pasta: str = PASTA_PDFS) -> list:
+    """Lista de (rotulo, texto): rótulo vem da pasta Produtivo/Improdutivo."""
+    exemplos = []
+    for caminho in sorted(glob.glob(os.path.join(pasta, "*", "*.pdf"))):
+        rotulo = os.path.basename(os.path.dirname(caminho))
+        texto = extract_text_from_pdf(caminho).strip()
+        if texto:
+            exemplos.append((rotulo, texto))
+    return exemplos + EXEMPLOS_EXTRAS
+
+
+def gerar_corpus(quantidade: int, semente: int = 42, exemplos: list = None) -> list:
+    """Gera `quantidade` emails variados: [{'id', 'rotulo', 'email_content'}]."""
+    gerador = random.Random(semente)
+    exemplos = exemplos or carregar_exemplos()
+    corpus = []
+    for i in range(quantidade):
+        rotulo, base = gerador.choice(exemplos)
+        linhas = [l for l in base.splitlines() if l.strip()]
+        miolo = linhas[1:-1] if len(linhas) > 3 else linhas
+        if len(miolo) > 2 and gerador.random() < 0.3:
+            gerador.shuffle(miolo)
+        # Alguns emails longos (conversas encaminhadas, rodapés) para estressar o pipeline
+        repeticoes = gerador.choice([1, 1, 1, 2, 5, 20])
+        partes = [gerador.choice(SAUDACOES)] + miolo * repeticoes + [gerador.choice(ASSINATURAS)]
+        if gerador.random() < 0.2:
+            partes.append(RODAPE)
+        corpus.append({
+            "id": f"sintetico-{i}",
+            "rotulo": rotulo,
+            "email_content": "\n".join(p for p in partes if p),
+        })
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera corpus sintético de emails (JSONL)")
+    parser.add_argument("--quantidade", type=int, default=1000)
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("-o", "--saida", default="corpus.jsonl")
+    args = parser.parse_args()
+
+    with open(args.saida, "w", encoding="utf-8") as f:
+        for item in gerar_corpus(args.quantidade, args.semente):
+            f.write(json.dumps(item, ensure_ascii=False) + "\n")
+    print(f"{args.quantidade} emails gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Teste de carga ponta a ponta contra o mock local da Hugging Face.
+Alvos:
+  - fluxo         → processar_email_com_resposta chamado direto (sem HTTP)
+  - api_classify  → POST /api/classify num servidor Flask local (threaded)
+  - classify      → POST /classify (formulário, mesmo caminho da interface)
+Relata req/s, p50/p95/p99 e erros; --json grava o resultado para comparar versões.
+
+Uso:
+    python -m benchmarks.loadtest --alvo api_classify --requisicoes 500 --concorrencia 16
+    python -m benchmarks.loadtest --latencia-ms 300 --taxa-503 0.05 --json carga.json
+Autor: Micaías Viola
+"""
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.comum import resumir, salvar_json
+from benchmarks.corpus import gerar_corpus
+from benchmarks.mock_hf import ConfigMock, ServidorMock
+
+
+def _servidor_flask():
+    """Sobe app.py num servidor WSGI threaded em porta livre."""
+    from werkzeug.serving import make_server
+    from app import app
+
+    servidor = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_port}"
+
+
+def chamador_http(base: str, alvo: str):
+    """Função que envia um email ao servidor em `base` (uma Session por thread)."""
+    import requests
+
+    local = threading.local()
+
+    def sessao():
+        if not hasattr(local, "sessao"):
+            local.sessao = requests.Session()
+        return local.sessao
+
+    def chamar(texto):
+        if alvo == "api_classify":
+            r = sessao().post(f"{base}/api/classify", json={"email_content": texto}, timeout=120)
+        else:
+            r = sessao().post(f"{base}/classify", data={"email_text": texto}, timeout=120)
+        r.raise_for_status()
+
+    return chamar
+
+
+def medir_carga(chamar, corpus: list, concorrencia: int) -> dict:
+    """Chama `chamar(texto)` para todo o corpus com `concorrencia` threads e resume."""
+    tempos, erros = [], 0
+    lock = threading.Lock()
+
+    def tarefa(texto):
+        nonlocal erros
+        inicio = time.perf_counter()
+        try:
+            chamar(texto)
+            ok = True
+        except Exception:
+            ok = False
+        decorrido = (time.perf_counter() - inicio) * 1000
+        with lock:
+            tempos.append(decorrido)
+            if not ok:
+                erros += 1
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        list(executor.map(tarefa, corpus))
+    duracao = time.perf_counter() - inicio
+
+    resultado = resumir(tempos)
+    resultado.update({
+        "concorrencia": concorrencia,
+        "duracao_s": round(duracao, 3),
+        "req_por_s": round(len(corpus) / duracao, 2) if duracao else 0.0,
+        "erros": erros,
+    })
+    return resultado
+
+
+def executar(alvo: str, corpus: list, concorrencia: int) -> dict:
+    servidor = None
+    if alvo == "fluxo":
+        from utils.fluxo_email import processar_email_com_resposta
+
+        def chamar(texto):
+            processar_email_com_resposta(texto)
+    else:
+        servidor, base = _servidor_flask()
+        chamar = chamador_http(base, alvo)
+
+    resultado = medir_carga(chamar, corpus, concorrencia)
+    if servidor is not None:
+        servidor.shutdown()
+    resultado["alvo"] = alvo
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga com mock da Hugging Face")
+    parser.add_argument("--alvo", default="api_classify", choices=["fluxo", "api_classify", "classify"])
+    parser.add_argument("--requisicoes", type=int, default=200)
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--unicos", action="store_true",
+                        help="torna cada email único (desliga o efeito do cache de resultados)")
+    parser.add_argument("--latencia-ms", type=float, default=150.0)
+    parser.add_argument("--jitter-ms", type=float, default=30.0)
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    parser.add_argument("--taxa-503", type=float, default=0.0)
+    parser.add_argument("--json", help="salva os resultados neste arquivo")
+    args = parser.parse_args()
+
+    config = ConfigMock(args.latencia_ms, args.jitter_ms, args.taxa_erro, args.taxa_503)
+    with ServidorMock(config) as mock:
+        # As variáveis precisam existir antes de importar a aplicação
+        os.environ.update(mock.variaveis_ambiente())
+        # Todas as requisições saem do mesmo IP: o limite por cliente recusaria quase todas
+        os.environ["RATE_LIMIT_ENABLED"] = "false"
+        corpus = [c["email_content"] for c in gerar_corpus(args.requisicoes)]
+        if args.unicos:
+            corpus = [f"{texto}\n\nRef. {i}" for i, texto in enumerate(corpus)]
+
+        resultado = executar(args.alvo, corpus, args.concorrencia)
+        resultado["chamadas_upstream"] = config.requisicoes
+
+    print(f"alvo={resultado['alvo']} req/s={resultado['req_por_s']} "
+          f"p50={resultado['p50_ms']:.1f}ms p95={resultado['p95_ms']:.1f}ms "
+          f"p99={resultado['p99_ms']:.1f}ms erros={resultado['erros']} "
+          f"upstream={resultado['chamadas_upstream']}")
+
+    if args.json:
+        salvar_json(args.json, "loadtest", [resultado], vars(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Servidor local que imita a Hugging Face para benchmarks e testes de carga.
+  - POST /v1/chat/completions  → chat-completion (também com "stream": true)
+  - POST qualquer outro caminho → zero-shot (labels/scores, texto ou lote)
+Latência, taxa de erro e respostas 503 "modelo carregando" são configuráveis.
+
+Uso isolado:
+    python -m benchmarks.mock_hf --porta 8765 --latencia-ms 150 --taxa-erro 0.02
+e então:
+    HF_API_URL=http://127.0.0.1:8765/zero-shot
+    HF_CHAT_BASE_URL=http://127.0.0.1:8765
+    HF_CHAT_URL=http://127.0.0.1:8765/v1/chat/completions
+Autor: Micaías Viola
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RESPOSTA_CHAT = (
+    "Okay, let me think about how to answer this email.\n\n"
+    "Prezado(a),\n\nAgradecemos o contato. Recebemos sua mensagem e nossa equipe "
+    "retornará em breve com as informações solicitadas.\n\nAtenciosamente,\nEquipe"
+)
+
+
+class ConfigMock:
+    def __init__(self, latencia_ms=100.0, jitter_ms=20.0, taxa_erro=0.0, taxa_503=0.0,
+                 tempo_estimado=1.0, latencia_token_ms=5.0):
+        self.latencia_ms = latencia_ms
+        self.jitter_ms = jitter_ms
+        self.taxa_erro = taxa_erro
+        self.taxa_503 = taxa_503
+        self.tempo_estimado = tempo_estimado
+        self.latencia_token_ms = latencia_token_ms
+        self.requisicoes = 0
+        self._lock = threading.Lock()
+
+    def contar(self):
+        with self._lock:
+            self.requisicoes += 1
+
+
+def _scores_zero_shot(texto: str, labels: list) -> dict:
+    """Scores determinísticos por texto (mesmo texto → mesmo resultado)."""
+    gerador = random.Random(texto)
+    brutos = [gerador.random() ** 4 for _ in labels]
+    total = sum(brutos) or 1.0
+    pares = sorted(zip(labels, (b / total for b in brutos)), key=lambda p: p[1], reverse=True)
+    return {"sequence": texto, "labels": [p[0] for p in pares], "scores": [p[1] for p in pares]}
+
+
+def criar_handler(config: ConfigMock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _json(self, status: int, corpo, headers: dict = None):
+            dados = json.dumps(corpo).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(dados)))
+            for chave, valor in (headers or {}).items():
+                self.send_header(chave, valor)
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def do_GET(self):
+            self._json(200, {"ok": True, "requisicoes": config.requisicoes})
+
+        def do_POST(self):
+            config.contar()
+            tamanho = int(self.headers.get("Content-Length", 0))
+            corpo = json.loads(self.rfile.read(tamanho) or b"{}")
+
+            atraso = max(0.0, random.gauss(config.latencia_ms, config.jitter_ms)) / 1000
+            time.sleep(atraso)
+
+            sorteio = random.random()
+            if sorteio < config.taxa_503:
+                return self._json(503, {"error": "Model is currently loading",
+                                        "estimated_time": config.tempo_estimado})
+            if sorteio < config.taxa_503 + config.taxa_erro:
+                return self._json(500, {"error": "Internal error (simulado)"})
+
+            if self.path.rstrip("/").endswith("/chat/completions"):
+                if corpo.get("stream"):
+                    return self._chat_stream(corpo)
+                return self._json(200, {
+                    "id": "mock", "object": "chat.completion", "created": int(time.time()),
+                    "model": corpo.get("model", "mock"),
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": RESPOSTA_CHAT}}],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+                })
+
+            labels = (corpo.get("parameters") or {}).get("candidate_labels") or ["a", "b"]
+            entradas = corpo.get("inputs", "")
+            if isinstance(entradas, list):
+                return self._json(200, [_scores_zero_shot(t, labels) for t in entradas])
+            return self._json(200, _scores_zero_shot(entradas, labels))
+
+        def _chat_stream(self, corpo):
+            """Resposta no formato SSE do chat-completion (um chunk por palavra)."""
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def enviar(texto: str):
+                dados = texto.encode("utf-8")
+                self.wfile.write(f"{len(dados):x}\r\n".encode() + dados + b"\r\n")
+                self.wfile.flush()
+
+            palavras = RESPOSTA_CHAT.split(" ")
+            for i, palavra in enumerate(palavras):
+                pedaco = palavra + ("" if i == len(palavras) - 1 else " ")
+                chunk = {
+                    "id": "mock", "object": "chat.completion.chunk", "created": int(time.time()),
+                    "model": corpo.get("model", "mock"),
+                    "choices": [{"index": 0, "delta": {"role": "assistant", "content": pedaco},
+                                 "finish_reason": None}],
+                }
+                enviar(f"data: {json.dumps(chunk)}\n\n")
+                time.sleep(config.latencia_token_ms / 1000)
+            enviar("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+
+    return Handler
+
+
+class ServidorMock:
+    """Sobe o mock numa thread em segundo plano (porta 0 = qualquer livre)."""
+
+    def __init__(self, config: ConfigMock = None, porta: int = 0):
+        self.config = config or ConfigMock()
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", porta), criar_handler(self.config))
+        self.servidor.daemon_threads = True
+        self.thread = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.servidor.server_address[1]}"
+
+    def variaveis_ambiente(self) -> dict:
+        """Variáveis que apontam a aplicação para este mock."""
+        return {
+            "HF_API_TOKEN": "mock",
+            "HF_TOKEN": "mock",
+            "HF_API_URL": f"{self.url}/zero-shot",
+            "HF_CHAT_BASE_URL": self.url,
+            "HF_CHAT_URL": f"{self.url}/v1/chat/completions",
+        }
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock local da Hugging Face")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--latencia-ms", type=float, default=100.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="fração de respostas 500")
+    parser.add_argument("--taxa-503", type=float, default=0.0, help="fração de 503 'modelo carregando'")
+    parser.add_argument("--tempo-estimado", type=float, default=1.0, help="estimated_time dos 503")
+    args = parser.parse_args()
+
+    config = ConfigMock(args.latencia_ms, args.jitter_ms, args.taxa_erro, args.taxa_503,
+                        args.tempo_estimado)
+    mock = ServidorMock(config, args.porta)
+    print(f"Mock da Hugging Face em {mock.url}")
+    for chave, valor in mock.variaveis_ambiente().items():
+        print(f"  {chave}={valor}")
+    try:
+        mock.servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
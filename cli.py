@@ -0,0 +1,242 @@
+"""
+Linha de comando do Classificador de Emails.
+
+Classificar uma caixa de email inteira (mbox, Maildir, pasta ou JSONL):
+    python cli.py ingerir caixa.mbox -o resultados.jsonl
+    python cli.py ingerir emails/ -o resultados.csv --workers 8
+    python cli.py ingerir caixa.mbox -o resultados.jsonl --retomar
+
+Avaliar o classificador num corpus rotulado (acurácia x estágio, varredura
+de limiar/margem; os scores do modelo ficam em cache no disco):
+    python cli.py avaliar
+    python cli.py avaliar --dataset corpus.jsonl --json avaliacao.json
+Autor: Micaías Viola
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from utils import config  # noqa: F401 — carrega o .env uma única vez
+
+CAMPOS_SAIDA = ["id", "categoria", "decisao", "resposta", "tempo_ms", "erro"]
+
+
+# ==============================
+# PROCESSAMENTO DE UM ITEM
+# ==============================
+def processar_item(ident: str, carregar, modo: str) -> dict:
+    """
+    Roda no pool (thread ou processo); nunca lança exceção.
+    `carregar()` (ver utils/ingestao.py) extrai o texto aqui dentro: um
+    PDF/MIME corrompido vira o `erro` do item e o PDF roda no pool.
+    """
+    inicio = time.perf_counter()
+    registro = {"id": ident, "categoria": None, "decisao": None, "resposta": None, "erro": None}
+    try:
+        texto = carregar()
+        if modo == "completo":
+            from utils.fluxo_email import processar_email_com_resposta
+            resultado = processar_email_com_resposta(texto)
+            registro["categoria"] = resultado["categoria"]
+            registro["resposta"] = resultado["resposta"]
+        else:
+            from utils.classifier import classificar_email_com_origem
+            registro["categoria"], registro["decisao"] = classificar_email_com_origem(texto)
+    except Exception as e:
+        registro["erro"] = str(e)
+    registro["tempo_ms"] = round((time.perf_counter() - inicio) * 1000, 3)
+    return registro
+
+
+# ==============================
+# SAÍDA INCREMENTAL + CHECKPOINT
+# ==============================
+class Saida:
+    """
+    Grava um registro por linha (JSONL ou CSV) na mesma ordem da fonte.
+    Depois de cada registro o arquivo `<saida>.checkpoint` guarda quantos
+    itens já foram gravados e o tamanho do arquivo até ali; ao retomar,
+    qualquer linha incompleta após esse ponto é descartada.
+    """
+
+    def __init__(self, caminho: str, formato: str, retomar: bool):
+        self.caminho = caminho
+        self.formato = formato
+        self.caminho_checkpoint = caminho + ".checkpoint"
+        self.processados = 0
+
+        offset = 0
+        if retomar and os.path.exists(self.caminho_checkpoint):
+            with open(self.caminho_checkpoint, encoding="utf-8") as f:
+                checkpoint = json.load(f)
+            self.processados, offset = checkpoint["processados"], checkpoint["offset"]
+
+        self.arquivo = open(caminho, "r+b" if offset else "wb")
+        self.arquivo.truncate(offset)
+        self.arquivo.seek(offset)
+        if formato == "csv" and offset == 0:
+            self._escrever_csv(CAMPOS_SAIDA)
+            self._salvar_checkpoint()
+
+    def _escrever_csv(self, linha):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(linha)
+        self.arquivo.write(buffer.getvalue().encode("utf-8"))
+
+    def _salvar_checkpoint(self):
+        self.arquivo.flush()
+        temporario = self.caminho_checkpoint + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            json.dump({"processados": self.processados, "offset": self.arquivo.tell()}, f)
+        os.replace(temporario, self.caminho_checkpoint)  # troca atômica
+
+    def escrever(self, registro: dict):
+        if self.formato == "csv":
+            self._escrever_csv([registro.get(c) for c in CAMPOS_SAIDA])
+        else:
+            self.arquivo.write((json.dumps(registro, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.processados += 1
+        self._salvar_checkpoint()
+
+    def fechar(self):
+        self.arquivo.close()
+
+
+def comando_ingerir(args) -> int:
+    from utils.ingestao import itens_da_fonte
+
+    formato = args.formato or ("csv" if args.saida.lower().endswith(".csv") else "jsonl")
+    saida = Saida(args.saida, formato, args.retomar)
+    pular = saida.processados
+    if pular:
+        print(f"Retomando a partir do item {pular + 1}", file=sys.stderr)
+
+    Executor = ProcessPoolExecutor if args.processos else ThreadPoolExecutor
+    # Janela limitada de itens em andamento → memória constante
+    janela = deque()
+    limite_janela = args.workers * 4
+    inicio = time.perf_counter()
+    total = 0
+
+    try:
+        with Executor(max_workers=args.workers) as executor:
+            # Os itens já gravados são pulados pela fonte, antes de decodificar
+            for ident, carregar in itens_da_fonte(args.fonte, args.tipo, pular):
+                janela.append(executor.submit(processar_item, ident, carregar, args.modo))
+                # Grava na ordem da fonte assim que o item mais antigo terminar
+                while len(janela) >= limite_janela or (janela and janela[0].done()):
+                    saida.escrever(janela.popleft().result())
+                    total += 1
+            while janela:
+                saida.escrever(janela.popleft().result())
+                total += 1
+    except KeyboardInterrupt:
+        print("\nInterrompido — use --retomar para continuar de onde parou.", file=sys.stderr)
+        return 130
+    finally:
+        saida.fechar()
+
+    decorrido = time.perf_counter() - inicio
+    taxa = total / decorrido if decorrido else 0
+    print(f"{total} emails classificados em {decorrido:.1f}s ({taxa:.1f}/s) → {args.saida}",
+          file=sys.stderr)
+    return 0
+
+
+def _imprimir_avaliacao(relatorio: dict):
+    from utils.avaliacao import ROTULOS
+
+    print(f"\nLimiar {relatorio['limiar']} / margem {relatorio['margem']} — "
+          f"{relatorio['total']} emails, acurácia {relatorio['acuracia']:.1%}")
+    print(f"{'real / previsto':<16}" + "".join(f"{r:>13}" for r in ROTULOS))
+    for real in ROTULOS:
+        print(f"{real:<16}" + "".join(f"{relatorio['matriz_confusao'][real][p]:>13}" for p in ROTULOS))
+    print(f"\n{'estágio':<24}{'n':>6}{'tráfego':>9}{'acurácia':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for estagio, dados in relatorio["estagios"].items():
+        acuracia = "-" if dados["acuracia"] is None else f"{dados['acuracia']:.1%}"
+        print(f"{estagio:<24}{dados['n']:>6}{dados['participacao']:>9.1%}{acuracia:>10}"
+              f"{dados['p50_ms']:>10.2f}{dados['p95_ms']:>10.2f}")
+    print(f"\nChegam ao modelo: {relatorio['chamadas_modelo']:.1%} — "
+          f"decididos por ele: {relatorio['cobertura_modelo']:.1%}")
+
+
+def comando_avaliar(args) -> int:
+    from utils.avaliacao import CacheScores, avaliar, carregar_rotulados, coletar, faixa, varrer
+
+    exemplos = carregar_rotulados(args.dataset)
+    if not exemplos:
+        print(f"Nenhum email rotulado em {args.dataset}", file=sys.stderr)
+        return 1
+    registros = coletar(exemplos, CacheScores(args.cache), args.workers, args.renovar)
+    em_cache = sum(r["em_cache"] for r in registros)
+    print(f"{len(registros)} emails ({em_cache} com scores do cache {args.cache})", file=sys.stderr)
+
+    atual = avaliar(registros)
+    _imprimir_avaliacao(atual)
+
+    limiares = faixa(*args.limiares)
+    margens = faixa(*args.margens)
+    pontos = varrer(registros, limiares, margens)
+    # Combinações com o mesmo resultado viram uma linha (a de menor limiar/margem)
+    fronteira = {}
+    for ponto in pontos:
+        if ponto["pareto"]:
+            fronteira.setdefault((ponto["acuracia"], ponto["cobertura_modelo"]), []).append(ponto)
+    print(f"\nFronteira de Pareto (acurácia x cobertura do modelo), {len(pontos)} combinações:")
+    print(f"{'limiar':>8}{'margem':>8}{'acurácia':>10}{'modelo':>9}{'fallback':>10}{'iguais':>8}")
+    for (_, cobertura), iguais in sorted(fronteira.items(), key=lambda item: item[0][1]):
+        ponto = min(iguais, key=lambda p: (p["limiar"], p["margem"]))
+        print(f"{ponto['limiar']:>8}{ponto['margem']:>8}{ponto['acuracia']:>10.1%}"
+              f"{cobertura:>9.1%}{ponto['fallback']:>10.1%}{len(iguais):>8}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"atual": atual, "varredura": pontos, "registros": registros}, f,
+                      ensure_ascii=False, indent=2)
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Classificador de Emails — linha de comando")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    ingerir = comandos.add_parser("ingerir", help="classifica todas as mensagens de uma fonte")
+    ingerir.add_argument("fonte", help="arquivo mbox, pasta Maildir, pasta com .eml/.txt/.pdf ou .jsonl")
+    ingerir.add_argument("-o", "--saida", required=True, help="arquivo de saída (.jsonl ou .csv)")
+    ingerir.add_argument("--tipo", default="auto",
+                         choices=["auto", "mbox", "maildir", "diretorio", "jsonl", "arquivo"])
+    ingerir.add_argument("--formato", choices=["jsonl", "csv"], help="padrão: pela extensão da saída")
+    ingerir.add_argument("--modo", default="classificar", choices=["classificar", "completo"],
+                         help="'completo' também gera a resposta sugerida")
+    ingerir.add_argument("--workers", type=int, default=4)
+    ingerir.add_argument("--processos", action="store_true",
+                         help="usa processos em vez de threads (útil com backend local)")
+    ingerir.add_argument("--retomar", action="store_true", help="continua a partir do checkpoint")
+    ingerir.set_defaults(funcao=comando_ingerir)
+
+    from utils.avaliacao import AVALIACAO_CACHE_PATH, PASTA_EXEMPLOS
+    avaliar = comandos.add_parser("avaliar", help="acurácia e custo de cada estágio num corpus rotulado")
+    avaliar.add_argument("--dataset", default=PASTA_EXEMPLOS,
+                         help="pasta com Produtivo/ e Improdutivo/ ou .jsonl com rótulo e texto")
+    avaliar.add_argument("--cache", default=AVALIACAO_CACHE_PATH, help="SQLite com os scores do modelo")
+    avaliar.add_argument("--renovar", action="store_true", help="ignora o cache e consulta o modelo de novo")
+    avaliar.add_argument("--workers", type=int, default=4, help="chamadas simultâneas ao modelo")
+    avaliar.add_argument("--limiares", type=float, nargs=3, default=[0.5, 0.95, 0.05],
+                         metavar=("INICIO", "FIM", "PASSO"))
+    avaliar.add_argument("--margens", type=float, nargs=3, default=[0.0, 0.3, 0.05],
+                         metavar=("INICIO", "FIM", "PASSO"))
+    avaliar.add_argument("--json", help="salva relatório, varredura e registros neste arquivo")
+    avaliar.set_defaults(funcao=comando_avaliar)
+
+    args = parser.parse_args(argv)
+    return args.funcao(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
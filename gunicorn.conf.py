@@ -0,0 +1,107 @@
+"""
+Configuração do gunicorn para produção (carregada por `gunicorn -c gunicorn.conf.py app:app`).
+O serviço passa quase todo o tempo esperando a Hugging Face, então cada
+worker atende várias requisições ao mesmo tempo. GUNICORN_PERFIL escolhe como:
+  - gthread (padrão) → 1 worker por núcleo, GUNICORN_THREADS threads cada
+  - gevent           → 1 worker por núcleo, GUNICORN_CONEXOES greenlets cada
+                       (requer `pip install gevent`; bom para muitos SSE abertos)
+  - sync             → 2 × núcleos + 1 workers de uma requisição cada
+                       (o comportamento anterior, para comparação)
+O app é carregado no master antes do fork (preload) com WARMUP=import: motor
+de palavras-chave, modelos de resposta, índice de respostas aprovadas,
+templates, clientes e o modelo local (se houver) ficam prontos uma vez só e
+são compartilhados pelos workers (copy-on-write). Os workers são reciclados
+depois de GUNICORN_MAX_REQUESTS requisições (com jitter, sem derrubar as em andamento).
+Autor: Micaías Viola
+Data: 2025-10-12
+"""
+import multiprocessing
+import os
+
+# ==============================
+# PERFIL
+# ==============================
+PERFIL = os.getenv("GUNICORN_PERFIL", "gthread").lower()
+if PERFIL not in ("gthread", "gevent", "sync"):
+    raise ValueError(f"GUNICORN_PERFIL inválido: '{PERFIL}' (use gthread, gevent ou sync)")
+
+if PERFIL == "gevent":
+    # Antes de importar o app no master: requests/ssl importados antes do
+    # patch deixam o gevent instável (o worker só faria o patch após o fork)
+    from gevent import monkey
+
+    monkey.patch_all()
+
+NUCLEOS = multiprocessing.cpu_count()
+
+# ==============================
+# WORKERS
+# ==============================
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+# gthread: subclasse que recicla sem fechar conexões já aceitas (utils/worker_gunicorn.py)
+worker_class = "utils.worker_gunicorn.ThreadWorkerGracioso" if PERFIL == "gthread" else PERFIL
+# WEB_CONCURRENCY é definido pelo Heroku conforme o tamanho do dyno
+workers = int(os.getenv("WEB_CONCURRENCY", 0)) or (2 * NUCLEOS + 1 if PERFIL == "sync" else NUCLEOS)
+# Jobs e resultados precisam de um store compartilhado (SQLite) com mais de um worker:
+# a requisição seguinte do mesmo usuário pode cair em outro processo
+if workers > 1:
+    for _variavel in ("JOBS_SQLITE_PATH", "RESULTADOS_SQLITE_PATH"):
+        if os.getenv(_variavel) == "":
+            raise ValueError(f"{_variavel} vazio (só memória) não funciona com {workers} workers")
+threads = int(os.getenv("GUNICORN_THREADS", 32)) if PERFIL == "gthread" else 1
+# gevent: greenlets por worker; gthread: conexões abertas (incl. keep-alive) por worker
+worker_connections = int(os.getenv("GUNICORN_CONEXOES", 200))
+
+# Chamadas à Hugging Face podem levar HTTP_TIMEOUT × tentativas; o SSE dos
+# jobs fica aberto até a resposta terminar
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+# Reciclagem: o worker termina as requisições em andamento e o master cria
+# outro a partir da memória já aquecida; o jitter evita reciclar todos juntos
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", max(1, max_requests // 10)))
+
+# ==============================
+# PRELOAD
+# ==============================
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() == "true"
+if preload_app:
+    os.environ.setdefault("WARMUP", "import")
+
+# Pool keep-alive por host com uma conexão por thread/greenlet que chama a
+# Hugging Face (acima do pool cada chamada abriria uma conexão nova)
+os.environ.setdefault("HTTP_POOL_MAXSIZE", str(max(20, threads if PERFIL == "gthread" else 0,
+                                                   worker_connections if PERFIL == "gevent" else 0)))
+
+# Modelo local: divide os núcleos entre os workers em vez de cada um usar
+# todos (LOCAL_NUM_THREADS explícito tem prioridade)
+os.environ.setdefault("LOCAL_NUM_THREADS", str(max(1, NUCLEOS // workers)))
+
+# Heartbeat dos workers em memória (disco lento/overlay pode travar o heartbeat)
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+errorlog = "-"
+accesslog = os.getenv("GUNICORN_ACCESSLOG") or None
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+
+# ==============================
+# HOOKS
+# ==============================
+def when_ready(server):
+    server.log.info("Perfil %s: %d workers × %s (preload=%s, max_requests=%d+%d)",
+                    PERFIL, workers,
+                    f"{threads} threads" if PERFIL == "gthread"
+                    else f"{worker_connections} conexões" if PERFIL == "gevent" else "1 requisição",
+                    preload_app, max_requests, max_requests_jitter)
+
+
+def post_fork(server, worker):
+    server.log.info("Worker %s iniciado", worker.pid)
+
+
+def worker_exit(server, worker):
+    server.log.info("Worker %s encerrado (reciclagem ou parada)", worker.pid)
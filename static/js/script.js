@@ -110,26 +110,20 @@ document.addEventListener('DOMContentLoaded', function () {
             formData.append('email_text', textInput.value);
         }
 
-        // Enviar para o backend
-        fetch('/classify', {
+        // Enviar para o backend: cria um job e acompanha o andamento
+        fetch('/api/jobs', {
             method: 'POST',
             body: formData
         })
-            .then(response => {
-                if (!response.ok) {
-                    throw new Error('Erro na resposta do servidor');
+            .then(response => response.json().then(data => ({ status: response.status, data })))
+            .then(({ status, data }) => {
+                if (status === 429) {
+                    throw new Error(data.error || 'Servidor ocupado. Tente novamente em instantes.');
                 }
-                return response.json();
-            })
-            .then(data => {
-                if (data.success) {
-                    // Redirecionar para página de resultados
-                    window.location.href = `/result?classification=${encodeURIComponent(data.classification)}&response=${encodeURIComponent(data.response)}&content=${encodeURIComponent(data.original_content)}`;
-                } else {
-                    // Finalizar animação com erro
-                    completeProcessing(false);
-                    alert('Erro: ' + data.error);
+                if (!data.success) {
+                    throw new Error(data.error || 'Erro na resposta do servidor');
                 }
+                acompanharJob(data);
             })
             .catch(error => {
                 // Finalizar animação com erro
@@ -138,6 +132,42 @@ document.addEventListener('DOMContentLoaded', function () {
             });
     });
 
+    // Com SSE a página de resultado acompanha o job e mostra a resposta em
+    // streaming; sem suporte, espera o job terminar por polling
+    function acompanharJob(job) {
+        if (window.EventSource) {
+            completeProcessing(true);
+            window.location.href = job.result_url;
+            return;
+        }
+        const concluir = (data) => {
+            if (data.status === 'done') {
+                completeProcessing(true);
+                window.location.href = data.result_url;
+            } else if (data.status === 'error') {
+                completeProcessing(false);
+                alert('Erro: ' + (data.error || 'Falha ao processar o email.'));
+            }
+        };
+
+        consultarJob(job.status_url, concluir);
+    }
+
+    function consultarJob(url, concluir) {
+        fetch(url)
+            .then(response => response.json())
+            .then(data => {
+                if (data.status === 'done' || data.status === 'error') {
+                    concluir(data);
+                } else if (!data.status) {
+                    concluir({ status: 'error', error: data.error });
+                } else {
+                    setTimeout(() => consultarJob(url, concluir), 1000);
+                }
+            })
+            .catch(error => concluir({ status: 'error', error: error.message }));
+    }
+
     // Simular processamento (animação)
     function simulateProcessing() {
         processBtn.disabled = true;
@@ -181,6 +211,8 @@ document.addEventListener('DOMContentLoaded', function () {
 
     // Configuração específica para a página de resultados
     function setupResultsPage() {
+        acompanharResposta();
+
         // Copiar resposta
         const copyButton = document.querySelector('.copy-response');
         if (copyButton) {
@@ -200,6 +232,50 @@ document.addEventListener('DOMContentLoaded', function () {
             });
         }
     }
+    // Resposta em streaming: cada evento 'token' acrescenta um trecho; o
+    // 'status' final traz o texto definitivo, que substitui o que foi mostrado
+    function acompanharResposta() {
+        const responseText = document.querySelector('.response-text.streaming');
+        if (!responseText || !window.EventSource) return;
+
+        const badge = document.querySelector('.classification-badge');
+        const mostrarCategoria = (categoria) => {
+            if (!badge || !categoria) return;
+            badge.textContent = categoria;
+            badge.classList.toggle('productive', categoria === 'Produtivo');
+            badge.classList.toggle('unproductive', categoria !== 'Produtivo');
+        };
+
+        const fonte = new EventSource(responseText.dataset.streamUrl);
+        fonte.addEventListener('token', function (e) {
+            responseText.textContent += JSON.parse(e.data).text;
+        });
+        fonte.addEventListener('status', function (e) {
+            const data = JSON.parse(e.data);
+            mostrarCategoria(data.classification);
+            if (data.status === 'done') {
+                fonte.close();
+                responseText.textContent = data.response;
+                responseText.classList.remove('streaming');
+            } else if (data.status === 'error') {
+                fonte.close();
+                responseText.textContent = 'Erro: ' + (data.error || 'Falha ao processar o email.');
+            }
+        });
+        fonte.onerror = function () {
+            // Conexão caiu: segue o job por polling até terminar (sem recarregar
+            // a página, que reabriria o SSE e poderia falhar de novo)
+            fonte.close();
+            consultarJob(responseText.dataset.statusUrl, function (data) {
+                mostrarCategoria(data.classification);
+                responseText.classList.remove('streaming');
+                responseText.textContent = data.status === 'done'
+                    ? data.response
+                    : 'Erro: ' + (data.error || 'Falha ao processar o email.');
+            });
+        };
+    }
+
     function cleanAIResponse(text) {
         // Remover processo de pensamento da IA se existir
         if (text.includes('Okay, the user wants me to respond') ||
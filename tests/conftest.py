@@ -0,0 +1,39 @@
+"""
+Configuração comum dos testes: nenhum teste fala com a Hugging Face.
+Os que precisam de um upstream usam a fixture `mock_hf` (benchmarks/mock_hf.py).
+Autor: Micaías Viola
+Data: 2025-10-14
+"""
+import os
+
+import pytest
+
+os.environ.setdefault("HF_API_TOKEN", "token-de-teste")
+os.environ.setdefault("CACHE_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+
+@pytest.fixture
+def mock_hf(monkeypatch):
+    """Mock local da Hugging Face com o classificador remoto apontando para ele."""
+    from benchmarks.mock_hf import ConfigMock, ServidorMock
+    from utils import (avaliacao, backends, classifier, fluxo_async, fluxo_email,
+                       hf_response, http_client, inicializacao, limites)
+
+    with ServidorMock(ConfigMock(latencia_ms=1, jitter_ms=0, latencia_token_ms=0)) as mock:
+        variaveis = mock.variaveis_ambiente()
+        for chave, valor in variaveis.items():
+            monkeypatch.setenv(chave, valor)
+        for modulo in (classifier, fluxo_async, fluxo_email, avaliacao, inicializacao):
+            monkeypatch.setattr(modulo, "HF_API_URL", variaveis["HF_API_URL"])
+        monkeypatch.setattr(fluxo_async, "HF_CHAT_URL", variaveis["HF_CHAT_URL"])
+        monkeypatch.setattr(hf_response, "HF_CHAT_BASE_URL", variaveis["HF_CHAT_BASE_URL"])
+        monkeypatch.setattr(backends, "CLASSIFIER_BACKEND", "remoto")
+        monkeypatch.setattr(backends, "_backend", None)
+        # Estado de processo que um teste anterior pode ter deixado para trás
+        for circuito in (http_client.circuito_classificador, http_client.circuito_chat):
+            circuito.registrar_sucesso()
+        orcamento = limites.OrcamentoUpstream(limite=0)
+        for modulo in (limites, classifier, http_client, fluxo_async, fluxo_email):
+            monkeypatch.setattr(modulo, "orcamento_upstream", orcamento)
+        yield mock
@@ -0,0 +1,50 @@
+"""Endpoint /api/classify/batch contra o mock da Hugging Face."""
+import math
+
+import pytest
+
+import app as aplicacao
+from utils.classifier import BATCH_SIZE
+
+
+@pytest.fixture
+def cliente():
+    return aplicacao.app.test_client()
+
+
+def _emails(n):
+    return [f"Precisamos revisar o contrato {i} e agendar a reunião do projeto"
+            for i in range(n)]
+
+
+def test_lote_agrupa_as_chamadas_e_mantem_a_ordem(cliente, mock_hf):
+    emails = _emails(BATCH_SIZE + 2)
+    emails.insert(3, "oi")  # decidido pela heurística, não vai à IA
+
+    resposta = cliente.post("/api/classify/batch", json={"emails": emails})
+
+    assert resposta.status_code == 200
+    corpo = resposta.get_json()
+    assert len(corpo["results"]) == len(emails)
+    assert corpo["results"][3]["origin"] == "heuristica"
+    origens = {r["origin"] for i, r in enumerate(corpo["results"]) if i != 3}
+    assert origens <= {"modelo", "fallback"}
+    assert mock_hf.config.requisicoes == math.ceil((len(emails) - 1) / BATCH_SIZE)
+    # Os lotes rodam em threads do pool, mas o tempo do modelo entra no header
+    assert "zero-shot;dur=" in resposta.headers["Server-Timing"]
+
+
+@pytest.mark.parametrize("payload", [
+    {},
+    {"emails": []},
+    {"emails": "não é lista"},
+    {"emails": ["texto", 42]},
+])
+def test_lote_invalido_retorna_400(cliente, payload):
+    assert cliente.post("/api/classify/batch", json=payload).status_code == 400
+
+
+def test_lote_acima_do_maximo_retorna_400(cliente, monkeypatch):
+    monkeypatch.setitem(aplicacao.app.config, "BATCH_MAX_ITEMS", 3)
+    resposta = cliente.post("/api/classify/batch", json={"emails": _emails(4)})
+    assert resposta.status_code == 400
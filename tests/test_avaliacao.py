@@ -0,0 +1,92 @@
+"""Avaliação offline dos estágios do classificador (utils/avaliacao.py)."""
+import json
+
+import pytest
+
+from utils.avaliacao import (
+    CacheScores, avaliar, carregar_rotulados, coletar, decidir, faixa, varrer
+)
+from utils.classifier import CANDIDATE_LABELS
+
+PRODUTIVO, IMPRODUTIVO = CANDIDATE_LABELS[0], CANDIDATE_LABELS[-1]
+
+
+def _registro(rotulo, decisao=None, estagio=None, label=None, scores=None, fallback="Produtivo"):
+    return {
+        "id": rotulo, "rotulo": rotulo, "decisao": decisao, "estagio": estagio,
+        "categoria_fallback": None if decisao else fallback,
+        "resultado": label and {"labels": [label, "outro"], "scores": scores},
+        "tempo_filtro_ms": 1.0, "tempo_modelo_ms": 0.0 if decisao else 100.0, "em_cache": False,
+    }
+
+
+REGISTROS = [
+    _registro("Improdutivo", decisao="Improdutivo", estagio="short"),
+    _registro("Produtivo", label=PRODUTIVO, scores=[0.9, 0.1]),
+    _registro("Improdutivo", label=IMPRODUTIVO, scores=[0.55, 0.45]),
+    _registro("Produtivo"),  # modelo falhou
+]
+
+
+def test_decidir_segue_a_regra_do_classificador():
+    assert decidir(REGISTROS[0], 0.5, 0.1) == ("Improdutivo", "short")
+    assert decidir(REGISTROS[1], 0.5, 0.1) == ("Produtivo", "model")
+    assert decidir(REGISTROS[2], 0.5, 0.2) == ("Produtivo", "low_confidence_fallback")
+    assert decidir(REGISTROS[2], 0.5, 0.05) == ("Improdutivo", "model")
+    assert decidir(REGISTROS[3], 0.5, 0.1) == ("Produtivo", "api_error")
+
+
+def test_avaliar_matriz_e_estagios():
+    resultado = avaliar(REGISTROS, limiar=0.5, margem=0.2)
+
+    assert resultado["matriz_confusao"]["Improdutivo"] == {"Produtivo": 1, "Improdutivo": 1}
+    assert resultado["acuracia"] == 0.75
+    assert resultado["precisao_produtivo"] == round(2 / 3, 4)
+    assert resultado["recall_produtivo"] == 1.0
+    assert resultado["chamadas_modelo"] == 0.75
+    assert resultado["estagios"]["model"]["n"] == 1
+    assert resultado["estagios"]["short"]["p50_ms"] == 1.0
+
+
+def test_faixa_inclui_as_pontas():
+    assert faixa(0.5, 0.7, 0.1) == [0.5, 0.6, 0.7]
+    assert faixa(0.3, 0.3, 0.1) == [0.3]
+
+
+def test_varrer_marca_a_fronteira_de_pareto():
+    pontos = {(p["limiar"], p["margem"]): p for p in varrer(REGISTROS, [0.5], [0.05, 0.2])}
+    # Margem menor: modelo decide mais e acerta mais → domina a outra
+    assert pontos[(0.5, 0.05)]["pareto"]
+    assert not pontos[(0.5, 0.2)]["pareto"]
+
+
+def test_carregar_rotulados_jsonl(tmp_path):
+    arquivo = tmp_path / "corpus.jsonl"
+    arquivo.write_text(
+        json.dumps({"id": "a", "rotulo": "Produtivo", "email_content": "texto"}) + "\n\n"
+        + json.dumps({"label": "Improdutivo", "texto": "oi"}) + "\n", encoding="utf-8")
+    assert carregar_rotulados(str(arquivo)) == [
+        {"id": "a", "rotulo": "Produtivo", "texto": "texto"},
+        {"id": "3", "rotulo": "Improdutivo", "texto": "oi"},
+    ]
+
+    arquivo.write_text(json.dumps({"rotulo": "Talvez", "texto": "x"}) + "\n", encoding="utf-8")
+    with pytest.raises(ValueError):
+        carregar_rotulados(str(arquivo))
+
+
+def test_coletar_consulta_o_modelo_uma_vez_por_texto(mock_hf, tmp_path):
+    exemplos = [
+        {"id": "1", "rotulo": "Produtivo",
+         "texto": "Precisamos revisar o contrato e agendar a reunião do projeto"},
+        {"id": "2", "rotulo": "Improdutivo", "texto": "oi"},
+    ]
+    cache = CacheScores(str(tmp_path / "scores.sqlite"), modelo="mock")
+
+    primeira = coletar(exemplos, cache)
+    segunda = coletar(exemplos, cache)
+
+    assert primeira[0]["resultado"] is not None and not primeira[0]["em_cache"]
+    assert segunda[0]["em_cache"] and segunda[0]["resultado"] == primeira[0]["resultado"]
+    assert primeira[1]["estagio"] == "short"
+    assert mock_hf.config.requisicoes == 1
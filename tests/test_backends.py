@@ -0,0 +1,59 @@
+"""Seleção do backend do classificador (utils/backends.py)."""
+import threading
+
+import pytest
+
+from utils import backends
+
+
+@pytest.fixture
+def backend_limpo(monkeypatch):
+    """Cada teste escolhe o backend do zero."""
+    monkeypatch.setattr(backends, "_backend", None)
+    monkeypatch.setattr(backends, "_backend_embedding", None)
+    return monkeypatch
+
+
+def _obter_com_prazo(url="http://hf.local", prazo=5):
+    """obter_backend numa thread: um deadlock vira falha em vez de travar o pytest."""
+    resultado = {}
+    thread = threading.Thread(
+        target=lambda: resultado.setdefault("backend", backends.obter_backend(url)), daemon=True)
+    thread.start()
+    thread.join(prazo)
+    assert not thread.is_alive(), "obter_backend travou"
+    return resultado["backend"]
+
+
+@pytest.mark.parametrize("nome, classe", [
+    ("remoto", backends.BackendRemoto),
+    ("local", backends.BackendLocal),
+    ("embedding", backends.BackendEmbedding),
+])
+def test_seleciona_cada_backend(backend_limpo, nome, classe):
+    backend_limpo.setattr(backends, "CLASSIFIER_BACKEND", nome)
+    backend = _obter_com_prazo()
+    assert isinstance(backend, classe)
+    assert backends.obter_backend() is backend
+
+
+def test_embedding_reaproveita_o_backend_do_modo_rapido(backend_limpo):
+    backend_limpo.setattr(backends, "CLASSIFIER_BACKEND", "embedding")
+    assert _obter_com_prazo() is backends.obter_backend_embedding()
+
+
+def test_backend_invalido(backend_limpo):
+    backend_limpo.setattr(backends, "CLASSIFIER_BACKEND", "gpu")
+    with pytest.raises(ValueError):
+        backends.obter_backend()
+
+
+@pytest.mark.parametrize("classe", [backends.BackendLocal, backends.BackendEmbedding])
+def test_erro_do_modelo_vira_none(monkeypatch, classe):
+    backend = classe()
+
+    def quebra(*args, **kwargs):
+        raise OSError("modelo não encontrado")
+
+    monkeypatch.setattr(backend, "_classificar", quebra)
+    assert backend.classificar(["a", "b"], ["x", "y"]) == [None, None]
@@ -0,0 +1,87 @@
+"""Ferramentas de benchmark: mock da Hugging Face, corpus, resumo e comparação."""
+import json
+import urllib.error
+import urllib.request
+
+from benchmarks.comparar import comparar
+from benchmarks.comum import percentil, resumir
+from benchmarks.corpus import gerar_corpus
+from benchmarks.loadtest import medir_carga
+from benchmarks.mock_hf import ConfigMock, ServidorMock
+
+
+def _post(url: str, corpo: dict):
+    requisicao = urllib.request.Request(
+        url, data=json.dumps(corpo).encode(), headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(requisicao, timeout=5) as resposta:
+            return resposta.status, json.loads(resposta.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_mock_zero_shot_deterministico_e_em_lote():
+    with ServidorMock(ConfigMock(latencia_ms=0, jitter_ms=0)) as mock:
+        url = mock.variaveis_ambiente()["HF_API_URL"]
+        corpo = {"inputs": "texto", "parameters": {"candidate_labels": ["a", "b", "c"]}}
+        _, primeiro = _post(url, corpo)
+        _, segundo = _post(url, corpo)
+        _, lote = _post(url, dict(corpo, inputs=["texto", "outro"]))
+
+    assert primeiro == segundo
+    assert sorted(primeiro["labels"]) == ["a", "b", "c"]
+    assert abs(sum(primeiro["scores"]) - 1) < 1e-9
+    assert lote[0] == primeiro and len(lote) == 2
+    assert mock.config.requisicoes == 3
+
+
+def test_mock_simula_modelo_carregando():
+    with ServidorMock(ConfigMock(latencia_ms=0, jitter_ms=0, taxa_503=1.0,
+                                 tempo_estimado=7)) as mock:
+        status, corpo = _post(mock.url + "/zero-shot", {"inputs": "x"})
+    assert status == 503
+    assert corpo["estimated_time"] == 7
+
+
+def test_mock_chat_completion():
+    with ServidorMock(ConfigMock(latencia_ms=0, jitter_ms=0)) as mock:
+        status, corpo = _post(mock.variaveis_ambiente()["HF_CHAT_URL"],
+                              {"model": "m", "messages": []})
+    assert status == 200
+    assert "Atenciosamente" in corpo["choices"][0]["message"]["content"]
+
+
+def test_percentis_e_resumo():
+    assert percentil([], 95) == 0.0
+    valores = list(range(1, 101))
+    assert percentil(valores, 50) == 50
+    assert percentil(valores, 99) == 99
+    resumo = resumir([3.0, 1.0, 2.0])
+    assert (resumo["n"], resumo["p50_ms"], resumo["max_ms"]) == (3, 2.0, 3.0)
+
+
+def test_corpus_reprodutivel_pela_semente():
+    exemplos = [("Produtivo", "Olá\nPreciso do relatório\nda reunião\nObrigado")]
+    assert gerar_corpus(5, 1, exemplos) == gerar_corpus(5, 1, exemplos)
+    assert [c["id"] for c in gerar_corpus(3, 1, exemplos)] == [
+        "sintetico-0", "sintetico-1", "sintetico-2"]
+
+
+def test_medir_carga_conta_erros():
+    def chamar(texto):
+        if texto == "falha":
+            raise RuntimeError(texto)
+
+    resultado = medir_carga(chamar, ["ok", "falha", "ok"], concorrencia=2)
+    assert (resultado["n"], resultado["erros"]) == (3, 1)
+
+
+def test_comparar_aponta_regressao_e_queda_de_vazao():
+    base = {"resultados": [{"alvo": "flask", "p95_ms": 100, "req_por_s": 50}]}
+    atual = {"resultados": [{"alvo": "flask", "p95_ms": 130, "req_por_s": 40}]}
+
+    [(_, _, _, variacao, regrediu)] = comparar(base, atual, "p95_ms", 0.15)
+    assert regrediu and round(variacao, 2) == 0.3
+
+    [(_, _, _, variacao, regrediu)] = comparar(base, atual, "req_por_s", 0.15)
+    assert regrediu and round(variacao, 2) == 0.2
@@ -0,0 +1,82 @@
+"""Cache endereçado por conteúdo (utils/cache.py)."""
+import sqlite3
+
+from utils.cache import CacheLRU, CacheResultados, CacheSQLite, caminho_sqlite, chave_cache
+
+
+def test_chave_ignora_espacos_e_separa_modelo_e_versao():
+    base = chave_cache("Olá,   mundo\n", "modelo-a", "v1")
+    assert base == chave_cache("  Olá, mundo", "modelo-a", "v1")
+    assert base != chave_cache("Olá, mundo", "modelo-b", "v1")
+    assert base != chave_cache("Olá, mundo", "modelo-a", "v2")
+
+
+def test_lru_descarta_o_menos_usado():
+    cache = CacheLRU(max_itens=2, ttl=60)
+    cache.guardar("a", 1)
+    cache.guardar("b", 2)
+    cache.obter("a")
+    cache.guardar("c", 3)
+    assert cache.obter("b") is None
+    assert (cache.obter("a"), cache.obter("c")) == (1, 3)
+
+
+def test_lru_expira_pelo_ttl():
+    cache = CacheLRU(max_itens=10, ttl=60)
+    cache.guardar("a", 1, ttl=-1)
+    assert cache.obter("a") is None
+    assert len(cache) == 0
+
+
+def test_disco_e_compartilhado_e_promove_para_memoria(tmp_path):
+    caminho = str(tmp_path / "cache.sqlite3")
+    escritor = CacheResultados(CacheLRU(), CacheSQLite(caminho))
+    leitor = CacheResultados(CacheLRU(), CacheSQLite(caminho))  # outro "worker"
+
+    escritor.guardar("k", {"categoria": "Produtivo"})
+    assert leitor.obter("k") == {"categoria": "Produtivo"}
+    assert leitor.obter("k") == {"categoria": "Produtivo"}
+
+    stats = leitor.estatisticas()
+    assert (stats["hits_disco"], stats["hits_memoria"], stats["misses"]) == (1, 1, 0)
+    assert stats["taxa_acerto"] == 1.0
+
+
+def test_disco_respeita_expiracao(tmp_path):
+    disco = CacheSQLite(str(tmp_path / "cache.sqlite3"))
+    disco.guardar("k", "v", ttl=-1)
+    assert disco.obter("k") is None
+
+
+def test_cache_inativo_nao_guarda_nem_conta():
+    cache = CacheResultados(CacheLRU(), ativo=False)
+    cache.guardar("k", "v")
+    assert cache.obter("k") is None
+    assert cache.estatisticas()["escritas"] == 0
+
+
+def test_caminho_sqlite(monkeypatch):
+    monkeypatch.delenv("X_SQLITE_PATH", raising=False)
+    assert caminho_sqlite("X_SQLITE_PATH", "x.sqlite3").endswith("x.sqlite3")
+    monkeypatch.setenv("X_SQLITE_PATH", "")
+    assert caminho_sqlite("X_SQLITE_PATH", "x.sqlite3") is None
+    monkeypatch.setenv("X_SQLITE_PATH", "/var/lib/x.db")
+    assert caminho_sqlite("X_SQLITE_PATH", "x.sqlite3") == "/var/lib/x.db"
+
+
+def test_disco_apaga_expirados_ao_abrir_e_a_cada_n_gravacoes(tmp_path):
+    caminho = str(tmp_path / "cache.sqlite3")
+
+    def linhas():
+        return sqlite3.connect(caminho).execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    disco = CacheSQLite(caminho, limpar_a_cada=3)
+    disco.guardar("velha", "v", ttl=-1)
+    disco.guardar("nova", "v")
+    assert linhas() == 2
+    disco.guardar("outra", "v")  # 3ª gravação → limpeza
+    assert linhas() == 2
+
+    disco.guardar("velha", "v", ttl=-1)
+    CacheSQLite(caminho)  # outro worker abrindo o arquivo
+    assert linhas() == 2
@@ -0,0 +1,58 @@
+"""Classificação (utils/classifier.py): lote, heurísticas e fallback."""
+import pytest
+
+from utils import classifier, limites
+
+
+class BackendFalso:
+    nome = "falso"
+
+    def __init__(self, resultado=None, erro=None):
+        self.resultado = resultado
+        self.erro = erro
+        self.chamadas = []
+
+    def classificar(self, textos, labels):
+        self.chamadas.append(list(textos))
+        if self.erro is not None:
+            raise self.erro
+        return [self.resultado and dict(self.resultado, sequence=t) for t in textos]
+
+
+PRODUTIVO = {"labels": classifier.CANDIDATE_LABELS, "scores": [0.9] + [0.1 / 6] * 6}
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    def usar(falso):
+        monkeypatch.setattr(classifier, "obter_backend", lambda *a, **k: falso)
+        monkeypatch.setattr(classifier, "orcamento_upstream", limites.OrcamentoUpstream(limite=0))
+        return falso
+    return usar
+
+
+def test_lote_preserva_a_ordem_e_a_heuristica(backend):
+    falso = backend(BackendFalso(PRODUTIVO))
+    resultados = classifier.classificar_emails([
+        "Precisamos revisar o contrato e agendar a reunião do projeto",
+        "oi",
+        "Clique aqui para resgatar seu prêmio e confirme sua senha",
+    ])
+    assert [r["origem"] for r in resultados] == ["modelo", "heuristica", "heuristica"]
+    assert resultados[0]["categoria"] == "Produtivo"
+    assert len(falso.chamadas) == 1
+
+
+def test_lote_com_erro_do_backend_usa_fallback(backend):
+    backend(BackendFalso(erro=RuntimeError("falhou")))
+    resultados = classifier.classificar_emails(
+        ["Precisamos revisar o contrato e agendar a reunião do projeto"])
+    assert resultados[0]["origem"] == "erro_api"
+
+
+def test_backend_sem_resultado_usa_fallback(backend):
+    backend(BackendFalso(None))
+    detalhe = classifier.classificar_email_detalhado(
+        "Precisamos revisar o contrato e agendar a reunião do projeto")
+    assert detalhe["origem"] == "erro_api"
+    assert detalhe["categoria"] == "Produtivo"
@@ -0,0 +1,80 @@
+"""Linha de comando (cli.py): ingestão com checkpoint e retomada."""
+import json
+
+import cli
+
+
+def _fonte(tmp_path, quantidade):
+    caminho = tmp_path / "emails.jsonl"
+    caminho.write_text("".join(json.dumps({"id": n, "body": "oi"}) + "\n" for n in range(quantidade)),
+                       encoding="utf-8")
+    return str(caminho)
+
+
+def _ids(caminho):
+    with open(caminho, encoding="utf-8") as f:
+        return [json.loads(linha)["id"] for linha in f]
+
+
+def test_ingerir_grava_na_ordem_da_fonte(tmp_path):
+    saida = str(tmp_path / "saida.jsonl")
+    assert cli.main(["ingerir", _fonte(tmp_path, 5), "-o", saida, "--workers", "2"]) == 0
+    assert _ids(saida) == ["0", "1", "2", "3", "4"]
+
+
+def test_retomar_continua_do_checkpoint(tmp_path, monkeypatch):
+    fonte = _fonte(tmp_path, 5)
+    saida = str(tmp_path / "saida.jsonl")
+    cli.main(["ingerir", fonte, "-o", saida])
+    # Simula uma execução interrompida depois de 2 itens
+    with open(saida, "rb") as f:
+        linhas = f.readlines()
+    with open(saida + ".checkpoint", "w", encoding="utf-8") as f:
+        json.dump({"processados": 2, "offset": len(b"".join(linhas[:2]))}, f)
+
+    processados = []
+    original = cli.processar_item
+    monkeypatch.setattr(cli, "processar_item",
+                        lambda ident, carregar, modo: processados.append(ident) or original(ident, carregar, modo))
+    assert cli.main(["ingerir", fonte, "-o", saida, "--retomar"]) == 0
+    assert processados == ["2", "3", "4"]
+    assert _ids(saida) == ["0", "1", "2", "3", "4"]
+
+
+def _registros(caminho):
+    with open(caminho, encoding="utf-8") as f:
+        return [json.loads(linha) for linha in f]
+
+
+def test_item_corrompido_vira_erro_sem_parar_a_ingestao(tmp_path, monkeypatch):
+    from utils import email_processor
+
+    monkeypatch.setattr(email_processor, "PDF_ENGINE", "pypdf")
+    pasta = tmp_path / "emails"
+    pasta.mkdir()
+    (pasta / "a.txt").write_text("Reunião do projeto amanhã às 10h", encoding="utf-8")
+    (pasta / "b.pdf").write_bytes(b"%PDF-1.4\nisto nao e um pdf")
+    (pasta / "c.txt").write_text("oi", encoding="utf-8")
+    saida = str(tmp_path / "saida.jsonl")
+
+    assert cli.main(["ingerir", str(pasta), "-o", saida]) == 0
+
+    registros = _registros(saida)
+    assert [r["id"] for r in registros] == ["a.txt", "b.pdf", "c.txt"]
+    assert registros[1]["erro"] and registros[1]["categoria"] is None
+    assert registros[0]["erro"] is None and registros[2]["erro"] is None
+    with open(saida + ".checkpoint", encoding="utf-8") as f:
+        assert json.load(f)["processados"] == 3
+
+
+def test_linha_jsonl_invalida_vira_erro(tmp_path):
+    fonte = tmp_path / "emails.jsonl"
+    fonte.write_text('{"id": "a", "body": "oi"}\n{"id": quebrado\n[1, 2]\n{"id": "d", "body": "oi"}\n',
+                     encoding="utf-8")
+    saida = str(tmp_path / "saida.jsonl")
+
+    assert cli.main(["ingerir", str(fonte), "-o", saida]) == 0
+
+    registros = _registros(saida)
+    assert [r["id"] for r in registros] == ["a", "2", "3", "d"]
+    assert [bool(r["erro"]) for r in registros] == [False, True, True, False]
@@ -0,0 +1,79 @@
+"""Extração de texto de PDF (utils/email_processor.py)."""
+import io
+
+import pytest
+
+from utils import email_processor
+from utils.email_processor import extract_text_from_pdf, iterar_paginas_pdf
+
+
+def _pdf(paginas: list) -> bytes:
+    """PDF mínimo, uma linha de texto por página."""
+    n = len(paginas)
+    objetos = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            " ".join(f"{3 + 2 * i} 0 R" for i in range(n)), n),
+    ]
+    for i, texto in enumerate(paginas):
+        conteudo = f"BT /F1 12 Tf 72 720 Td ({texto}) Tj ET"
+        objetos.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {3 + 2 * n} 0 R >> >> >>")
+        objetos.append(f"<< /Length {len(conteudo)} >>\nstream\n{conteudo}\nendstream")
+    objetos.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    saida = io.BytesIO()
+    saida.write(b"%PDF-1.4\n")
+    posicoes = []
+    for numero, objeto in enumerate(objetos, start=1):
+        posicoes.append(saida.tell())
+        saida.write(f"{numero} 0 obj\n{objeto}\nendobj\n".encode("latin-1"))
+    inicio_xref = saida.tell()
+    saida.write(f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode())
+    for posicao in posicoes:
+        saida.write(f"{posicao:010d} 00000 n \n".encode())
+    saida.write(f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\n"
+                f"startxref\n{inicio_xref}\n%%EOF\n".encode())
+    return saida.getvalue()
+
+
+@pytest.fixture
+def motor_falso(monkeypatch):
+    """Motor que conta quantas páginas foram realmente lidas."""
+    lidas = []
+
+    def paginas(fonte):
+        for i in range(100):
+            lidas.append(i)
+            yield "x" * 100
+
+    monkeypatch.setitem(email_processor.MOTORES_PDF, "falso", paginas)
+    return lidas
+
+
+def test_orcamento_para_de_ler_paginas(motor_falso):
+    texto = extract_text_from_pdf(b"%PDF-", max_chars=250, motor="falso")
+    assert len(texto) == 250
+    assert len(motor_falso) == 3
+
+
+def test_sem_orcamento_le_tudo(motor_falso):
+    extract_text_from_pdf(b"%PDF-", max_chars=0, motor="falso")
+    assert len(motor_falso) == 100
+
+
+def test_motor_invalido():
+    with pytest.raises(ValueError):
+        extract_text_from_pdf(b"%PDF-", motor="inexistente")
+
+
+@pytest.mark.parametrize("limite_memoria", [1024 * 1024, 16])
+def test_extrai_com_pypdf_em_memoria_e_mapeado(monkeypatch, limite_memoria):
+    pytest.importorskip("pypdf")
+    monkeypatch.setattr(email_processor, "PDF_SPOOL_MAX_MEMORIA", limite_memoria)
+    dados = _pdf(["Primeira pagina", "Segunda pagina"])
+
+    paginas = list(iterar_paginas_pdf(io.BytesIO(dados), motor="pypdf"))
+
+    assert [p.strip() for p in paginas] == ["Primeira pagina", "Segunda pagina"]
@@ -0,0 +1,62 @@
+"""Fluxo assíncrono (utils/fluxo_async.py) e a entrada ASGI (asgi.py)."""
+import asyncio
+
+import pytest
+from starlette.testclient import TestClient
+
+from utils import fluxo_async
+
+PRODUTIVO = "Precisamos revisar o contrato e agendar a reunião do projeto com o cliente"
+
+
+@pytest.fixture
+def cliente_asgi(mock_hf):
+    import asgi
+    with TestClient(asgi.app) as cliente:
+        yield cliente
+
+
+def test_classify_assincrono_de_ponta_a_ponta(cliente_asgi, mock_hf):
+    resposta = cliente_asgi.post("/api/classify", json={"email_content": PRODUTIVO})
+
+    assert resposta.status_code == 200
+    corpo = resposta.json()
+    assert corpo["success"] is True
+    assert corpo["classification"] in {"Produtivo", "Improdutivo"}
+    assert corpo["response"]
+    assert corpo["reply_tier"] in {"template", "approved", "cache", "llm", "fallback"}
+    assert "Server-Timing" in resposta.headers
+    assert mock_hf.config.requisicoes >= 1
+
+
+def test_classify_assincrono_sem_conteudo_retorna_400(cliente_asgi):
+    assert cliente_asgi.post("/api/classify", json={"email_content": "  "}).status_code == 400
+    assert cliente_asgi.post("/api/classify", content=b"nao-json").status_code == 400
+
+
+def test_especulacao_descartada_quando_a_ia_diz_improdutivo(monkeypatch):
+    monkeypatch.setattr(fluxo_async, "ESPECULACAO_MIN_TERMOS", 1)
+    cancelada = asyncio.Event()
+
+    async def gerar_lento(cliente, texto, categoria):
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            cancelada.set()
+            raise
+
+    async def classificar(cliente, texto, heuristica):
+        await asyncio.sleep(0)
+        return {"categoria": "Improdutivo", "origem": "modelo", "subrotulo": "pessoal",
+                "score": 0.9}
+
+    monkeypatch.setattr(fluxo_async, "gerar_resposta_chat_async", gerar_lento)
+    monkeypatch.setattr(fluxo_async, "_classificar_com_modelo", classificar)
+    monkeypatch.setattr(fluxo_async, "resposta_rapida",
+                        lambda texto, detalhe: ("resposta pronta", "template"))
+
+    resultado = asyncio.run(fluxo_async.processar_email_com_resposta_async(None, PRODUTIVO))
+
+    assert cancelada.is_set()
+    assert resultado["categoria"] == "Improdutivo"
+    assert resultado["resposta"] == "resposta pronta"
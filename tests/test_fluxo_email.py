@@ -0,0 +1,45 @@
+"""Fluxo completo (utils/fluxo_email.py): chaves de cache da classificação e da resposta."""
+import pytest
+
+from utils import backends
+from utils.fluxo_email import chave_classificacao, chave_resposta
+
+
+@pytest.fixture
+def trocar_backend(monkeypatch):
+    def trocar(nome):
+        monkeypatch.setattr(backends, "_backend", None)
+        monkeypatch.setattr(backends, "_backend_embedding", None)
+        monkeypatch.setattr(backends, "CLASSIFIER_BACKEND", nome)
+    return trocar
+
+
+def test_chave_muda_com_o_backend(trocar_backend):
+    chaves = set()
+    for nome in ("remoto", "local", "embedding"):
+        trocar_backend(nome)
+        chaves.add(chave_classificacao("Segue o relatório de vendas"))
+    assert len(chaves) == 3
+
+
+def test_chave_estavel_para_o_mesmo_texto(trocar_backend):
+    trocar_backend("remoto")
+    assert chave_classificacao("Olá,  equipe") == chave_classificacao("Olá, equipe")
+
+
+def test_chave_muda_com_o_preprocessamento(trocar_backend, monkeypatch):
+    from utils import preprocessamento
+
+    trocar_backend("remoto")
+    antes = chave_classificacao("Segue o relatório de vendas")
+    monkeypatch.setattr(preprocessamento, "PREPROC_VERSAO", "teste")
+    assert chave_classificacao("Segue o relatório de vendas") != antes
+
+
+def test_chave_da_resposta_muda_com_o_preprocessamento(monkeypatch):
+    from utils import preprocessamento
+
+    antes = chave_resposta("Segue o relatório de vendas", "Produtivo")
+    assert antes != chave_resposta("Segue o relatório de vendas", "Improdutivo")
+    monkeypatch.setattr(preprocessamento, "PREPROC_VERSAO", "teste")
+    assert chave_resposta("Segue o relatório de vendas", "Produtivo") != antes
@@ -0,0 +1,113 @@
+"""Perfis do gunicorn (gunicorn.conf.py) e a reciclagem do worker gthread."""
+import json
+import logging
+import os
+import selectors
+import socket
+import subprocess
+import sys
+import threading
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LER_CONFIG = (
+    "import json, os, runpy; c = runpy.run_path('gunicorn.conf.py'); "
+    "print(json.dumps({k: c[k] for k in ('worker_class', 'workers', 'threads', 'preload_app')} "
+    "| {'WARMUP': os.environ.get('WARMUP')}))"
+)
+
+
+def _config(**variaveis):
+    ambiente = {k: v for k, v in os.environ.items()
+                if not k.startswith(("GUNICORN_", "WEB_CONCURRENCY", "WARMUP"))}
+    ambiente.update(variaveis)
+    saida = subprocess.run([sys.executable, "-c", LER_CONFIG], cwd=RAIZ, env=ambiente,
+                           capture_output=True, text=True)
+    if saida.returncode:
+        raise RuntimeError(saida.stderr.strip().splitlines()[-1])
+    return json.loads(saida.stdout)
+
+
+def test_perfil_padrao_gthread_com_preload():
+    config = _config()
+    assert config["worker_class"] == "utils.worker_gunicorn.ThreadWorkerGracioso"
+    assert config["workers"] == os.cpu_count()
+    assert config["threads"] == 32
+    assert config["preload_app"] and config["WARMUP"] == "import"
+
+
+def test_perfil_sync_e_web_concurrency():
+    assert _config(GUNICORN_PERFIL="sync")["workers"] == 2 * os.cpu_count() + 1
+    assert _config(GUNICORN_PERFIL="sync", WEB_CONCURRENCY="3")["workers"] == 3
+    assert _config(GUNICORN_PRELOAD="false")["WARMUP"] is None
+
+
+def test_perfil_invalido():
+    with pytest.raises(RuntimeError, match="GUNICORN_PERFIL"):
+        _config(GUNICORN_PERFIL="eventlet")
+
+
+def test_store_so_em_memoria_com_varios_workers():
+    with pytest.raises(RuntimeError, match="JOBS_SQLITE_PATH"):
+        _config(WEB_CONCURRENCY="2", JOBS_SQLITE_PATH="")
+    assert _config(WEB_CONCURRENCY="1", JOBS_SQLITE_PATH="")["workers"] == 1
+
+
+class ConexaoFalsa:
+    def __init__(self, sock):
+        self.sock = sock
+        self.timeout = float("inf")
+        self.fechada = False
+
+    def close(self):
+        self.fechada = True
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    pytest.importorskip("gunicorn")
+    from gunicorn.config import Config
+    from gunicorn.workers.gthread import ThreadWorker
+
+    from utils.worker_gunicorn import ThreadWorkerGracioso
+
+    monkeypatch.setattr(ThreadWorker, "handle_request", lambda self, req, conn: True)
+    cfg = Config()
+    cfg.set("max_requests", 3)
+    cfg.set("max_requests_jitter", 0)
+    escuta, cliente = socket.socketpair()
+    w = ThreadWorkerGracioso(0, os.getpid(), [escuta], None, 30, cfg, logging.getLogger("teste"))
+    w.poller = selectors.DefaultSelector()
+    w.poller.register(escuta, selectors.EVENT_READ)
+    w._lock = threading.RLock()
+    yield w
+    w.poller.close()
+    escuta.close()
+    cliente.close()
+    w.tmp.close()
+
+
+def test_worker_drena_em_vez_de_sair_no_limite(worker):
+    ociosa = ConexaoFalsa(socket.socket())
+    worker._keep.append(ociosa)
+    worker.nr_conns = 2  # a ociosa + a que está sendo atendida
+
+    worker.nr = 1
+    worker.handle_request(None, None)
+    assert worker._drenando_desde is None
+
+    worker.nr = 2
+    worker.handle_request(None, None)
+    assert worker._drenando_desde is not None
+    assert worker.max_keepalived == 0
+    assert not worker.poller.get_map()  # não aceita mais conexões
+
+    worker.murder_keepalived()
+    assert ociosa.fechada
+    assert worker.alive  # ainda há uma conexão em atendimento
+
+    worker.nr_conns = 0
+    worker.murder_keepalived()
+    assert not worker.alive
+    ociosa.sock.close()
@@ -0,0 +1,100 @@
+"""Retentativas e circuit breaker (utils/http_client.py)."""
+import asyncio
+
+import pytest
+
+from utils import http_client
+from utils.http_client import (
+    CircuitBreaker, CircuitoAberto, calcular_espera, executar_com_retry,
+    executar_com_retry_async
+)
+
+
+class RespostaFalsa:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return {}
+
+
+@pytest.fixture(autouse=True)
+def sem_espera(monkeypatch):
+    monkeypatch.setattr(http_client.time, "sleep", lambda segundos: None)
+
+
+def _circuito_meio_aberto() -> CircuitBreaker:
+    circuito = CircuitBreaker("teste", limite_falhas=1, tempo_reset=0)
+    circuito.registrar_falha()
+    assert circuito.estado == "meio-aberto"
+    return circuito
+
+
+def test_circuito_abre_apos_falhas():
+    circuito = CircuitBreaker("teste", limite_falhas=2, tempo_reset=60)
+    chamada = lambda: RespostaFalsa(503)  # noqa: E731
+    with pytest.raises(http_client.FalhaUpstream):
+        executar_com_retry(chamada, circuito, max_tentativas=2)
+    with pytest.raises(CircuitoAberto):
+        executar_com_retry(chamada, circuito)
+
+
+def test_sucesso_no_meio_aberto_fecha_o_circuito():
+    circuito = _circuito_meio_aberto()
+    executar_com_retry(lambda: RespostaFalsa(200), circuito)
+    assert circuito.estado == "fechado"
+
+
+def test_cancelamento_no_meio_aberto_libera_o_teste():
+    circuito = _circuito_meio_aberto()
+
+    async def cenario():
+        async def lenta():
+            await asyncio.sleep(10)
+
+        tarefa = asyncio.create_task(executar_com_retry_async(lenta, circuito))
+        await asyncio.sleep(0)
+        tarefa.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await tarefa
+
+    asyncio.run(cenario())
+    assert circuito.permitir()
+
+
+def test_erro_qualquer_no_async_conta_falha_e_repete(monkeypatch):
+    monkeypatch.setattr(http_client, "calcular_espera", lambda tentativa, resposta=None: 0)
+    circuito = CircuitBreaker("teste", limite_falhas=2, tempo_reset=60)
+    tentativas = []
+
+    async def corpo_invalido():
+        tentativas.append(1)
+        raise ValueError("JSON inválido")
+
+    with pytest.raises(http_client.FalhaUpstream):
+        asyncio.run(executar_com_retry_async(corpo_invalido, circuito, max_tentativas=2))
+    assert len(tentativas) == 2
+    assert circuito.estado == "aberto"
+
+
+def test_erro_qualquer_no_meio_aberto_reabre_o_circuito():
+    circuito = _circuito_meio_aberto()
+    circuito.tempo_reset = 60
+
+    async def quebra():
+        raise KeyError("inesperado")
+
+    with pytest.raises(http_client.FalhaUpstream):
+        asyncio.run(executar_com_retry_async(quebra, circuito, max_tentativas=1))
+    assert circuito.estado == "aberto"
+
+
+def test_retry_after_em_segundos():
+    assert calcular_espera(0, RespostaFalsa(429, {"Retry-After": "3"})) == 3
+
+
+def test_retry_after_malformado_usa_backoff(monkeypatch):
+    monkeypatch.setattr(http_client, "HTTP_BACKOFF_BASE", 1.0)
+    espera = calcular_espera(1, RespostaFalsa(429, {"Retry-After": "amanhã cedo"}))
+    assert 0 <= espera <= 2
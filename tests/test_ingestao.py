@@ -0,0 +1,77 @@
+"""Leitura de caixas de email (utils/ingestao.py)."""
+import json
+
+import pytest
+
+from utils import ingestao
+from utils.ingestao import detectar_tipo, ler_fonte
+
+MENSAGEM = (
+    "From remetente@exemplo.com Mon Jan  1 00:00:00 2025\n"
+    "Subject: Assunto {n}\n"
+    "Content-Type: text/plain; charset=utf-8\n\n"
+    "Corpo da mensagem {n}\n"
+)
+
+
+@pytest.fixture
+def mbox(tmp_path):
+    caminho = tmp_path / "caixa.mbox"
+    caminho.write_text("".join(MENSAGEM.format(n=n) for n in range(4)), encoding="utf-8")
+    return str(caminho)
+
+
+@pytest.fixture
+def decodificacoes(monkeypatch):
+    contagem = []
+    original = ingestao._texto_de_bytes_eml
+    monkeypatch.setattr(ingestao, "_texto_de_bytes_eml",
+                        lambda dados: (contagem.append(1), original(dados))[1])
+    return contagem
+
+
+def test_mbox_em_ordem(mbox):
+    itens = list(ler_fonte(mbox))
+    assert [i for i, _ in itens] == [f"{mbox}#{n}" for n in range(4)]
+    assert "Assunto 2" in itens[2][1] and "Corpo da mensagem 2" in itens[2][1]
+
+
+def test_mbox_pula_sem_decodificar(mbox, decodificacoes):
+    itens = list(ler_fonte(mbox, pular=3))
+    assert [i for i, _ in itens] == [f"{mbox}#3"]
+    assert "Corpo da mensagem 3" in itens[0][1]
+    assert len(decodificacoes) == 1
+
+
+def test_diretorio_pula_sem_ler(tmp_path, monkeypatch):
+    for n in range(3):
+        (tmp_path / f"{n}.txt").write_text(f"email {n}", encoding="utf-8")
+    lidos = []
+    monkeypatch.setattr(ingestao, "ler_arquivo", lambda caminho: lidos.append(caminho) or caminho)
+    assert [i for i, _ in ler_fonte(str(tmp_path), pular=2)] == ["2.txt"]
+    assert len(lidos) == 1
+
+
+def test_jsonl_pula_linhas(tmp_path):
+    caminho = tmp_path / "emails.jsonl"
+    caminho.write_text("\n".join(json.dumps({"id": n, "body": f"texto {n}"}) for n in range(3))
+                       + "\n\n", encoding="utf-8")
+    assert list(ler_fonte(str(caminho), pular=1)) == [("1", "texto 1"), ("2", "texto 2")]
+    assert detectar_tipo(str(caminho)) == "jsonl"
+
+
+def test_maildir_em_ordem_estavel_para_retomar(tmp_path, monkeypatch):
+    import mailbox
+
+    caixa = mailbox.Maildir(str(tmp_path / "caixa"))
+    chaves = [caixa.add(MENSAGEM.format(n=n).split("\n", 1)[1]) for n in range(5)]
+    # A ordem do sistema de arquivos não é garantida: simula uma ordem qualquer
+    original = mailbox.Maildir.iterkeys
+    monkeypatch.setattr(mailbox.Maildir, "iterkeys",
+                        lambda self: iter(sorted(original(self), reverse=True)))
+
+    inteira = [i for i, _ in ingestao.itens_da_fonte(str(tmp_path / "caixa"))]
+    retomada = [i for i, _ in ingestao.itens_da_fonte(str(tmp_path / "caixa"), pular=2)]
+
+    assert inteira == sorted(chaves)
+    assert retomada == inteira[2:]
@@ -0,0 +1,85 @@
+"""Importação leve, aquecimento e prontidão (utils/inicializacao.py)."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+import app as aplicacao
+from utils import inicializacao
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PESADOS = ("huggingface_hub", "pypdf", "pypdfium2", "numpy", "transformers", "onnxruntime")
+
+
+def test_importar_app_nao_carrega_modulos_pesados_nem_exige_token():
+    ambiente = {k: v for k, v in os.environ.items() if k not in ("HF_API_TOKEN", "HF_TOKEN")}
+    ambiente["WARMUP"] = "off"
+    saida = subprocess.run(
+        [sys.executable, "-c",
+         f"import sys, app; print([m for m in {PESADOS!r} if m in sys.modules])"],
+        cwd=RAIZ, env=ambiente, capture_output=True, text=True, check=True)
+    assert saida.stdout.strip().splitlines()[-1] == "[]"
+
+
+@pytest.fixture
+def estado(monkeypatch):
+    monkeypatch.setattr(inicializacao, "_estado", {
+        "aquecido": False, "em_andamento": False, "erro": None, "duracao_s": None})
+    return inicializacao._estado
+
+
+@pytest.fixture
+def aquecimento_falso(monkeypatch):
+    """Troca clientes e modelos por objetos vazios: só o fluxo do aquecimento importa."""
+    class Backend:
+        def aquecer(self, *args):
+            pass
+
+    monkeypatch.setattr(inicializacao, "obter_cliente_chat", lambda: None)
+    monkeypatch.setattr(inicializacao, "obter_backend", lambda *a: Backend())
+    monkeypatch.setattr(inicializacao.importlib, "import_module", lambda nome: None)
+    monkeypatch.setattr(inicializacao, "_extras", [])
+
+
+def test_preguicoso_fica_pronto_sem_aquecer(monkeypatch, estado):
+    monkeypatch.setattr(inicializacao, "WARMUP", "off")
+    assert inicializacao.verificar_prontidao() == (True, {"config": "ok", "warmup": "lazy"})
+
+
+def test_sem_token_nao_fica_pronto(monkeypatch, estado):
+    monkeypatch.setattr(inicializacao, "WARMUP", "off")
+    monkeypatch.delenv("HF_API_TOKEN", raising=False)
+    monkeypatch.delenv("HF_TOKEN", raising=False)
+
+    resposta = aplicacao.app.test_client().get("/readyz")
+
+    assert resposta.status_code == 503
+    assert resposta.get_json()["checks"]["config"] != "ok"
+
+
+def test_background_pendente_ate_aquecer(monkeypatch, estado, aquecimento_falso):
+    monkeypatch.setattr(inicializacao, "WARMUP", "background")
+    assert inicializacao.verificar_prontidao()[1]["warmup"] == "pending"
+
+    chamadas = []
+    inicializacao.registrar_aquecimento(lambda: chamadas.append(1))
+    inicializacao.aquecer()
+    inicializacao.aquecer()  # idempotente
+
+    assert chamadas == [1]
+    assert inicializacao.verificar_prontidao() == (True, {"config": "ok", "warmup": "ok"})
+
+
+def test_falha_no_aquecimento_aparece_no_readyz(monkeypatch, estado, aquecimento_falso):
+    monkeypatch.setattr(inicializacao, "WARMUP", "background")
+
+    def quebrar():
+        raise RuntimeError("modelo ausente")
+
+    inicializacao.registrar_aquecimento(quebrar)
+    inicializacao.aquecer()
+
+    pronto, verificacoes = inicializacao.verificar_prontidao()
+    assert not pronto
+    assert verificacoes["warmup"] == "modelo ausente"
@@ -0,0 +1,165 @@
+"""Fila de jobs (utils/jobs.py): estado visível de qualquer worker."""
+import json
+import sqlite3
+import time
+
+import pytest
+
+from utils import jobs as modulo_jobs
+from utils.jobs import GerenciadorJobs, CONCLUIDO
+
+
+def _esperar(gerenciador, job_id, prazo=5):
+    limite = time.monotonic() + prazo
+    while time.monotonic() < limite:
+        job = gerenciador.obter(job_id)
+        if job is not None and job["estado"] == CONCLUIDO:
+            return job
+        gerenciador.aguardar_mudanca(job_id, 0, timeout=0.1)
+    raise AssertionError("job não terminou")
+
+
+def test_store_compartilhado_por_padrao():
+    assert modulo_jobs.JOBS_SQLITE_PATH
+
+
+def test_job_visivel_em_outro_worker(tmp_path):
+    caminho = str(tmp_path / "jobs.sqlite")
+    # Dois gerenciadores com o mesmo arquivo = dois workers do gunicorn
+    worker_a = GerenciadorJobs(lambda texto: {"categoria": texto}, caminho_sqlite=caminho)
+    worker_b = GerenciadorJobs(lambda texto: None, caminho_sqlite=caminho)
+
+    job_id = worker_a.submeter("Produtivo")
+    _esperar(worker_a, job_id)
+    job = worker_b.obter(job_id)
+    assert job["estado"] == CONCLUIDO
+    assert job["resultado"] == {"categoria": "Produtivo"}
+
+
+def test_classificacao_parcial_visivel_em_outro_worker(tmp_path):
+    caminho = str(tmp_path / "jobs.sqlite")
+    liberar = modulo_jobs.threading.Event()
+
+    def funcao(texto, ao_parcial):
+        ao_parcial(categoria="Produtivo")
+        liberar.wait(5)
+        return {"categoria": "Produtivo"}
+
+    worker_a = GerenciadorJobs(funcao, caminho_sqlite=caminho, parcial=True)
+    worker_b = GerenciadorJobs(lambda texto: None, caminho_sqlite=caminho)
+    job_id = worker_a.submeter("email")
+    try:
+        limite = time.monotonic() + 5
+        while time.monotonic() < limite:
+            job = worker_b.obter(job_id)
+            if job and job["parcial"].get("categoria"):
+                break
+            time.sleep(0.02)
+        assert job["parcial"]["categoria"] == "Produtivo"
+    finally:
+        liberar.set()
+    _esperar(worker_a, job_id)
+
+
+def test_resposta_parcial_por_trechos_com_gravacoes_limitadas(monkeypatch):
+    monkeypatch.setattr(modulo_jobs, "JOBS_PARCIAL_INTERVALO", 60)
+    gerenciador = GerenciadorJobs(lambda: None, caminho_sqlite=None, parcial=True)
+    gravacoes = []
+    salvar = gerenciador._salvar
+    monkeypatch.setattr(gerenciador, "_salvar",
+                        lambda job: (gravacoes.append(1), salvar(job)))
+
+    job = {"id": "j", "estado": "running", "resultado": None, "erro": None, "parcial": {}}
+    atualizar = gerenciador._ao_parcial(job)
+    atualizar(categoria="Produtivo")
+    for trecho in ("Olá", ", ", "tudo", " bem"):
+        atualizar(trecho_resposta=trecho)
+    # Classificação + primeiro trecho; os demais esperam o intervalo
+    assert len(gravacoes) == 2
+    assert job["parcial"]["resposta"] == "Olá"
+
+    monkeypatch.setattr(modulo_jobs, "JOBS_PARCIAL_INTERVALO", 0)
+    atualizar(trecho_resposta="?")
+    assert job["parcial"]["resposta"] == "Olá, tudo bem?"
+    assert job["parcial"]["categoria"] == "Produtivo"
+
+
+def test_resposta_parcial_visivel_em_outro_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(modulo_jobs, "JOBS_PARCIAL_INTERVALO", 0)
+    caminho = str(tmp_path / "jobs.sqlite")
+    liberar = modulo_jobs.threading.Event()
+
+    def funcao(texto, ao_parcial):
+        ao_parcial(categoria="Produtivo")
+        for trecho in ("Olá", ", tudo", " bem"):
+            ao_parcial(trecho_resposta=trecho)
+        liberar.wait(5)
+        return {"categoria": "Produtivo"}
+
+    worker_a = GerenciadorJobs(funcao, caminho_sqlite=caminho, parcial=True)
+    worker_b = GerenciadorJobs(lambda texto: None, caminho_sqlite=caminho)
+    job_id = worker_a.submeter("email")
+    try:
+        limite = time.monotonic() + 5
+        while time.monotonic() < limite:
+            job = worker_b.obter(job_id)
+            if job and job["parcial"].get("resposta") == "Olá, tudo bem":
+                break
+            time.sleep(0.02)
+        assert job["parcial"]["resposta"] == "Olá, tudo bem"
+    finally:
+        liberar.set()
+    _esperar(worker_a, job_id)
+
+
+def test_stream_sse_envia_deltas_e_a_resposta_final(mock_hf):
+    import app as aplicacao
+
+    cliente = aplicacao.app.test_client()
+    criado = cliente.post("/api/jobs", json={
+        "email_content": "Precisamos revisar o contrato e agendar a reunião do projeto"})
+    assert criado.status_code == 202
+
+    corpo = cliente.get(criado.get_json()["stream_url"]).get_data(as_text=True)
+
+    eventos = [bloco.split("\n", 1) for bloco in corpo.split("\n\n") if bloco.startswith("event:")]
+    tokens = "".join(json.loads(dados[len("data: "):])["text"]
+                     for tipo, dados in eventos if tipo == "event: token")
+    final = json.loads(eventos[-1][1][len("data: "):])
+    assert final["status"] == "done"
+    assert tokens and final["response"].startswith(tokens)
+
+
+def test_falha_ao_gravar_nao_vaza_vagas(tmp_path, monkeypatch):
+    gerenciador = GerenciadorJobs(lambda texto: {"categoria": texto}, max_workers=1,
+                                  max_pendentes=0, caminho_sqlite=str(tmp_path / "jobs.sqlite"))
+
+    def travado(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(gerenciador._disco, "guardar", travado)
+    for _ in range(3):  # uma vaga só: cada job precisa devolvê-la
+        job = _esperar(gerenciador, gerenciador.submeter("Produtivo"))
+        assert job["resultado"] == {"categoria": "Produtivo"}
+
+
+def test_falha_inesperada_ao_gravar_devolve_a_vaga(monkeypatch):
+    gerenciador = GerenciadorJobs(lambda texto: texto, max_workers=1, max_pendentes=0,
+                                  caminho_sqlite=None)
+    salvar = gerenciador._salvar
+    falhas = [RuntimeError("ao criar"), None, RuntimeError("ao terminar")]
+
+    def salvar_instavel(job):
+        falha = falhas.pop(0) if falhas else None
+        if falha is not None:
+            raise falha
+        salvar(job)
+
+    monkeypatch.setattr(gerenciador, "_salvar", salvar_instavel)
+    with pytest.raises(RuntimeError):
+        gerenciador.submeter("a")
+    gerenciador.submeter("b")  # a vaga voltou; este job falha ao gravar o fim
+    gerenciador._executor.shutdown(wait=True)
+    monkeypatch.setattr(gerenciador, "_salvar", salvar)
+    gerenciador._executor = modulo_jobs.ThreadPoolExecutor(max_workers=1)
+    _esperar(gerenciador, gerenciador.submeter("c"))
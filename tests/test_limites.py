@@ -0,0 +1,71 @@
+"""Limite por cliente e orçamento da Hugging Face (utils/limites.py)."""
+from utils import limites
+from utils.limites import (
+    BaldeTokens, LimitadorClientes, OrcamentoUpstream, chave_cliente,
+    NORMAL, BAIXO, ESGOTADO
+)
+
+
+class RespostaFalsa:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class Relogio:
+    def __init__(self, agora=1_000.0):
+        self.agora = agora
+
+    def __call__(self):
+        return self.agora
+
+
+def test_balde_recusa_rajada_e_informa_a_espera():
+    balde = BaldeTokens(capacidade=2, taxa=1)
+    assert balde.consumir() == 0 and balde.consumir() == 0
+    assert 0 < balde.consumir() <= 1
+
+
+def test_clientes_tem_baldes_separados():
+    limitador = LimitadorClientes(por_minuto=1, rajada=1)
+    assert limitador.verificar("a") == 0
+    assert limitador.verificar("a") > 0
+    assert limitador.verificar("b") == 0
+
+
+def test_chave_inventada_conta_como_ip():
+    assert chave_cliente("inventada", "1.2.3.4", {"valida"}) == "ip:1.2.3.4"
+    assert chave_cliente("valida", "1.2.3.4", {"valida"}).startswith("chave:")
+
+
+def test_orcamento_baixo_e_esgotado_pela_contagem():
+    orcamento = OrcamentoUpstream(limite=10, janela=3600, reserva=0.2)
+    for _ in range(8):
+        orcamento.registrar(RespostaFalsa())
+    assert orcamento.estado() == BAIXO
+    for _ in range(2):
+        orcamento.registrar(RespostaFalsa())
+    assert orcamento.estado() == ESGOTADO
+
+
+def test_restante_zerado_volta_ao_normal_no_reset(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(limites.time, "time", relogio)
+    orcamento = OrcamentoUpstream(limite=0, janela=3600)
+    orcamento.registrar(RespostaFalsa(200, {
+        "X-RateLimit-Remaining": "0", "X-RateLimit-Limit": "100", "X-RateLimit-Reset": "30"}))
+    assert orcamento.estado() == ESGOTADO
+
+    relogio.agora += 31
+    assert orcamento.estado() == NORMAL
+    assert orcamento.restante() is None
+
+
+def test_429_respeita_retry_after(monkeypatch):
+    relogio = Relogio()
+    monkeypatch.setattr(limites.time, "time", relogio)
+    orcamento = OrcamentoUpstream(limite=0)
+    orcamento.registrar(RespostaFalsa(429, {"Retry-After": "10"}))
+    assert orcamento.degradado()
+    relogio.agora += 11
+    assert not orcamento.degradado()
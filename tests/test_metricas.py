@@ -0,0 +1,31 @@
+"""Métricas (utils/metricas.py, asgi.py): rótulos com cardinalidade limitada."""
+import pytest
+
+from utils import metricas
+
+starlette = pytest.importorskip("starlette")
+from starlette.testclient import TestClient  # noqa: E402
+
+import asgi  # noqa: E402
+
+
+def _endpoints_observados() -> set:
+    texto = metricas.registro.exportar()
+    return {linha.split('endpoint="')[1].split('"')[0]
+            for linha in texto.splitlines() if 'endpoint="' in linha}
+
+
+def test_rotas_desconhecidas_usam_rotulo_fixo():
+    cliente = TestClient(asgi.app)
+    for i in range(5):
+        cliente.get(f"/api/jobs/{i:032x}")
+    cliente.get("/healthz")
+    observados = _endpoints_observados()
+    assert "other" in observados
+    assert "/healthz" in observados
+    assert not any(e.startswith("/api/jobs/") for e in observados)
+
+
+def test_server_timing_em_toda_resposta():
+    resposta = TestClient(asgi.app).get("/healthz")
+    assert "total;dur=" in resposta.headers["Server-Timing"]
@@ -0,0 +1,50 @@
+"""Motor de palavras-chave (utils/palavras_chave.py)."""
+import pytest
+
+from utils.palavras_chave import MotorPalavrasChave, carregar_listas, motor_palavras_chave, plural
+
+
+def _termos(texto: str, categoria: str) -> list:
+    return [termo for termo, _, _ in motor_palavras_chave.buscar(texto)[categoria]]
+
+
+@pytest.mark.parametrize("texto, termo", [
+    ("Seguem os documentos em anexo", "documento"),
+    ("Os relatórios estão atrasados", "relatório"),
+    ("Tivemos problemas no servidor", "problema"),
+    ("Vamos marcar as reuniões", "reunião"),
+    ("Erros ao gerar o boleto", "erro"),
+])
+def test_plural_conta_como_o_termo(texto, termo):
+    assert _termos(texto, "produtivo") == [termo]
+
+
+def test_singular_e_plural_contam_como_um_termo_so():
+    assert set(_termos("O documento e os documentos", "produtivo")) == {"documento"}
+
+
+def test_apenas_palavras_inteiras():
+    assert _termos("Filme de terror", "produtivo") == []
+
+
+def test_termo_mais_longo_vence():
+    assert _termos("Oferta relâmpago hoje", "marketing") == ["oferta relâmpago"]
+
+
+def test_uma_passada_encontra_todas_as_categorias():
+    ocorrencias = motor_palavras_chave.buscar("Parabéns! Use o cupom no pagamento")
+    assert ocorrencias["golpe"] and ocorrencias["marketing"] and ocorrencias["produtivo"]
+
+
+def test_termos_extras_do_arquivo(tmp_path):
+    arquivo = tmp_path / "extras.json"
+    arquivo.write_text('{"produtivo": ["fatura"]}', encoding="utf-8")
+    motor = MotorPalavrasChave(carregar_listas(str(arquivo)))
+    assert [t for t, _, _ in motor.buscar("Envio das faturas")["produtivo"]] == ["fatura"]
+
+
+@pytest.mark.parametrize("singular, esperado", [
+    ("reunião", "reuniões"), ("cupom", "cupons"), ("erro", "erros"), ("bônus", "bônus"),
+])
+def test_plural(singular, esperado):
+    assert plural(singular) == esperado
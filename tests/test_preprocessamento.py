@@ -0,0 +1,49 @@
+"""Corte e trechos antes dos modelos (utils/preprocessamento.py)."""
+from utils import preprocessamento
+from utils.preprocessamento import (
+    agregar_resultados, classificar_em_trechos, dividir_em_trechos, limpar,
+    orcamento_caracteres, preparar_para_chat
+)
+
+MODELO = "joeddav/xlm-roberta-large-xnli"
+
+
+def test_limpar_corta_texto_enorme(monkeypatch):
+    monkeypatch.setattr(preprocessamento, "PREPROC_MAX_CARACTERES", 1000)
+    texto = "palavra " * 1000
+    assert len(limpar(texto)) <= 1001
+
+
+def test_texto_curto_vira_um_trecho():
+    assert dividir_em_trechos("Olá, tudo bem?", MODELO) == ["Olá, tudo bem?"]
+
+
+def test_texto_longo_respeita_orcamento_e_limite_de_trechos():
+    texto = " ".join(f"p{i}" for i in range(5000))
+    trechos = dividir_em_trechos(texto, MODELO, max_trechos=3)
+    assert len(trechos) == 3
+    assert all(len(t) <= orcamento_caracteres(MODELO) for t in trechos)
+    assert trechos[0].startswith("p0 ") and trechos[-1].endswith("p4999")
+
+
+def test_agregar_media_ponderada():
+    resultados = [{"labels": ["a", "b"], "scores": [0.9, 0.1]},
+                  {"labels": ["b", "a"], "scores": [0.7, 0.3]}]
+    agregado = agregar_resultados("t", resultados, [3, 1])
+    assert agregado["labels"] == ["a", "b"]
+    assert abs(agregado["scores"][0] - 0.75) < 1e-9
+
+
+def test_trecho_com_falha_devolve_none():
+    texto = " ".join(f"p{i}" for i in range(5000))
+    resultado = classificar_em_trechos(
+        lambda trechos, labels: [None] * len(trechos), [texto], ["a"], MODELO)
+    assert resultado == [None]
+
+
+def test_prompt_do_chat_cabe_no_orcamento():
+    texto = " ".join(f"p{i}" for i in range(20000))
+    prompt = preparar_para_chat(texto, "HuggingFaceTB/SmolLM3-3B")
+    assert preprocessamento.MARCADOR_CORTE in prompt
+    assert len(prompt) <= orcamento_caracteres("HuggingFaceTB/SmolLM3-3B") + len(
+        preprocessamento.MARCADOR_CORTE)
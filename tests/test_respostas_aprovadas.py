@@ -0,0 +1,83 @@
+"""Respostas aprovadas: rota protegida, limites e renderização (utils/respostas.py, app.py)."""
+import pytest
+
+import app as aplicacao
+from utils import limites, respostas
+from utils.respostas import IndiceRespostas, IndiceCheio
+
+CHAVE = "chave-de-teste"
+APROVACAO = {"email_content": "Preciso do relatório de vendas de março",
+             "response": "Segue o relatório.", "classification": "Produtivo"}
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    monkeypatch.setattr(aplicacao, "CHAVES_API", {CHAVE})
+    monkeypatch.setattr(limites, "CHAVES_API", {CHAVE})
+    monkeypatch.setattr(limites, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(respostas, "_indice", respostas.Preguicoso(IndiceRespostas))
+    return aplicacao.app.test_client()
+
+
+def test_aprovar_exige_chave(cliente):
+    assert cliente.post("/api/replies/approve", json=APROVACAO).status_code == 401
+    resposta = cliente.post("/api/replies/approve", json=APROVACAO,
+                            headers={"X-API-Key": "outra"})
+    assert resposta.status_code == 401
+
+
+def test_aprovar_desativada_sem_api_key(cliente, monkeypatch):
+    monkeypatch.setattr(aplicacao, "CHAVES_API", set())
+    resposta = cliente.post("/api/replies/approve", json=APROVACAO,
+                            headers={"X-API-Key": CHAVE})
+    assert resposta.status_code == 403
+
+
+def test_aprovar_com_chave(cliente):
+    resposta = cliente.post("/api/replies/approve", json=APROVACAO,
+                            headers={"X-API-Key": CHAVE})
+    assert resposta.status_code == 201
+    assert resposta.get_json()["approved_total"] == 1
+
+
+def test_aprovar_recusa_texto_grande(cliente):
+    grande = dict(APROVACAO, response="x" * (respostas.RESPOSTA_APROVADA_MAX_RESPOSTA + 1))
+    resposta = cliente.post("/api/replies/approve", json=grande, headers={"X-API-Key": CHAVE})
+    assert resposta.status_code == 400
+
+
+def test_aprovar_tem_limite_por_cliente(cliente, monkeypatch):
+    monkeypatch.setattr(limites, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(limites, "limitador_clientes",
+                        limites.LimitadorClientes(por_minuto=0.001, rajada=1))
+    cabecalhos = {"X-API-Key": CHAVE}
+    assert cliente.post("/api/replies/approve", json=APROVACAO, headers=cabecalhos).status_code == 201
+    assert cliente.post("/api/replies/approve", json=APROVACAO, headers=cabecalhos).status_code == 429
+
+
+def test_indice_cheio():
+    indice = IndiceRespostas(max_itens=1)
+    indice.aprovar("email um", "resposta", "Produtivo")
+    with pytest.raises(IndiceCheio):
+        indice.aprovar("email dois", "resposta", "Produtivo")
+    assert len(indice) == 1
+
+
+def test_resultado_escapa_a_resposta():
+    with aplicacao.app.test_request_context():
+        html = aplicacao.render_template(
+            "result.html", original_content="x", classification="Produtivo",
+            response="<script>alert(1)</script>\nlinha 2", stream_url=None)
+    assert "<script>alert(1)</script>" not in html
+    assert "&lt;script&gt;" in html
+    assert "pre-line" in html
+
+
+@pytest.mark.parametrize("nivel, publico", [("aprovada", "approved"), ("ia", "llm"),
+                                            ("template", "template")])
+def test_reply_tier_em_ingles_na_api(cliente, monkeypatch, nivel, publico):
+    monkeypatch.setattr(aplicacao, "processar_email_com_resposta", lambda texto: {
+        "categoria": "Produtivo", "resposta": "Segue.", "subrotulo": "solicitacao",
+        "nivel_resposta": nivel})
+    resposta = cliente.post("/api/classify", json={"email_content": "Preciso do relatório"})
+    assert resposta.get_json()["reply_tier"] == publico
@@ -0,0 +1,47 @@
+"""Store de resultados (utils/resultados.py): o id do cookie vale em qualquer worker."""
+import sqlite3
+
+from utils import resultados
+from utils.resultados import ArmazemResultados, adicionar_ao_historico
+
+
+def test_store_compartilhado_por_padrao():
+    assert resultados.RESULTADOS_SQLITE_PATH
+
+
+def test_resultado_visivel_em_outro_worker(tmp_path):
+    caminho = str(tmp_path / "resultados.sqlite")
+    worker_a = ArmazemResultados(caminho_sqlite=caminho)
+    worker_b = ArmazemResultados(caminho_sqlite=caminho)
+
+    resultado_id = worker_a.guardar("Olá, segue o relatório", "Produtivo", "Obrigado!")
+    registro = worker_b.obter(resultado_id)
+    assert registro["classification"] == "Produtivo"
+    assert registro["response"] == "Obrigado!"
+
+
+def test_mesmo_conteudo_mesmo_id(tmp_path):
+    armazem = ArmazemResultados(caminho_sqlite=None)
+    assert armazem.guardar("a", "Produtivo", "b") == armazem.guardar("a", "Produtivo", "b")
+
+
+def test_historico_sem_repeticao():
+    assert adicionar_ao_historico(["b", "a"], "a", limite=2) == ["a", "b"]
+
+
+def test_sqlite_indisponivel_usa_so_a_memoria(tmp_path, monkeypatch):
+    armazem = ArmazemResultados(caminho_sqlite=str(tmp_path / "resultados.sqlite"))
+
+    def travado(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(armazem._disco, "guardar", travado)
+    monkeypatch.setattr(armazem._disco, "obter", travado)
+    resultado_id = armazem.guardar("a", "Produtivo", "b")
+    assert armazem.obter(resultado_id)["response"] == "b"
+    assert armazem.obter("inexistente") is None
+
+
+def test_caminho_sem_permissao_usa_so_a_memoria(tmp_path):
+    armazem = ArmazemResultados(caminho_sqlite=str(tmp_path / "nao-existe" / "r.sqlite"))
+    assert armazem.obter(armazem.guardar("a", "Produtivo", "b"))["classification"] == "Produtivo"
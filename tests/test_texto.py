@@ -0,0 +1,70 @@
+"""Limpeza do email recebido e da saída do chat (utils/texto.py)."""
+import pytest
+
+from utils.texto import (
+    FiltroRespostaIncremental, extrair_resposta, limpar_email, limpar_raciocinio,
+    normalizar_espacos
+)
+
+SAIDA_DO_CHAT = (
+    "Okay, let me think about how to answer this email.\n\n"
+    "Prezado(a),\n\nAgradecemos o contato. Recebemos sua mensagem e nossa equipe "
+    "retornará em breve com as informações solicitadas.\n\nAtenciosamente,\nEquipe"
+)
+
+
+def test_normalizar_espacos():
+    assert normalizar_espacos("  a\n\tb   c ") == "a b c"
+    assert normalizar_espacos(None) == ""
+
+
+def test_limpar_email_remove_citacao_assinatura_e_cabecalhos():
+    email = (
+        "De: fulano@empresa.com\n"
+        "Assunto: Reunião do projeto\n"
+        "Podemos remarcar para quinta?\n"
+        "> mensagem antiga citada\n"
+        "Atenciosamente,\n"
+        "Fulano\n"
+        "Em seg, 1 de set, Ciclano escreveu:\n"
+        "histórico\n"
+    )
+    assert limpar_email(email) == "Reunião do projeto Podemos remarcar para quinta?"
+
+
+def test_limpar_email_sem_sobra_devolve_o_original():
+    assert limpar_email("> só citação") == "> só citação"
+
+
+def test_extrair_resposta_a_partir_do_cumprimento():
+    assert extrair_resposta(SAIDA_DO_CHAT).startswith("Prezado(a),")
+    assert "let me" not in extrair_resposta(SAIDA_DO_CHAT)
+
+
+def test_extrair_resposta_sem_cumprimento_usa_o_ultimo_paragrafo():
+    assert extrair_resposta("Maybe this works.\n\nSegue o documento.") == "Segue o documento."
+
+
+def test_limpar_raciocinio_corta_so_ate_o_fim_da_linha():
+    assert limpar_raciocinio("Texto útil. Let me check\nSegunda linha") == "Texto útil. \nSegunda linha"
+
+
+@pytest.mark.parametrize("tamanho", [1, 3, 7, 40, len(SAIDA_DO_CHAT)])
+def test_filtro_incremental_mostra_prefixo_da_resposta_final(tamanho):
+    filtro = FiltroRespostaIncremental()
+    mostrado = "".join(filtro.adicionar(SAIDA_DO_CHAT[i:i + tamanho])
+                       for i in range(0, len(SAIDA_DO_CHAT), tamanho))
+    final = filtro.finalizar()
+
+    assert final == extrair_resposta(SAIDA_DO_CHAT)
+    assert mostrado == filtro.mostrado
+    assert "let me" not in mostrado.lower()
+    assert mostrado + filtro.restante(final) == final
+
+
+def test_filtro_incremental_retem_frase_de_raciocinio_partida():
+    filtro = FiltroRespostaIncremental()
+    filtro.adicionar("Prezado, segue o anexo. Let")
+    filtro.adicionar(" me revisar isso\nObrigado\n")
+    assert "Let" not in filtro.mostrado
+    assert filtro.mostrado.endswith("Obrigado\n")
@@ -0,0 +1,59 @@
+"""Uploads .txt/.pdf (utils/uploads.py): tipo pelo conteúdo e leitura limitada."""
+import io
+
+import pytest
+
+from utils import uploads
+from utils.uploads import farejar_tipo, ler_texto_limitado, ler_upload
+
+
+class ArquivoFalso:
+    """O mínimo de um FileStorage do Werkzeug."""
+
+    def __init__(self, nome: str, dados: bytes):
+        self.filename = nome
+        self.stream = io.BytesIO(dados)
+
+
+def test_txt_que_cita_pdf_continua_texto():
+    texto = "Segue o trecho do arquivo: %PDF-1.7 não abriu.\n" * 3
+    assert ler_upload(ArquivoFalso("email.txt", texto.encode("utf-8"))) == texto
+
+
+@pytest.mark.parametrize("codificacao", ["utf-16-le", "utf-16-be"])
+def test_txt_utf16_sem_bom(codificacao):
+    texto = "Olá, segue a reunião de amanhã."
+    assert ler_upload(ArquivoFalso("email.txt", texto.encode(codificacao))) == texto
+
+
+def test_txt_utf16_com_bom():
+    texto = "Olá, segue a reunião de amanhã."
+    assert ler_upload(ArquivoFalso("email.txt", texto.encode("utf-16"))) == texto
+
+
+def test_pdf_com_lixo_antes_do_cabecalho(monkeypatch):
+    monkeypatch.setattr(uploads, "extract_text_from_pdf", lambda arquivo: "texto do pdf")
+    assert ler_upload(ArquivoFalso("email.pdf", b"\r\n\r\n%PDF-1.4\n...")) == "texto do pdf"
+
+
+@pytest.mark.parametrize("nome, dados", [
+    ("email.txt", b"PK\x03\x04" + b"\x00" * 100),     # docx renomeado
+    ("email.pdf", b"apenas texto"),
+    ("email.docx", b"qualquer coisa"),
+])
+def test_recusa_conteudo_que_nao_bate(nome, dados):
+    with pytest.raises(ValueError):
+        ler_upload(ArquivoFalso(nome, dados))
+
+
+def test_binario_com_nulos():
+    assert farejar_tipo(b"\x00\x01\x02\x03" * 50) == "binario"
+
+
+def test_txt_lido_so_ate_o_limite():
+    assert ler_texto_limitado(io.BytesIO(b"a" * 1000), limite=10) == "a" * 10
+
+
+def test_txt_latin1():
+    texto = "Reunião de orçamento amanhã às dez, por favor confirme a presença."
+    assert ler_upload(ArquivoFalso("email.txt", texto.encode("cp1252"))) == texto
@@ -0,0 +1,2 @@
+# Carrega o .env uma única vez, antes de qualquer módulo de utils ler variáveis
+from utils import config  # noqa: F401
@@ -0,0 +1,254 @@
+"""
+Avaliação offline do classificador: acurácia x custo de cada estágio.
+  - corpus rotulado (padrão: "Emails em PDF para teste/Produtivo|Improdutivo")
+  - cada email passa pelo pré-filtro (curto, golpe, marketing) e, se sobrar,
+    pelo modelo; os scores do modelo ficam num SQLite, então varreduras e
+    novas rodadas não repetem chamadas remotas
+  - matriz de confusão, participação e latência de cada estágio
+  - varredura de CONFIDENCE_THRESHOLD x CONFIDENCE_MARGIN com a fronteira
+    de Pareto entre acurácia e cobertura do modelo
+Os estágios usam os mesmos nomes do contador `path` de /metrics.
+Autor: Micaías Viola
+Data: 2025-10-08
+"""
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.backends import obter_backend
+from utils.cache import CacheSQLite, chave_cache
+from utils.classifier import (
+    HF_API_URL, CONFIDENCE_THRESHOLD, CONFIDENCE_MARGIN, LABEL_MAP,
+    _pre_filtro, _consultar_modelo, categoria_heuristica, confianca_suficiente,
+    modelo_do_backend,
+)
+from utils.ingestao import CAMPOS_TEXTO_JSONL, ler_fonte
+
+# ==============================
+# CONFIGURAÇÕES
+# ==============================
+PASTA_EXEMPLOS = os.path.join(os.path.dirname(os.path.dirname(__file__)), "Emails em PDF para teste")
+AVALIACAO_CACHE_PATH = os.getenv("AVALIACAO_CACHE_PATH", "avaliacao_scores.sqlite")
+# Scores não expiram: a chave já inclui o modelo e o texto
+TTL_SCORES = 10 * 365 * 24 * 60 * 60
+
+ROTULOS = ("Produtivo", "Improdutivo")
+ESTAGIOS = ("short", "scam_keyword", "marketing_keyword", "model",
+            "low_confidence_fallback", "api_error")
+CAMPOS_ROTULO_JSONL = ("rotulo", "label", "categoria", "classification")
+
+
+# ==============================
+# CORPUS ROTULADO
+# ==============================
+def carregar_rotulados(caminho: str = PASTA_EXEMPLOS) -> list:
+    """
+    [{'id', 'rotulo', 'texto'}] de:
+      - uma pasta com subpastas Produtivo/ e Improdutivo/ (.pdf, .txt, .eml)
+      - um .jsonl com o rótulo (rotulo/label/...) e o texto em cada linha,
+        como o gerado por `python -m benchmarks.corpus`
+    """
+    exemplos = []
+    if os.path.isdir(caminho):
+        for rotulo in ROTULOS:
+            pasta = os.path.join(caminho, rotulo)
+            if os.path.isdir(pasta):
+                exemplos += [{"id": f"{rotulo}/{ident}", "rotulo": rotulo, "texto": texto}
+                             for ident, texto in ler_fonte(pasta, "diretorio")]
+        return exemplos
+
+    with open(caminho, encoding="utf-8") as f:
+        for numero, linha in enumerate(f, 1):
+            if not linha.strip():
+                continue
+            registro = json.loads(linha)
+            rotulo = next((registro[c] for c in CAMPOS_ROTULO_JSONL if c in registro), None)
+            if rotulo not in ROTULOS:
+                raise ValueError(f"Linha {numero}: rótulo ausente ou inválido ({rotulo!r})")
+            texto = next((registro[c] for c in CAMPOS_TEXTO_JSONL if c in registro), "")
+            exemplos.append({"id": str(registro.get("id", numero)), "rotulo": rotulo, "texto": texto})
+    return exemplos
+
+
+# ==============================
+# COLETA (uma vez por corpus)
+# ==============================
+class CacheScores:
+    """Scores do modelo por texto (já limpo), em disco, com o tempo da chamada original."""
+
+    def __init__(self, caminho: str = AVALIACAO_CACHE_PATH, modelo: str = None):
+        self.modelo = modelo or modelo_do_backend(obter_backend(HF_API_URL))
+        self._disco = CacheSQLite(caminho, ttl=TTL_SCORES, tabela="scores")
+
+    def _chave(self, texto: str) -> str:
+        # A URL separa os scores do serviço real dos de um mock (HF_API_URL)
+        return chave_cache(texto, self.modelo, f"scores:{HF_API_URL}")
+
+    def obter(self, texto: str):
+        return self._disco.obter(self._chave(texto))
+
+    def guardar(self, texto: str, resultado: dict, tempo_ms: float):
+        self._disco.guardar(self._chave(texto), {"resultado": resultado, "tempo_ms": tempo_ms})
+
+
+def _consultar_com_tempo(texto: str) -> tuple:
+    inicio = time.perf_counter()
+    resultado = _consultar_modelo([texto])[0]
+    return resultado, round((time.perf_counter() - inicio) * 1000, 3)
+
+
+def coletar(exemplos: list, cache: CacheScores, workers: int = 4, renovar: bool = False) -> list:
+    """
+    Roda o pré-filtro em todos os exemplos e consulta o modelo só para os
+    que chegam até ele e ainda não têm scores no cache (ou todos, com renovar).
+    Falhas do modelo não vão para o cache. Retorna um registro por exemplo,
+    suficiente para reavaliar qualquer limiar/margem sem chamar o modelo.
+    """
+    registros, pendentes = [], []
+    for exemplo in exemplos:
+        inicio = time.perf_counter()
+        texto, decisao, heuristica_produtivo, ocorrencias = _pre_filtro(exemplo["texto"])
+        registro = {
+            "id": exemplo["id"],
+            "rotulo": exemplo["rotulo"],
+            "decisao": decisao,
+            "estagio": None,
+            "categoria_fallback": None,
+            "resultado": None,
+            "tempo_filtro_ms": round((time.perf_counter() - inicio) * 1000, 3),
+            "tempo_modelo_ms": 0.0,
+            "em_cache": False,
+        }
+        if decisao is not None:
+            registro["estagio"] = ("scam_keyword" if ocorrencias.get("golpe")
+                                   else "marketing_keyword" if ocorrencias.get("marketing")
+                                   else "short")
+        else:
+            registro["categoria_fallback"] = categoria_heuristica(ocorrencias, heuristica_produtivo)
+            salvo = None if renovar else cache.obter(texto)
+            if salvo is not None:
+                registro.update(resultado=salvo["resultado"], tempo_modelo_ms=salvo["tempo_ms"],
+                                em_cache=True)
+            else:
+                pendentes.append((registro, texto))
+        registros.append(registro)
+
+    if pendentes:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            respostas = executor.map(lambda item: _consultar_com_tempo(item[1]), pendentes)
+            for (registro, texto), (resultado, tempo_ms) in zip(pendentes, respostas):
+                registro["tempo_modelo_ms"] = tempo_ms
+                if isinstance(resultado, dict) and "labels" in resultado and "scores" in resultado:
+                    registro["resultado"] = resultado
+                    cache.guardar(texto, resultado, tempo_ms)
+    return registros
+
+
+# ==============================
+# MÉTRICAS
+# ==============================
+def decidir(registro: dict, limiar: float, margem: float) -> tuple:
+    """(categoria, estagio) do registro com o limiar/margem dados — mesma regra do classificador."""
+    if registro["decisao"] is not None:
+        return registro["decisao"], registro["estagio"]
+    resultado = registro["resultado"]
+    if resultado is None:
+        return registro["categoria_fallback"], "api_error"
+    if confianca_suficiente(resultado["scores"], limiar, margem):
+        return LABEL_MAP.get(resultado["labels"][0], "Improdutivo"), "model"
+    return registro["categoria_fallback"], "low_confidence_fallback"
+
+
+def _percentil(valores: list, p: float) -> float:
+    """Percentil por vizinho mais próximo."""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))
+    return round(ordenados[indice], 3)
+
+
+def avaliar(registros: list, limiar: float = CONFIDENCE_THRESHOLD,
+            margem: float = CONFIDENCE_MARGIN) -> dict:
+    """
+    Matriz de confusão (real → previsto), acurácia, precisão/recall de
+    'Produtivo' e, por estágio: participação no tráfego, acurácia e latência.
+    A latência de um estágio é a do pré-filtro mais a do modelo, quando chamado.
+    """
+    matriz = {real: {previsto: 0 for previsto in ROTULOS} for real in ROTULOS}
+    por_estagio = {estagio: {"acertos": 0, "tempos_ms": []} for estagio in ESTAGIOS}
+    for registro in registros:
+        categoria, estagio = decidir(registro, limiar, margem)
+        matriz[registro["rotulo"]][categoria] += 1
+        dados = por_estagio[estagio]
+        dados["acertos"] += categoria == registro["rotulo"]
+        dados["tempos_ms"].append(registro["tempo_filtro_ms"] + registro["tempo_modelo_ms"])
+
+    total = len(registros) or 1
+    acertos = sum(matriz[r][r] for r in ROTULOS)
+    vp = matriz["Produtivo"]["Produtivo"]
+    previstos_produtivo = sum(matriz[r]["Produtivo"] for r in ROTULOS)
+    reais_produtivo = sum(matriz["Produtivo"].values())
+
+    estagios = {}
+    for estagio, dados in por_estagio.items():
+        n = len(dados["tempos_ms"])
+        estagios[estagio] = {
+            "n": n,
+            "participacao": round(n / total, 4),
+            "acuracia": round(dados["acertos"] / n, 4) if n else None,
+            "p50_ms": _percentil(dados["tempos_ms"], 50),
+            "p95_ms": _percentil(dados["tempos_ms"], 95),
+        }
+
+    chamadas = sum(1 for r in registros if r["decisao"] is None)
+    return {
+        "limiar": limiar,
+        "margem": margem,
+        "total": len(registros),
+        "acuracia": round(acertos / total, 4),
+        "precisao_produtivo": round(vp / previstos_produtivo, 4) if previstos_produtivo else None,
+        "recall_produtivo": round(vp / reais_produtivo, 4) if reais_produtivo else None,
+        "matriz_confusao": matriz,
+        "estagios": estagios,
+        # Emails que chegam ao modelo (não dependem de limiar/margem)
+        "chamadas_modelo": round(chamadas / total, 4),
+        # Decididos pelo modelo com confiança (o limiar/margem mexe aqui)
+        "cobertura_modelo": estagios["model"]["participacao"],
+    }
+
+
+def faixa(inicio: float, fim: float, passo: float) -> list:
+    """Valores de inicio a fim (inclusive) com o passo dado, arredondados."""
+    quantidade = int(round((fim - inicio) / passo)) + 1
+    return [round(inicio + i * passo, 4) for i in range(max(quantidade, 1))]
+
+
+def varrer(registros: list, limiares: list, margens: list) -> list:
+    """
+    Avalia cada combinação de limiar x margem (sem chamar o modelo) e marca
+    as que estão na fronteira de Pareto de acurácia x cobertura do modelo:
+    nenhuma outra combinação é melhor ou igual nas duas e melhor em uma.
+    """
+    pontos = []
+    for limiar in limiares:
+        for margem in margens:
+            resultado = avaliar(registros, limiar, margem)
+            pontos.append({
+                "limiar": limiar,
+                "margem": margem,
+                "acuracia": resultado["acuracia"],
+                "cobertura_modelo": resultado["cobertura_modelo"],
+                "fallback": resultado["estagios"]["low_confidence_fallback"]["participacao"],
+            })
+
+    for ponto in pontos:
+        ponto["pareto"] = not any(
+            outro["acuracia"] >= ponto["acuracia"]
+            and outro["cobertura_modelo"] >= ponto["cobertura_modelo"]
+            and (outro["acuracia"], outro["cobertura_modelo"])
+            != (ponto["acuracia"], ponto["cobertura_modelo"])
+            for outro in pontos
+        )
+    return pontos
@@ -0,0 +1,415 @@
+"""
+Backends do classificador zero-shot.
+Todos devolvem o mesmo contrato da Inference API da Hugging Face:
+    {"sequence": texto, "labels": [...], "scores": [...]}  (ordem decrescente)
+  - remoto: Inference API (padrão)
+  - local:  modelo NLI carregado uma vez por worker, rodando em CPU
+            (PyTorch, opcionalmente int8, ou ONNX Runtime)
+  - embedding: labels codificados uma vez numa matriz; cada email é
+            codificado uma vez e comparado com todos os labels num produto
+            de matrizes (1 passada do encoder em vez de 7 do cross-encoder)
+Escolha com CLASSIFIER_BACKEND=remoto|local|embedding.
+numpy, transformers e os modelos só são importados/carregados no primeiro uso.
+Autor: Micaías Viola
+Data: 2025-09-15
+"""
+import hashlib
+import logging
+import os
+import threading
+
+from utils.config import cabecalhos_classificador
+from utils.http_client import (
+    post_json, circuito_classificador, CircuitoAberto, FalhaUpstream
+)
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIGURAÇÕES
+# ==============================
+CLASSIFIER_BACKEND = os.getenv("CLASSIFIER_BACKEND", "remoto").lower()
+
+# Backend local
+LOCAL_MODEL = os.getenv("LOCAL_MODEL", "joeddav/xlm-roberta-large-xnli")  # id do Hub ou pasta
+LOCAL_RUNTIME = os.getenv("LOCAL_RUNTIME", "torch").lower()               # torch | onnx
+LOCAL_QUANTIZAR = os.getenv("LOCAL_QUANTIZAR", "").lower()                # "" | int8
+LOCAL_BATCH_SIZE = int(os.getenv("LOCAL_BATCH_SIZE", 16))                 # pares por forward
+LOCAL_NUM_THREADS = int(os.getenv("LOCAL_NUM_THREADS", 0))                # 0 = padrão da lib
+LOCAL_MAX_TOKENS = int(os.getenv("LOCAL_MAX_TOKENS", 512))
+# Sem rede: só usa arquivos já presentes no disco/cache do Hub
+LOCAL_OFFLINE = os.getenv("LOCAL_OFFLINE", os.getenv("HF_HUB_OFFLINE", "0")).lower() in ("1", "true")
+# Mesmo template padrão do pipeline zero-shot usado pela Inference API
+HYPOTHESIS_TEMPLATE = os.getenv("HYPOTHESIS_TEMPLATE", "This example is {}.")
+
+# Backend por embeddings
+EMBED_MODEL = os.getenv(
+    "EMBED_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+EMBED_CACHE_FILE = os.getenv("EMBED_CACHE_FILE", "")          # .npz com a matriz dos labels
+# Temperatura do softmax sobre as similaridades: deixa os scores na mesma
+# escala de probabilidade usada por CONFIDENCE_THRESHOLD/CONFIDENCE_MARGIN
+EMBED_TEMPERATURA = float(os.getenv("EMBED_TEMPERATURA", 0.05))
+
+
+def _ordenar(texto: str, labels: list, scores) -> dict:
+    pares = sorted(zip(labels, (float(s) for s in scores)), key=lambda p: p[1], reverse=True)
+    return {
+        "sequence": texto,
+        "labels": [p[0] for p in pares],
+        "scores": [p[1] for p in pares],
+    }
+
+
+class BackendClassificador:
+    """Interface: classifica vários textos contra os mesmos labels."""
+
+    nome = "base"
+
+    def classificar(self, textos: list, labels: list) -> list:
+        """
+        Retorna uma lista do mesmo tamanho de `textos` com o resultado
+        (labels/scores) de cada um, ou None onde não foi possível classificar.
+        """
+        raise NotImplementedError
+
+    def aquecer(self):
+        """Carrega o que for necessário antes da primeira requisição."""
+
+
+class BackendRemoto(BackendClassificador):
+    """Inference API da Hugging Face (um POST por lote)."""
+
+    nome = "remoto"
+
+    def __init__(self, url: str, headers: dict = None):
+        self.url = url
+        self.headers = headers  # None → token lido de utils.config a cada chamada
+
+    def classificar(self, textos: list, labels: list) -> list:
+        headers = self.headers or cabecalhos_classificador()
+        payload = {
+            "inputs": textos[0] if len(textos) == 1 else textos,
+            "parameters": {
+                "candidate_labels": labels,
+                "multi_label": False
+            },
+            "options": {"wait_for_model": True}
+        }
+        try:
+            resultado = post_json(self.url, payload, headers, circuito_classificador)
+        except CircuitoAberto:
+            logger.warning("API fora do ar (circuito aberto) → fallback imediato")
+            return [None] * len(textos)
+        except FalhaUpstream as e:
+            logger.warning("Todas as tentativas falharam (%s) → fallback", e)
+            return [None] * len(textos)
+        except ValueError as e:
+            logger.warning("Resposta da API não é JSON (%s) → fallback", e)
+            return [None] * len(textos)
+
+        # Um único input volta como dict; vários, como lista na mesma ordem
+        if isinstance(resultado, dict):
+            resultado = [resultado]
+        if not isinstance(resultado, list) or len(resultado) != len(textos):
+            logger.warning("Resposta da API com formato inesperado → fallback")
+            return [None] * len(textos)
+        return resultado
+
+
+class BackendLocal(BackendClassificador):
+    """
+    Zero-shot via NLI em CPU, igual ao pipeline da Hugging Face:
+    cada (email, hipótese) vira um par premissa/hipótese; o score de cada
+    label é o softmax dos logits de "entailment" entre os labels.
+    Todos os pares de todos os emails são agrupados em lotes de LOCAL_BATCH_SIZE.
+    """
+
+    nome = "local"
+
+    def __init__(self, modelo: str = LOCAL_MODEL, runtime: str = LOCAL_RUNTIME,
+                 quantizar: str = LOCAL_QUANTIZAR):
+        self.modelo = modelo
+        self.runtime = runtime
+        self.quantizar = quantizar
+        self._tokenizer = None
+        self._inferir = None  # função(dict de arrays numpy) -> logits numpy
+        self._entailment_id = None
+        self._carregar_lock = threading.Lock()
+        self._inferir_lock = threading.Lock()
+
+    # ---------- carregamento (uma vez por worker) ----------
+    def aquecer(self):
+        if self._inferir is not None:
+            return
+        with self._carregar_lock:
+            if self._inferir is not None:
+                return
+            from transformers import AutoConfig, AutoTokenizer
+
+            logger.info("Carregando modelo local '%s' (%s%s)", self.modelo, self.runtime,
+                        ", " + self.quantizar if self.quantizar else "")
+            config = AutoConfig.from_pretrained(self.modelo, local_files_only=LOCAL_OFFLINE)
+            self._entailment_id = next(
+                (i for rotulo, i in config.label2id.items() if rotulo.lower().startswith("entail")),
+                -1,
+            )
+            self._tokenizer = AutoTokenizer.from_pretrained(
+                self.modelo, local_files_only=LOCAL_OFFLINE)
+
+            if self.runtime == "onnx":
+                self._inferir = self._carregar_onnx()
+            else:
+                self._inferir = self._carregar_torch()
+
+    def _carregar_torch(self):
+        import torch
+        from transformers import AutoModelForSequenceClassification
+
+        if LOCAL_NUM_THREADS:
+            torch.set_num_threads(LOCAL_NUM_THREADS)
+        modelo = AutoModelForSequenceClassification.from_pretrained(
+            self.modelo, local_files_only=LOCAL_OFFLINE)
+        modelo.eval()
+        if self.quantizar == "int8":
+            # Quantização dinâmica: pesos das camadas Linear em int8
+            modelo = torch.quantization.quantize_dynamic(
+                modelo, {torch.nn.Linear}, dtype=torch.qint8)
+
+        def inferir(entradas: dict):
+            with torch.inference_mode():
+                tensores = {k: torch.from_numpy(v) for k, v in entradas.items()}
+                return modelo(**tensores).logits.numpy()
+
+        return inferir
+
+    def _carregar_onnx(self):
+        """
+        Espera uma pasta com model.onnx (ex.: exportada com
+        `optimum-cli export onnx --model joeddav/xlm-roberta-large-xnli pasta/`).
+        Com LOCAL_QUANTIZAR=int8 gera model.int8.onnx na primeira vez.
+        """
+        import onnxruntime as ort
+
+        caminho = os.path.join(self.modelo, "model.onnx")
+        if self.quantizar == "int8":
+            caminho_int8 = os.path.join(self.modelo, "model.int8.onnx")
+            if not os.path.exists(caminho_int8):
+                from onnxruntime.quantization import quantize_dynamic, QuantType
+                quantize_dynamic(caminho, caminho_int8, weight_type=QuantType.QInt8)
+            caminho = caminho_int8
+
+        opcoes = ort.SessionOptions()
+        if LOCAL_NUM_THREADS:
+            opcoes.intra_op_num_threads = LOCAL_NUM_THREADS
+        sessao = ort.InferenceSession(caminho, opcoes, providers=["CPUExecutionProvider"])
+        nomes = {entrada.name for entrada in sessao.get_inputs()}
+
+        import numpy as np
+
+        def inferir(entradas: dict):
+            feed = {k: v.astype(np.int64) for k, v in entradas.items() if k in nomes}
+            return sessao.run(None, feed)[0]
+
+        return inferir
+
+    # ---------- inferência ----------
+    def classificar(self, textos: list, labels: list) -> list:
+        try:
+            return self._classificar(textos, labels)
+        except Exception:
+            # Modelo que não carrega ou falha na inferência: fallback, como no remoto
+            logger.exception("Falha no modelo local '%s' → fallback", self.modelo)
+            return [None] * len(textos)
+
+    def _classificar(self, textos: list, labels: list) -> list:
+        import numpy as np
+
+        self.aquecer()
+        hipoteses = [HYPOTHESIS_TEMPLATE.format(label) for label in labels]
+        premissas = [t for t in textos for _ in hipoteses]
+        pares_hipoteses = hipoteses * len(textos)
+
+        logits = []
+        for i in range(0, len(premissas), LOCAL_BATCH_SIZE):
+            entradas = self._tokenizer(
+                premissas[i:i + LOCAL_BATCH_SIZE],
+                pares_hipoteses[i:i + LOCAL_BATCH_SIZE],
+                padding=True,
+                truncation="only_first",
+                max_length=LOCAL_MAX_TOKENS,
+                return_tensors="np",
+            )
+            with self._inferir_lock:
+                logits.append(self._inferir(dict(entradas)))
+
+        entail = np.concatenate(logits)[:, self._entailment_id].reshape(len(textos), len(labels))
+        entail = entail - entail.max(axis=1, keepdims=True)  # estabilidade numérica
+        scores = np.exp(entail) / np.exp(entail).sum(axis=1, keepdims=True)
+
+        return [_ordenar(texto, labels, linha) for texto, linha in zip(textos, scores)]
+
+
+class BackendEmbedding(BackendClassificador):
+    """
+    Classificação por similaridade de embeddings.
+    Os labels são codificados uma única vez (ou lidos de EMBED_CACHE_FILE)
+    e guardados numa matriz NumPy normalizada (labels × dimensão).
+    Cada email é codificado uma vez; os scores saem de um único produto
+    de matrizes seguido de softmax com temperatura.
+    """
+
+    nome = "embedding"
+
+    def __init__(self, modelo: str = EMBED_MODEL, arquivo_cache: str = EMBED_CACHE_FILE,
+                 temperatura: float = EMBED_TEMPERATURA):
+        self.modelo = modelo
+        self.arquivo_cache = arquivo_cache
+        self.temperatura = temperatura
+        self._tokenizer = None
+        self._encoder = None
+        self._labels = None
+        self._matriz_labels = None
+        self._carregar_lock = threading.RLock()
+        self._inferir_lock = threading.Lock()
+
+    def _carregar_encoder(self):
+        if self._encoder is not None:
+            return
+        with self._carregar_lock:
+            if self._encoder is None:
+                self._encoder = self._montar_encoder()
+
+    def _montar_encoder(self):
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        logger.info("Carregando encoder '%s'", self.modelo)
+        if LOCAL_NUM_THREADS:
+            torch.set_num_threads(LOCAL_NUM_THREADS)
+        self._tokenizer = AutoTokenizer.from_pretrained(self.modelo, local_files_only=LOCAL_OFFLINE)
+        modelo = AutoModel.from_pretrained(self.modelo, local_files_only=LOCAL_OFFLINE)
+        modelo.eval()
+        if LOCAL_QUANTIZAR == "int8":
+            modelo = torch.quantization.quantize_dynamic(
+                modelo, {torch.nn.Linear}, dtype=torch.qint8)
+
+        def encoder(entradas: dict):
+            with torch.inference_mode():
+                tensores = {k: torch.from_numpy(v) for k, v in entradas.items()}
+                return modelo(**tensores).last_hidden_state.numpy()
+
+        return encoder
+
+    def codificar(self, textos: list) -> "np.ndarray":
+        """Embeddings normalizados (mean pooling), um por linha."""
+        import numpy as np
+
+        self._carregar_encoder()
+        vetores = []
+        for i in range(0, len(textos), LOCAL_BATCH_SIZE):
+            entradas = self._tokenizer(
+                textos[i:i + LOCAL_BATCH_SIZE],
+                padding=True,
+                truncation=True,
+                max_length=LOCAL_MAX_TOKENS,
+                return_tensors="np",
+            )
+            with self._inferir_lock:
+                estados = self._encoder(dict(entradas))
+            mascara = entradas["attention_mask"][..., None].astype(estados.dtype)
+            medias = (estados * mascara).sum(axis=1) / np.clip(mascara.sum(axis=1), 1e-9, None)
+            vetores.append(medias)
+        vetores = np.concatenate(vetores).astype(np.float32)
+        return vetores / np.clip(np.linalg.norm(vetores, axis=1, keepdims=True), 1e-12, None)
+
+    def _chave_labels(self, labels: list) -> str:
+        base = self.modelo + "\x00" + "\x00".join(labels)
+        return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+    def preparar_labels(self, labels: list) -> "np.ndarray":
+        """Matriz dos labels: memória → arquivo de cache → codifica e salva."""
+        import numpy as np
+
+        if self._labels == list(labels):
+            return self._matriz_labels
+        with self._carregar_lock:
+            if self._labels == list(labels):
+                return self._matriz_labels
+            chave = self._chave_labels(labels)
+            matriz = None
+            if self.arquivo_cache and os.path.exists(self.arquivo_cache):
+                with np.load(self.arquivo_cache) as dados:
+                    if str(dados["chave"]) == chave:
+                        matriz = dados["matriz"]
+                        logger.info("Embeddings dos labels lidos de %s", self.arquivo_cache)
+            if matriz is None:
+                matriz = self.codificar(list(labels))
+                if self.arquivo_cache:
+                    with open(self.arquivo_cache, "wb") as f:
+                        np.savez(f, chave=chave, matriz=matriz)
+            self._matriz_labels = matriz
+            self._labels = list(labels)
+            return matriz
+
+    def aquecer(self, labels: list = None):
+        self._carregar_encoder()
+        if labels:
+            self.preparar_labels(labels)
+
+    def classificar(self, textos: list, labels: list) -> list:
+        try:
+            return self._classificar(textos, labels)
+        except Exception:
+            logger.exception("Falha no encoder '%s' → fallback", self.modelo)
+            return [None] * len(textos)
+
+    def _classificar(self, textos: list, labels: list) -> list:
+        import numpy as np
+
+        matriz_labels = self.preparar_labels(labels)
+        similaridades = self.codificar(textos) @ matriz_labels.T   # (emails × labels)
+        logits = similaridades / self.temperatura
+        logits = logits - logits.max(axis=1, keepdims=True)
+        scores = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+        return [_ordenar(texto, labels, linha) for texto, linha in zip(textos, scores)]
+
+
+# ==============================
+# SELEÇÃO DO BACKEND
+# ==============================
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def obter_backend(url: str = None, headers: dict = None) -> BackendClassificador:
+    """Backend do processo, criado na primeira chamada conforme CLASSIFIER_BACKEND."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if CLASSIFIER_BACKEND == "local":
+                    _backend = BackendLocal()
+                elif CLASSIFIER_BACKEND == "embedding":
+                    _backend = obter_backend_embedding()
+                elif CLASSIFIER_BACKEND == "remoto":
+                    _backend = BackendRemoto(url, headers)
+                else:
+                    raise ValueError(
+                        f"CLASSIFIER_BACKEND inválido: '{CLASSIFIER_BACKEND}' "
+                        "(use remoto, local ou embedding)")
+    return _backend
+
+
+_backend_embedding = None
+# Lock próprio: obter_backend chama obter_backend_embedding segurando _backend_lock
+_backend_embedding_lock = threading.Lock()
+
+
+def obter_backend_embedding() -> BackendEmbedding:
+    """Backend por embeddings do processo (usado também pelo modo rápido)."""
+    global _backend_embedding
+    if _backend_embedding is None:
+        with _backend_embedding_lock:
+            if _backend_embedding is None:
+                _backend_embedding = BackendEmbedding()
+    return _backend_embedding
@@ -0,0 +1,248 @@
+"""
+Cache de resultados (classificação e resposta gerada) endereçado por conteúdo.
+Duas camadas:
+  1. Memória do processo — LRU com TTL e limite de itens
+  2. Disco (opcional) — SQLite compartilhado entre os workers do gunicorn
+Autor: Micaías Viola
+Data: 2025-09-05
+"""
+import hashlib
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from utils.texto import normalizar_espacos
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIGURAÇÕES
+# ==============================
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() == "true"
+CACHE_TTL = float(os.getenv("CACHE_TTL", 24 * 60 * 60))       # segundos
+CACHE_MAX_ITENS = int(os.getenv("CACHE_MAX_ITENS", 2048))      # camada memória
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH")             # camada disco (opcional)
+# Linhas expiradas do SQLite são apagadas ao abrir e a cada N gravações
+CACHE_LIMPEZA_ESCRITAS = int(os.getenv("CACHE_LIMPEZA_ESCRITAS", 1000))
+
+
+def caminho_sqlite(variavel: str, arquivo: str):
+    """
+    Caminho do SQLite em `variavel`. Sem a variável, um arquivo `arquivo` no
+    diretório temporário (o mesmo para todos os workers da máquina); com a
+    variável vazia, None (só memória — serve apenas com um worker).
+    """
+    valor = os.getenv(variavel)
+    if valor is None:
+        return os.path.join(tempfile.gettempdir(), arquivo)
+    return valor or None
+
+
+def normalizar_texto(texto: str) -> str:
+    """Mesma normalização de espaços usada pelo classificador."""
+    return normalizar_espacos(texto)
+
+
+def chave_cache(texto: str, modelo: str, versao: str = "") -> str:
+    """
+    Gera a chave do cache: hash do texto normalizado + modelo + versão do prompt.
+    Trocar o modelo ou o prompt invalida as entradas antigas automaticamente.
+    """
+    base = f"{modelo}\x00{versao}\x00{normalizar_texto(texto)}"
+    return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+
+class CacheLRU:
+    """LRU em memória, thread-safe, com expiração por TTL."""
+
+    def __init__(self, max_itens: int = CACHE_MAX_ITENS, ttl: float = CACHE_TTL):
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self._dados = OrderedDict()  # chave -> (expira_em, valor)
+        self._lock = threading.Lock()
+
+    def obter(self, chave: str):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                return None
+            expira_em, valor = item
+            if expira_em < time.time():
+                del self._dados[chave]
+                return None
+            self._dados.move_to_end(chave)  # marca como usado recentemente
+            return valor
+
+    def guardar(self, chave: str, valor, ttl: float = None):
+        expira_em = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._dados[chave] = (expira_em, valor)
+            self._dados.move_to_end(chave)
+            # Remove os menos usados quando passa do limite
+            while len(self._dados) > self.max_itens:
+                self._dados.popitem(last=False)
+
+    def remover(self, chave: str):
+        with self._lock:
+            self._dados.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+
+    def __len__(self):
+        return len(self._dados)
+
+
+class CacheSQLite:
+    """
+    Camada em disco com SQLite (modo WAL), compartilhada entre processos.
+    Valores são guardados como JSON. Uma conexão por thread e por processo:
+    após o fork (gunicorn --preload) o worker abre a sua em vez de herdar a do master.
+    As linhas expiradas são apagadas ao abrir e a cada `limpar_a_cada` gravações
+    deste processo (ler uma expirada também a apaga).
+    """
+
+    def __init__(self, caminho: str, ttl: float = CACHE_TTL, tabela: str = "cache",
+                 limpar_a_cada: int = CACHE_LIMPEZA_ESCRITAS):
+        self.caminho = caminho
+        self.ttl = ttl
+        self.tabela = tabela
+        self.limpar_a_cada = limpar_a_cada
+        self._escritas = itertools.count(1)
+        self._local = threading.local()
+        with self._conexao() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.tabela} ("
+                "chave TEXT PRIMARY KEY, valor TEXT NOT NULL, expira_em REAL NOT NULL)"
+            )
+        self._limpar_sem_falhar()
+
+    def _conexao(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.caminho, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def obter(self, chave: str):
+        linha = self._conexao().execute(
+            f"SELECT valor, expira_em FROM {self.tabela} WHERE chave = ?", (chave,)
+        ).fetchone()
+        if linha is None:
+            return None
+        valor, expira_em = linha
+        if expira_em < time.time():
+            self.remover(chave)
+            return None
+        return json.loads(valor)
+
+    def guardar(self, chave: str, valor, ttl: float = None):
+        expira_em = time.time() + (self.ttl if ttl is None else ttl)
+        with self._conexao() as conn:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {self.tabela} (chave, valor, expira_em) VALUES (?, ?, ?)",
+                (chave, json.dumps(valor, ensure_ascii=False), expira_em),
+            )
+        if self.limpar_a_cada and next(self._escritas) % self.limpar_a_cada == 0:
+            self._limpar_sem_falhar()
+
+    def remover(self, chave: str):
+        with self._conexao() as conn:
+            conn.execute(f"DELETE FROM {self.tabela} WHERE chave = ?", (chave,))
+
+    def limpar_expirados(self):
+        with self._conexao() as conn:
+            conn.execute(f"DELETE FROM {self.tabela} WHERE expira_em < ?", (time.time(),))
+
+    def _limpar_sem_falhar(self):
+        # A limpeza é só manutenção: banco ocupado fica para a próxima vez
+        try:
+            self.limpar_expirados()
+        except sqlite3.Error as e:
+            logger.warning("Erro ao limpar expirados de '%s': %s", self.tabela, e)
+
+
+class CacheResultados:
+    """
+    Combina memória + disco e conta hits/misses.
+    Leitura: memória → disco (promove para memória) → miss.
+    Escrita: grava nas duas camadas.
+    """
+
+    def __init__(self, memoria: CacheLRU, disco: CacheSQLite = None, ativo: bool = True):
+        self.memoria = memoria
+        self.disco = disco
+        self.ativo = ativo
+        self._lock = threading.Lock()
+        self._contadores = {"hits_memoria": 0, "hits_disco": 0, "misses": 0, "escritas": 0}
+
+    def _contar(self, nome: str):
+        with self._lock:
+            self._contadores[nome] += 1
+
+    def obter(self, chave: str):
+        if not self.ativo:
+            return None
+        valor = self.memoria.obter(chave)
+        if valor is not None:
+            self._contar("hits_memoria")
+            return valor
+        if self.disco is not None:
+            try:
+                valor = self.disco.obter(chave)
+            except sqlite3.Error as e:
+                logger.warning("Erro ao ler cache em disco: %s", e)
+                valor = None
+            if valor is not None:
+                self.memoria.guardar(chave, valor)
+                self._contar("hits_disco")
+                return valor
+        self._contar("misses")
+        return None
+
+    def guardar(self, chave: str, valor):
+        if not self.ativo:
+            return
+        self.memoria.guardar(chave, valor)
+        if self.disco is not None:
+            try:
+                self.disco.guardar(chave, valor)
+            except sqlite3.Error as e:
+                logger.warning("Erro ao gravar cache em disco: %s", e)
+        self._contar("escritas")
+
+    def estatisticas(self) -> dict:
+        with self._lock:
+            dados = dict(self._contadores)
+        hits = dados["hits_memoria"] + dados["hits_disco"]
+        total = hits + dados["misses"]
+        dados["hits"] = hits
+        dados["taxa_acerto"] = round(hits / total, 4) if total else 0.0
+        dados["itens_memoria"] = len(self.memoria)
+        dados["disco"] = self.disco is not None
+        return dados
+
+
+def _criar_cache() -> CacheResultados:
+    """Monta o cache a partir das variáveis de ambiente."""
+    disco = None
+    if CACHE_ENABLED and CACHE_SQLITE_PATH:
+        try:
+            disco = CacheSQLite(CACHE_SQLITE_PATH)
+        except sqlite3.Error as e:
+            logger.warning("Cache em disco indisponível (%s) → só memória", e)
+    return CacheResultados(CacheLRU(), disco, ativo=CACHE_ENABLED)
+
+
+# Instância compartilhada pelo processo
+cache_resultados = _criar_cache()
@@ -5,23 +5,30 @@ Autor: Micaías Viola
 Data: 2025-08-29
 """
 
+import contextvars
 import os
-import requests
-from dotenv import load_dotenv
+import logging
 import time
-import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils import metricas
+from utils.backends import CLASSIFIER_BACKEND, obter_backend, obter_backend_embedding
+from utils.limites import orcamento_upstream
+from utils.palavras_chave import (
+    KEYWORDS_PRODUTIVO, KEYWORDS_GOLPE, KEYWORDS_MARKETING, motor_palavras_chave
+)
+from utils.preprocessamento import limpar, classificar_em_trechos
 
 # ==============================
 # CONFIGURAÇÕES
 # ==============================
-load_dotenv()
-HF_API_TOKEN = os.getenv("HF_API_TOKEN")
-if not HF_API_TOKEN:
-    raise ValueError("Defina HF_API_TOKEN no .env")
+# O .env já foi carregado por utils/config.py; o token (HF_API_TOKEN) só é
+# exigido na primeira chamada ao backend remoto
+logger = logging.getLogger(__name__)
 
 HF_MODEL = "joeddav/xlm-roberta-large-xnli"
-HF_API_URL = f"https://api-inference.huggingface.co/models/{HF_MODEL}"
-HEADERS = {"Authorization": f"Bearer {HF_API_TOKEN}"}
+HF_API_URL = os.getenv(
+    "HF_API_URL", f"https://api-inference.huggingface.co/models/{HF_MODEL}")
 
 # Classes mais separadas para melhorar precisão
 CANDIDATE_LABELS = [
@@ -44,128 +51,319 @@ LABEL_MAP = {
     "email de saudações, datas comemorativas ou felicitações (improdutivo)": "Improdutivo"
 }
 
+# Sub-rótulo de cada label (usado para escolher o modelo de resposta)
+SUBROTULOS = {
+    "email sobre trabalho, projetos, tarefas, reuniões ou negócios (produtivo)": "trabalho",
+    "email solicitando informações, orçamento ou documentos profissionais (produtivo)": "solicitacao",
+    "email solicitando suporte técnico ou resolução de problemas (produtivo)": "suporte",
+    "email de propaganda ou marketing legítimo (improdutivo)": "marketing",
+    "email de golpe, phishing, fraude ou scam (improdutivo)": "golpe",
+    "email pessoal, cumprimentos, conversa informal, correntes ou brincadeiras (improdutivo)": "pessoal",
+    "email de saudações, datas comemorativas ou felicitações (improdutivo)": "saudacao"
+}
+
 # Ajuste para evitar falsos positivos
 CONFIDENCE_THRESHOLD = 0.75
 CONFIDENCE_MARGIN = 0.15
 
-# Heurísticas — primeiro filtro rápido
-KEYWORDS_PRODUTIVO = [
-    "proposta", "orçamento", "reunião", "documento", "contrato", "pedido",
-    "suporte", "assistência", "erro", "problema", "bloqueio", "relatório",
-    "projeto", "implementação", "análise", "negócio", "parceria", "pagamento"
-]
+# Heurísticas — as listas KEYWORDS_* e o motor de busca ficam em
+# utils/palavras_chave.py (importadas acima para manter compatibilidade)
 
-# Golpes e spam explícitos — prioridade máxima
-KEYWORDS_GOLPE = [
-    "parabéns", "contemplado", "benefício exclusivo", "últimos dígitos do cpf",
-    "clique no link", "carro zero", "pix imediato", "ganhou", "prêmio", "sorteio",
-    "transferência imediata", "oferta imperdível", "bônus garantido", "resgate seu benefício"
-]
+# Lote — quantos emails vão em cada chamada e quantas chamadas simultâneas
+BATCH_SIZE = int(os.getenv("HF_BATCH_SIZE", "8"))
+BATCH_MAX_WORKERS = int(os.getenv("HF_BATCH_MAX_WORKERS", "4"))
 
-# Marketing genérico (não golpe, mas improdutivo)
-KEYWORDS_MARKETING = [
-    "desconto", "promoção", "ganhe", "oferta", "cupom", "publicidade",
-    "cashback", "black friday", "frete grátis", "oferta relâmpago"
-]
+# Origens de decisões provisórias (IA fora do ar ou sem cota): não vão para o cache
+ORIGENS_PROVISORIAS = ("erro_api", "orcamento")
 
 
-def classificar_email(email_content: str) -> str:
+def _registrar_decisao(categoria: str, caminho: str):
+    """Contadores por categoria final e por caminho de decisão (ver /metrics)."""
+    metricas.categorias.inc(category=categoria)
+    metricas.decisoes.inc(path=caminho)
+
+
+def _detalhe(categoria: str, origem: str, subrotulo: str = None, score: float = None) -> dict:
+    return {"categoria": categoria, "origem": origem, "subrotulo": subrotulo, "score": score}
+
+
+def _detalhe_heuristico(decisao: str, ocorrencias: dict) -> dict:
+    """Decisão do _pre_filtro: golpe, marketing ou email curto (sem ocorrências)."""
+    if ocorrencias.get("golpe"):
+        subrotulo = "golpe"
+    elif ocorrencias.get("marketing"):
+        subrotulo = "marketing"
+    else:
+        subrotulo = "curto"
+    return _detalhe(decisao, "heuristica", subrotulo, 1.0)
+
+
+def _fallback_por_erro(email_content: str, heuristica_produtivo: bool) -> dict:
+    """IA indisponível ou resposta inválida → heurísticas, origem 'erro_api'."""
+    categoria = fallback_classificacao(email_content, heuristica_produtivo, "api_error")
+    _registrar_decisao(categoria, "api_error")
+    return _detalhe(categoria, "erro_api")
+
+
+def orcamento_no_fim() -> bool:
+    """Cota da Hugging Face no fim: pula o modelo remoto (os locais não gastam cota)."""
+    return CLASSIFIER_BACKEND == "remoto" and orcamento_upstream.degradado()
+
+
+def _fallback_por_orcamento(email_content: str, heuristica_produtivo: bool) -> dict:
+    """Sem cota para a IA → heurísticas, origem 'orcamento'."""
+    categoria = fallback_classificacao(email_content, heuristica_produtivo, "budget")
+    _registrar_decisao(categoria, "budget_low")
+    return _detalhe(categoria, "orcamento")
+
+
+def _pre_filtro(email_content: str) -> tuple:
     """
-    Classifica um email como Produtivo ou Improdutivo usando IA Zero-Shot.
-    Incluí heurísticas fortes para golpes, thresholds mais altos e logs detalhados.
+    Limpa o texto (citações, assinaturas, avisos — ver utils/preprocessamento.py)
+    e aplica as heurísticas rápidas.
+    Retorna (texto_normalizado, decisao_ou_None, heuristica_produtivo, ocorrencias).
+    Quando a decisão não é None o email nem precisa ir para a IA.
+    ocorrencias é o retorno de motor_palavras_chave.buscar (vazio p/ emails curtos).
     """
-    # Normaliza espaços e caracteres
-    email_content = re.sub(r"\s+", " ", email_content).strip()
+    with metricas.cronometrar(metricas.filtro_palavras_chave, "keywords"):
+        # Corta o excesso, remove o que não é a mensagem e normaliza espaços
+        email_content = limpar(email_content)
 
-    # Se o e-mail está vazio ou muito curto → improdutivo
-    if not email_content or len(email_content.split()) < 3:
-        print("[LOG] Email muito curto → 'Improdutivo'")
-        return "Improdutivo"
+        # Se o e-mail está vazio ou muito curto → improdutivo
+        if not email_content or len(email_content.split()) < 3:
+            logger.debug("Email muito curto → 'Improdutivo'")
+            _registrar_decisao("Improdutivo", "short")
+            return email_content, "Improdutivo", False, {}
 
-    lower_content = email_content.lower()
+        # Uma única passada encontra golpe, marketing e produtivo
+        ocorrencias = motor_palavras_chave.buscar(email_content)
 
     # 1) Golpes têm prioridade máxima → bloqueia antes da IA
-    if any(k in lower_content for k in KEYWORDS_GOLPE):
-        print("[LOG] Palavra-chave de golpe detectada → 'Improdutivo'")
-        return "Improdutivo"
+    if ocorrencias["golpe"]:
+        logger.info("Palavra-chave de golpe detectada → 'Improdutivo'")
+        _registrar_decisao("Improdutivo", "scam_keyword")
+        return email_content, "Improdutivo", False, ocorrencias
 
     # 2) Marketing detectado → improdutivo
-    if any(k in lower_content for k in KEYWORDS_MARKETING):
-        print("[LOG] Palavra-chave de marketing detectada → 'Improdutivo'")
-        return "Improdutivo"
+    if ocorrencias["marketing"]:
+        logger.info("Palavra-chave de marketing detectada → 'Improdutivo'")
+        _registrar_decisao("Improdutivo", "marketing_keyword")
+        return email_content, "Improdutivo", False, ocorrencias
 
     # 3) Palavras produtivas → sinal verde provisório, mas ainda passará pela IA
-    heuristica_produtivo = any(k in lower_content for k in KEYWORDS_PRODUTIVO)
-
-    # 4) Prepara requisição para IA
-    payload = {
-        "inputs": email_content,
-        "parameters": {
-            "candidate_labels": CANDIDATE_LABELS,
-            "multi_label": False
-        },
-        "options": {"wait_for_model": True}
-    }
-
-    # Tenta 3 vezes em caso de falha
-    for attempt in range(3):
-        try:
-            response = requests.post(
-                HF_API_URL, headers=HEADERS, json=payload, timeout=60)
-            response.raise_for_status()
-            result = response.json()
-
-            # Verifica se o resultado da API contém as chaves esperadas "labels" e "scores"
-            if "labels" in result and "scores" in result:
-                labels = result["labels"]
-                scores = result["scores"]
-
-                # Log detalhado
-                print("\n[LOG] --- RESULTADO IA ---")
-                # Percorre cada par de label e score para log
-                for label, score in zip(labels, scores):
-                    print(f"[LOG] {label}: {score:.4f}")
-                print("[LOG] ----------------------")
-
-                top_score = scores[0] # Maior score, API da hugging face já ordena em orden decrescente
-                second_score = scores[1] if len(scores) > 1 else 0
-                top_label = labels[0] # Pega o label com maior score
-                final_label = LABEL_MAP.get(top_label, "Improdutivo") # Utiliza o LABEL_MAP para converter para "Produtivo" ou "Improdutivo"
-
-                # 5) Confiança mínima — só confia se score for bem alto
-                if top_score < CONFIDENCE_THRESHOLD or (top_score - second_score) < CONFIDENCE_MARGIN:
-                    print(
-                        f"[LOG] Confiança baixa ({top_score:.2f}) → fallback")
-                    return fallback_classificacao(email_content, heuristica_produtivo)
-
-                # 6) IA validou → retorna
-                print(
-                    f"[LOG] Escolhido: '{final_label}' (confiança: {top_score:.2f})")
-                return final_label
-
-            print("[LOG] Resposta inesperada da IA → fallback")
-            return fallback_classificacao(email_content, heuristica_produtivo)
-
-        except requests.exceptions.Timeout:
-            print(f"[LOG] Timeout na API, tentativa {attempt+1}/3...")
-            time.sleep(2)
-        except Exception as e:
-            print(f"[LOG] Erro na API: {e}")
-            time.sleep(2)
-
-    print("[LOG] Todas as tentativas falharam → fallback")
-    return fallback_classificacao(email_content, heuristica_produtivo)
-
-
-def fallback_classificacao(email_content: str, heuristica_produtivo: bool) -> str:
+    heuristica_produtivo = bool(ocorrencias["produtivo"])
+    return email_content, None, heuristica_produtivo, ocorrencias
+
+
+def confianca_suficiente(scores: list, limiar: float = None, margem: float = None) -> bool:
+    """Score do primeiro label acima do limiar e distante o bastante do segundo."""
+    limiar = CONFIDENCE_THRESHOLD if limiar is None else limiar
+    margem = CONFIDENCE_MARGIN if margem is None else margem
+    top_score = scores[0]
+    second_score = scores[1] if len(scores) > 1 else 0
+    return top_score >= limiar and (top_score - second_score) >= margem
+
+
+def _decidir_por_resultado(result, email_content: str, heuristica_produtivo: bool) -> dict:
+    """
+    Aplica threshold/margem sobre a resposta da IA (labels/scores).
+    Retorna {'categoria', 'origem', 'subrotulo', 'score'} onde origem é 'modelo',
+    'fallback' (confiança baixa) ou 'erro_api' (resposta inválida).
+    No fallback o sub-rótulo da IA só é mantido se concordar com a categoria final.
+    """
+    # Verifica se o resultado da API contém as chaves esperadas "labels" e "scores"
+    if not isinstance(result, dict) or "labels" not in result or "scores" not in result:
+        logger.warning("Resposta inesperada da IA → fallback")
+        return _fallback_por_erro(email_content, heuristica_produtivo)
+
+    labels = result["labels"]
+    scores = result["scores"]
+
+    # Log detalhado (só em LOG_LEVEL=DEBUG)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Resultado IA: %s", ", ".join(
+            f"{label}: {score:.4f}" for label, score in zip(labels, scores)))
+
+    top_score = scores[0] # Maior score, API da hugging face já ordena em orden decrescente
+    top_label = labels[0] # Pega o label com maior score
+    final_label = LABEL_MAP.get(top_label, "Improdutivo") # Utiliza o LABEL_MAP para converter para "Produtivo" ou "Improdutivo"
+
+    # 5) Confiança mínima — só confia se score for bem alto
+    if not confianca_suficiente(scores):
+        logger.info("Confiança baixa (%.2f) → fallback", top_score)
+        categoria = fallback_classificacao(email_content, heuristica_produtivo, "low_confidence")
+        _registrar_decisao(categoria, "low_confidence_fallback")
+        subrotulo = SUBROTULOS.get(top_label) if categoria == final_label else None
+        return _detalhe(categoria, "fallback", subrotulo, top_score)
+
+    # 6) IA validou → retorna
+    logger.info("Escolhido: '%s' (confiança: %.2f)", final_label, top_score)
+    _registrar_decisao(final_label, "model")
+    return _detalhe(final_label, "modelo", SUBROTULOS.get(top_label), top_score)
+
+
+def modelo_do_backend(backend) -> str:
+    """Modelo que define o orçamento de tokens (o remoto usa HF_MODEL)."""
+    return getattr(backend, "modelo", HF_MODEL)
+
+
+def _consultar_modelo(textos: list) -> list:
+    """
+    Envia um lote de textos para o backend zero-shot configurado
+    (remoto ou local, ver utils/backends.py). Emails maiores que o orçamento
+    do modelo vão em vários trechos, com os scores agregados.
+    Retorna uma lista com o resultado de cada texto, ou None onde falhou.
+    """
+    backend = obter_backend(HF_API_URL)
+    return classificar_em_trechos(
+        backend.classificar, textos, CANDIDATE_LABELS, modelo_do_backend(backend))
+
+
+def classificar_email_detalhado(email_content: str) -> dict:
+    """
+    Classificação com os detalhes da decisão:
+        {'categoria': 'Produtivo'|'Improdutivo',
+         'origem': 'heuristica'|'modelo'|'fallback'|'erro_api'|'orcamento',
+         'subrotulo': 'trabalho'|'solicitacao'|'suporte'|'marketing'|'golpe'|
+                      'pessoal'|'saudacao'|'curto'|None,
+         'score': confiança do label escolhido (1.0 nas heurísticas) ou None}
+    'orcamento' = a cota da Hugging Face está no fim e só as heurísticas decidiram.
+    """
+    email_content, decisao, heuristica_produtivo, ocorrencias = _pre_filtro(email_content)
+    if decisao is not None:
+        return _detalhe_heuristico(decisao, ocorrencias)
+    if orcamento_no_fim():
+        return _fallback_por_orcamento(email_content, heuristica_produtivo)
+
+    # 4) Envia para a IA
+    result = _consultar_modelo([email_content])[0]
+    if result is None:
+        return _fallback_por_erro(email_content, heuristica_produtivo)
+
+    return _decidir_por_resultado(result, email_content, heuristica_produtivo)
+
+
+def classificar_email_com_origem(email_content: str) -> tuple:
+    """
+    Igual a classificar_email, mas retorna (categoria, origem), onde origem é
+    'heuristica', 'modelo', 'fallback' (confiança baixa) ou 'erro_api'
+    (IA indisponível/resposta inválida — resultado não deve ser reaproveitado).
+    """
+    detalhe = classificar_email_detalhado(email_content)
+    return detalhe["categoria"], detalhe["origem"]
+
+
+def classificar_email(email_content: str) -> str:
+    """
+    Classifica um email como Produtivo ou Improdutivo usando IA Zero-Shot.
+    Incluí heurísticas fortes para golpes, thresholds mais altos e logs detalhados.
+    """
+    categoria, _ = classificar_email_com_origem(email_content)
+    return categoria
+
+
+def classificar_email_rapido(email_content: str) -> str:
+    """
+    Modo rápido: mesmas heurísticas e mesma regra de confiança, mas a IA é o
+    backend por embeddings (labels pré-codificados + 1 produto de matrizes),
+    independente de CLASSIFIER_BACKEND. Roda em CPU sem chamadas remotas.
+    """
+    email_content, decisao, heuristica_produtivo, _ = _pre_filtro(email_content)
+    if decisao is not None:
+        return decisao
+
+    backend = obter_backend_embedding()
+    result = classificar_em_trechos(
+        backend.classificar, [email_content], CANDIDATE_LABELS, modelo_do_backend(backend))[0]
+    return _decidir_por_resultado(result, email_content, heuristica_produtivo)["categoria"]
+
+
+def classificar_emails(emails: list) -> list:
+    """
+    Classifica vários emails de uma vez.
+    Os que passam pelo filtro de palavras-chave são agrupados em lotes de
+    BATCH_SIZE e enviados à IA com no máximo BATCH_MAX_WORKERS chamadas simultâneas.
+
+    Returns:
+        list[dict]: na mesma ordem da entrada, cada item com
+        {'categoria', 'origem': 'heuristica'|'modelo'|'fallback'|'erro_api'|'orcamento',
+         'subrotulo', 'score', 'tempo_ms'} (ver classificar_email_detalhado)
+    """
+    resultados = [None] * len(emails)
+    pendentes = []  # (indice, texto_normalizado, heuristica_produtivo, tempo_pre_filtro)
+
+    # 1) Filtro rápido item a item
+    for indice, email in enumerate(emails):
+        inicio = time.perf_counter()
+        texto, decisao, heuristica_produtivo, ocorrencias = _pre_filtro(email or "")
+        decorrido = time.perf_counter() - inicio
+        if decisao is not None:
+            resultados[indice] = _detalhe_heuristico(decisao, ocorrencias)
+            resultados[indice]["tempo_ms"] = round(decorrido * 1000, 3)
+        else:
+            pendentes.append((indice, texto, heuristica_produtivo, decorrido))
+
+    if not pendentes:
+        return resultados
+
+    # Sem cota para a IA: o restante fica com as heurísticas
+    if orcamento_no_fim():
+        for indice, texto, heuristica_produtivo, tempo_pre in pendentes:
+            resultados[indice] = _fallback_por_orcamento(texto, heuristica_produtivo)
+            resultados[indice]["tempo_ms"] = round(tempo_pre * 1000, 3)
+        return resultados
+
+    # 2) Agrupa o restante em lotes para a IA
+    lotes = [pendentes[i:i + BATCH_SIZE]
+             for i in range(0, len(pendentes), BATCH_SIZE)]
+
+    def _rodar_lote(lote):
+        inicio = time.perf_counter()
+        resposta = _consultar_modelo([item[1] for item in lote])
+        return resposta, time.perf_counter() - inicio
+
+    # 3) Executa os lotes com concorrência limitada; cada lote roda numa cópia
+    # do contexto da requisição para o tempo do modelo entrar no Server-Timing
+    with ThreadPoolExecutor(max_workers=min(BATCH_MAX_WORKERS, len(lotes))) as executor:
+        futuros = {executor.submit(contextvars.copy_context().run, _rodar_lote, lote): lote
+                   for lote in lotes}
+        for futuro in as_completed(futuros):
+            lote = futuros[futuro]
+            try:
+                resposta, tempo_lote = futuro.result()
+            except Exception:
+                # Um lote com erro não derruba os outros: os seus itens vão para o fallback
+                logger.exception("Lote de %d emails falhou → fallback", len(lote))
+                resposta, tempo_lote = [None] * len(lote), 0.0
+
+            for (indice, texto, heuristica_produtivo, tempo_pre), item in zip(lote, resposta):
+                if item is None:
+                    detalhe = _fallback_por_erro(texto, heuristica_produtivo)
+                else:
+                    detalhe = _decidir_por_resultado(item, texto, heuristica_produtivo)
+                detalhe["tempo_ms"] = round((tempo_pre + tempo_lote) * 1000, 3)
+                resultados[indice] = detalhe
+
+    return resultados
+
+
+def fallback_classificacao(email_content: str, heuristica_produtivo: bool,
+                           motivo: str = "other") -> str:
     """
     Classificação baseada apenas em heurísticas.
     Golpes têm prioridade > marketing > produtivo.
+    `motivo` só rotula a métrica de ativações do fallback.
     """
-    lower_content = email_content.lower()
-    if any(k in lower_content for k in KEYWORDS_GOLPE):
+    with metricas.cronometrar(metricas.fallback_heuristico, "fallback", reason=motivo):
+        ocorrencias = motor_palavras_chave.buscar(email_content)
+    return categoria_heuristica(ocorrencias, heuristica_produtivo)
+
+
+def categoria_heuristica(ocorrencias: dict, heuristica_produtivo: bool) -> str:
+    """Decisão do fallback a partir das ocorrências de palavras-chave."""
+    if ocorrencias["golpe"]:
         return "Improdutivo"
-    if any(k in lower_content for k in KEYWORDS_MARKETING):
+    if ocorrencias["marketing"]:
         return "Improdutivo"
     if heuristica_produtivo:
         return "Produtivo"
@@ -0,0 +1,59 @@
+"""
+Configuração carregada uma única vez por processo:
+  - .env → variáveis de ambiente, na primeira importação do pacote utils
+    (antes de qualquer módulo ler suas variáveis)
+  - tokens da Hugging Face validados só quando alguém precisa deles,
+    então importar a aplicação não exige token nem rede
+  - Preguicoso: singleton thread-safe para clientes e modelos caros
+Autor: Micaías Viola
+Data: 2025-09-24
+"""
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def token_classificador() -> str:
+    """Token da Inference API (classificação zero-shot)."""
+    token = os.getenv("HF_API_TOKEN")
+    if not token:
+        raise ValueError("Defina HF_API_TOKEN no .env")
+    return token
+
+
+def token_chat() -> str:
+    """Token do chat-completion (HF_TOKEN, ou o mesmo da classificação)."""
+    token = os.getenv("HF_TOKEN") or os.getenv("HF_API_TOKEN")
+    if not token:
+        raise ValueError("Defina HF_TOKEN ou HF_API_TOKEN no .env")
+    return token
+
+
+def cabecalhos_classificador() -> dict:
+    return {"Authorization": f"Bearer {token_classificador()}"}
+
+
+class Preguicoso:
+    """
+    Cria o objeto com `fabrica()` na primeira chamada de obter() e reaproveita
+    depois. Várias threads chegando juntas criam uma vez só (double-checked lock).
+    """
+
+    def __init__(self, fabrica):
+        self._fabrica = fabrica
+        self._objeto = None
+        self._lock = threading.Lock()
+
+    def obter(self):
+        if self._objeto is None:
+            with self._lock:
+                if self._objeto is None:
+                    self._objeto = self._fabrica()
+        return self._objeto
+
+    @property
+    def criado(self) -> bool:
+        return self._objeto is not None
@@ -3,32 +3,220 @@ Processamento e pré-processamento de emails
 Autor: Micaías Viola
 Data: 2025-08-27
 """
-import re
-from typing import Union
+import io
+import mmap
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, Optional, Union
 
-from PyPDF2 import PdfReader
+from utils import metricas
+from utils.texto import limpar_email
+
+# ==============================
+# CONFIGURAÇÕES
+# ==============================
+PDF_ENGINE = os.getenv("PDF_ENGINE", "pypdfium2")
+# Orçamento de caracteres extraídos por PDF (0 = sem limite)
+PDF_MAX_CHARS = int(os.getenv("PDF_MAX_CHARS", 50000))
+# Acima disso o PDF fica em disco (arquivo temporário) e é mapeado em memória (mmap)
+PDF_SPOOL_MAX_MEMORIA = int(os.getenv("PDF_SPOOL_MAX_MEMORIA", 1024 * 1024))
 
 
 def clean_email_content(text: str) -> str:
     """
-    Remove assinaturas, espaços extras e normaliza o texto do email.
+    Remove respostas citadas, cabeçalhos de encaminhamento, assinaturas e
+    avisos legais e normaliza os espaços (ver utils/texto.limpar_email).
+    """
+    return limpar_email(text)
+
+
+class LeitorMapeado(io.RawIOBase):
+    """
+    Arquivo mapeado em memória (mmap) visto como stream: o parser copia só
+    os blocos que pede e o sistema carrega as páginas do disco sob demanda.
+    """
+
+    def __init__(self, mapa: mmap.mmap):
+        super().__init__()
+        self._mapa = mapa
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, destino) -> int:
+        dados = self._mapa.read(len(destino))
+        destino[:len(dados)] = dados
+        return len(dados)
+
+    def seek(self, deslocamento: int, origem: int = io.SEEK_SET) -> int:
+        self._mapa.seek(deslocamento, origem)
+        return self._mapa.tell()
+
+    def tell(self) -> int:
+        return self._mapa.tell()
+
+
+def _descritor_em_disco(stream, pilha: list) -> int:
+    """
+    Descritor de um arquivo em disco com o conteúdo do stream: o do próprio
+    stream, se houver (o SpooledTemporaryFile do Werkzeug vai para o disco
+    aqui), senão uma cópia em blocos para um arquivo temporário.
+    """
+    try:
+        stream.flush()
+        return stream.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        temporario = tempfile.TemporaryFile()
+        pilha.append(temporario)
+        stream.seek(0)
+        shutil.copyfileobj(stream, temporario, length=64 * 1024)
+        temporario.flush()
+        return temporario.fileno()
+
+
+@contextmanager
+def _abrir_fonte(file):
+    """
+    Entrega algo que os motores de PDF leem sob demanda, sem carregar o
+    arquivo inteiro em uma string Python, e fecha o que abriu no fim:
+      - caminho (str/Path) → usado direto (o motor lê do disco)
+      - bytes → BytesIO
+      - FileStorage/arquivo até PDF_SPOOL_MAX_MEMORIA → o próprio stream
+      - acima disso → arquivo em disco mapeado em memória (LeitorMapeado)
+    Streams não posicionáveis são copiados antes para um SpooledTemporaryFile.
+    """
+    if isinstance(file, (str, os.PathLike)):
+        yield file
+        return
+    if isinstance(file, (bytes, bytearray, memoryview)):
+        yield io.BytesIO(file)
+        return
+
+    pilha = []  # arquivos temporários abertos aqui
+    try:
+        stream = getattr(file, "stream", file)  # Werkzeug FileStorage → stream interno
+        if not (hasattr(stream, "seekable") and stream.seekable()):
+            spool = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_MEMORIA)
+            pilha.append(spool)
+            shutil.copyfileobj(stream, spool, length=64 * 1024)
+            stream = spool
+
+        tamanho = stream.seek(0, io.SEEK_END)
+        stream.seek(0)
+        if tamanho <= PDF_SPOOL_MAX_MEMORIA and hasattr(stream, "readinto"):
+            yield stream
+            return
+
+        descritor = _descritor_em_disco(stream, pilha)
+        with mmap.mmap(descritor, 0, access=mmap.ACCESS_READ) as mapa:
+            # O buffer agrupa os muitos pedidos pequenos do motor (seek + leitura)
+            yield io.BufferedReader(LeitorMapeado(mapa), buffer_size=64 * 1024)
+    finally:
+        for arquivo in pilha:
+            arquivo.close()
+
+
+def _paginas_pypdfium2(fonte) -> Iterator[str]:
+    import pypdfium2 as pdfium
+
+    documento = pdfium.PdfDocument(fonte)
+    try:
+        for indice in range(len(documento)):
+            pagina = documento[indice]
+            textpage = pagina.get_textpage()
+            try:
+                yield textpage.get_text_bounded().replace("\r\n", "\n")
+            finally:
+                textpage.close()
+                pagina.close()
+    finally:
+        documento.close()
+
+
+def _paginas_pypdf(fonte) -> Iterator[str]:
+    from pypdf import PdfReader as PypdfReader
+
+    for pagina in PypdfReader(fonte).pages:
+        yield pagina.extract_text() or ""
+
+
+def _paginas_pypdf2(fonte) -> Iterator[str]:
+    from PyPDF2 import PdfReader
+
+    for pagina in PdfReader(fonte).pages:
+        yield pagina.extract_text() or ""
+
+
+def _paginas_pdfplumber(fonte) -> Iterator[str]:
+    import pdfplumber
+
+    with pdfplumber.open(fonte) as pdf:
+        for pagina in pdf.pages:
+            yield pagina.extract_text() or ""
+            pagina.flush_cache()  # libera o cache de objetos da página
+
+
+def _paginas_pdfminer(fonte) -> Iterator[str]:
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+
+    for layout in extract_pages(fonte):
+        yield "".join(el.get_text() for el in layout if isinstance(el, LTTextContainer))
+
+
+# Motores disponíveis (pypdfium2 é o mais rápido)
+MOTORES_PDF = {
+    "pypdfium2": _paginas_pypdfium2,
+    "pypdf": _paginas_pypdf,
+    "pypdf2": _paginas_pypdf2,
+    "pdfplumber": _paginas_pdfplumber,
+    "pdfminer": _paginas_pdfminer,
+}
+
+
+def iterar_paginas_pdf(file, motor: str = None) -> Iterator[str]:
+    """
+    Gera o texto de cada página sob demanda; quem consome pode parar
+    a qualquer momento sem que as páginas seguintes sejam processadas.
     """
-    # Remove assinaturas comuns
-    text = re.sub(r'Atenciosamente.*', '', text,
-                  flags=re.IGNORECASE | re.DOTALL)
-    # Remove múltiplos espaços
-    text = re.sub(r'\s+', ' ', text)
-    # Remove cabeçalhos de email (exemplo)
-    text = re.sub(r'From:.*\n', '', text)
-    return text.strip()
+    motor = (motor or PDF_ENGINE).lower()
+    if motor not in MOTORES_PDF:
+        raise ValueError(
+            f"Motor de PDF inválido: '{motor}'. Opções: {', '.join(MOTORES_PDF)}")
+    return _paginas_da_fonte(MOTORES_PDF[motor], file)
+
 
+def _paginas_da_fonte(gerar_paginas, file) -> Iterator[str]:
+    # O documento é fechado antes do mmap/arquivo temporário que o alimenta
+    with _abrir_fonte(file) as fonte:
+        yield from gerar_paginas(fonte)
 
-def extract_text_from_pdf(file: Union[str, bytes]) -> str:
+
+def extract_text_from_pdf(file: Union[str, bytes], max_chars: Optional[int] = None,
+                          motor: Optional[str] = None) -> str:
     """
     Extrai texto de um arquivo PDF enviado pelo usuário.
+    Para de ler páginas quando o orçamento de caracteres (max_chars,
+    padrão PDF_MAX_CHARS; 0 = sem limite) é atingido e junta tudo uma vez só.
     """
-    reader = PdfReader(file)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text() or ""
-    return text
+    limite = PDF_MAX_CHARS if max_chars is None else max_chars
+    partes = []
+    total = 0
+    with metricas.cronometrar(metricas.extracao_pdf, "pdf", engine=(motor or PDF_ENGINE).lower()):
+        paginas = iterar_paginas_pdf(file, motor)
+        try:
+            for texto in paginas:
+                partes.append(texto)
+                total += len(texto) + 1
+                if limite and total >= limite:
+                    break
+        finally:
+            paginas.close()  # encerra o gerador e libera o documento
+
+    texto = "\n".join(partes)
+    return texto[:limite] if limite else texto
@@ -0,0 +1,245 @@
+"""
+Fluxo assíncrono de processamento de emails (asyncio + httpx.AsyncClient).
+Mesmo resultado do fluxo síncrono, mas:
+  - não bloqueia o worker enquanto espera a Hugging Face
+  - começa a gerar a resposta "Produtivo" em paralelo à classificação quando
+    as palavras-chave já dão um sinal forte (especulação), e cancela se a IA
+    discordar
+Autor: Micaías Viola
+Data: 2025-09-10
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import time
+
+import httpx
+
+from utils import metricas
+from utils.backends import obter_backend, BackendRemoto
+from utils.config import cabecalhos_classificador, token_chat
+from utils.cache import cache_resultados
+from utils.classifier import (
+    _pre_filtro, _decidir_por_resultado, _fallback_por_erro, _fallback_por_orcamento,
+    _detalhe_heuristico, orcamento_no_fim, modelo_do_backend,
+    HF_API_URL, CANDIDATE_LABELS, ORIGENS_PROVISORIAS
+)
+from utils.preprocessamento import dividir_em_trechos, agregar_resultados
+from utils.fluxo_email import chave_classificacao, chave_resposta, registrar_nivel
+from utils.http_client import (
+    executar_com_retry_async, circuito_classificador, circuito_chat,
+    CircuitoAberto, FalhaUpstream
+)
+from utils.hf_response import (
+    montar_prompt, extrair_resposta_final, texto_fallback,
+    CHAT_MODEL
+)
+from utils.limites import orcamento_upstream
+from utils.respostas import resposta_de_modelo, resposta_rapida
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIGURAÇÕES
+# ==============================
+# Endpoint compatível com OpenAI do roteador da Hugging Face
+HF_CHAT_URL = os.getenv(
+    "HF_CHAT_URL", "https://router.huggingface.co/v1/chat/completions")
+# Quantos termos produtivos distintos contam como "sinal forte" para especular
+ESPECULACAO_MIN_TERMOS = int(os.getenv("ESPECULACAO_MIN_TERMOS", 2))
+
+
+def criar_cliente_async(**kwargs) -> httpx.AsyncClient:
+    """Cliente HTTP assíncrono com pool de conexões (um por event loop)."""
+    limites = httpx.Limits(
+        max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", 100)),
+        max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", 20)),
+    )
+    return httpx.AsyncClient(timeout=60, limits=limites, **kwargs)
+
+
+async def _consultar_modelo_async(cliente: httpx.AsyncClient, inputs):
+    """Versão assíncrona de classifier._consultar_modelo."""
+    payload = {
+        "inputs": inputs,
+        "parameters": {
+            "candidate_labels": CANDIDATE_LABELS,
+            "multi_label": False
+        },
+        "options": {"wait_for_model": True}
+    }
+    headers = cabecalhos_classificador()
+
+    try:
+        response = await executar_com_retry_async(
+            lambda: cliente.post(HF_API_URL, headers=headers, json=payload),
+            circuito_classificador,
+        )
+        return response.json()
+    except CircuitoAberto:
+        logger.warning("API fora do ar (circuito aberto, async) → fallback imediato")
+    except FalhaUpstream as e:
+        logger.warning("Todas as tentativas falharam (async: %s) → fallback", e)
+    except ValueError as e:
+        logger.warning("Resposta da API não é JSON (async: %s) → fallback", e)
+    return None
+
+
+async def _classificar_com_modelo(cliente, email_content: str, heuristica_produtivo: bool) -> dict:
+    """
+    Consulta a IA para um texto já normalizado pelo _pre_filtro
+    (em trechos, se passar do orçamento do modelo).
+    Sem cota da Hugging Face decide só pelas heurísticas.
+    """
+    if orcamento_no_fim():
+        return _fallback_por_orcamento(email_content, heuristica_produtivo)
+    backend = obter_backend(HF_API_URL)
+    trechos = dividir_em_trechos(email_content, modelo_do_backend(backend))
+    if isinstance(backend, BackendRemoto):
+        resposta = await _consultar_modelo_async(
+            cliente, trechos[0] if len(trechos) == 1 else trechos)
+        resultados = resposta if isinstance(resposta, list) else [resposta]
+    else:
+        # Backend local é CPU: roda numa thread para não travar o event loop
+        resultados = await asyncio.to_thread(backend.classificar, trechos, CANDIDATE_LABELS)
+    result = None
+    if len(resultados) == len(trechos):
+        result = agregar_resultados(email_content, resultados, [len(t) for t in trechos])
+    if result is None:
+        return _fallback_por_erro(email_content, heuristica_produtivo)
+    return _decidir_por_resultado(result, email_content, heuristica_produtivo)
+
+
+async def classificar_email_async(cliente: httpx.AsyncClient, email_content: str) -> tuple:
+    """Versão assíncrona de classificar_email_com_origem → (categoria, origem)."""
+    email_content, decisao, heuristica_produtivo, _ = _pre_filtro(email_content)
+    if decisao is not None:
+        return decisao, "heuristica"
+    detalhe = await _classificar_com_modelo(cliente, email_content, heuristica_produtivo)
+    return detalhe["categoria"], detalhe["origem"]
+
+
+async def gerar_resposta_chat_async(cliente: httpx.AsyncClient, texto_email: str, categoria: str) -> str:
+    """Versão assíncrona de hf_response.gerar_resposta_chat."""
+    payload = {
+        "model": CHAT_MODEL,
+        "messages": [{"role": "user", "content": montar_prompt(texto_email, categoria)}],
+    }
+    inicio = time.perf_counter()
+    resultado = "error"
+    try:
+        headers = {"Authorization": f"Bearer {token_chat()}"}
+        response = await executar_com_retry_async(
+            lambda: cliente.post(
+                HF_CHAT_URL, headers=headers, json=payload),
+            circuito_chat,
+        )
+        resposta = response.json()["choices"][0]["message"]["content"].strip()
+        with metricas.cronometrar(metricas.pos_processamento, "postprocess",
+                                  function="extrair_resposta_final"):
+            resposta_final = extrair_resposta_final(resposta)
+        resultado = "ok"
+        return resposta_final
+
+    except CircuitoAberto:
+        logger.warning("Chat fora do ar (circuito aberto, async) → texto de fallback")
+        resultado = "circuit_open"
+        return texto_fallback(categoria)
+    except asyncio.CancelledError:
+        resultado = "cancelled"
+        raise
+    except Exception as e:
+        logger.error("Erro ao gerar resposta via Hugging Face (async): %s", e)
+        return texto_fallback(categoria)
+    finally:
+        decorrido = time.perf_counter() - inicio
+        metricas.geracao_resposta.observar(decorrido, outcome=resultado)
+        metricas.acumular_tempo("reply", decorrido)
+
+
+async def _cancelar(tarefa: asyncio.Task):
+    tarefa.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await tarefa
+
+
+async def _obter_resposta(cliente, texto_email: str, detalhe: dict, tarefa=None) -> dict:
+    """
+    Modelo pronto/resposta aprovada → cache → tarefa já iniciada → gera agora
+    (sem cota da Hugging Face, o modelo de resposta no lugar da IA).
+    Guarda no cache o que veio da IA e devolve o resultado final do fluxo.
+    """
+    categoria = detalhe["categoria"]
+    resposta, nivel = resposta_rapida(texto_email, detalhe)
+    if resposta is None:
+        chave = chave_resposta(texto_email, categoria)
+        resposta = cache_resultados.obter(chave)
+        nivel = "cache"
+    if resposta is None and tarefa is None and orcamento_upstream.degradado():
+        resposta, nivel = resposta_de_modelo(texto_email, detalhe), "template"
+
+    if resposta is not None:
+        if tarefa is not None:
+            await _cancelar(tarefa)
+    else:
+        if tarefa is not None:
+            resposta = await tarefa
+        else:
+            resposta = await gerar_resposta_chat_async(cliente, texto_email, categoria)
+        if resposta != texto_fallback(categoria):
+            cache_resultados.guardar(chave, resposta)
+            nivel = "ia"
+        else:
+            nivel = "fallback"
+    registrar_nivel(nivel)
+
+    return {"categoria": categoria, "resposta": resposta,
+            "subrotulo": detalhe["subrotulo"], "nivel_resposta": nivel}
+
+
+async def processar_email_com_resposta_async(cliente: httpx.AsyncClient, texto_email: str) -> dict:
+    """
+    Classifica o email e gera a resposta sugerida sem bloquear o worker.
+
+    Returns:
+        dict: o mesmo de fluxo_email.processar_email_com_resposta
+    """
+    # Passo 1: classificação em cache → responde direto
+    chave_detalhe = chave_classificacao(texto_email)
+    detalhe = cache_resultados.obter(chave_detalhe)
+    if detalhe is not None:
+        return await _obter_resposta(cliente, texto_email, detalhe)
+
+    # Passo 2: heurísticas decidem sozinhas (golpe, marketing, curto)?
+    normalizado, decisao, heuristica_produtivo, ocorrencias = _pre_filtro(texto_email)
+    if decisao is not None:
+        detalhe = _detalhe_heuristico(decisao, ocorrencias)
+        cache_resultados.guardar(chave_detalhe, detalhe)
+        return await _obter_resposta(cliente, texto_email, detalhe)
+
+    # Passo 3: sinal forte de produtivo → começa a resposta em paralelo
+    termos = {termo for termo, _, _ in ocorrencias.get("produtivo", [])}
+    especulativa = None
+    if len(termos) >= ESPECULACAO_MIN_TERMOS and not orcamento_upstream.degradado():
+        especulativa = asyncio.create_task(
+            gerar_resposta_chat_async(cliente, texto_email, "Produtivo"))
+
+    try:
+        detalhe = await _classificar_com_modelo(cliente, normalizado, heuristica_produtivo)
+    except BaseException:
+        if especulativa is not None:
+            await _cancelar(especulativa)
+        raise
+
+    if detalhe["origem"] not in ORIGENS_PROVISORIAS:
+        cache_resultados.guardar(chave_detalhe, detalhe)
+
+    # Passo 4: aproveita ou descarta a resposta especulativa (também
+    # descartada se um modelo pronto/resposta aprovada servir — ver _obter_resposta)
+    if especulativa is not None and detalhe["categoria"] != "Produtivo":
+        logger.info("Especulação descartada: IA classificou como 'Improdutivo'")
+        await _cancelar(especulativa)
+        especulativa = None
+
+    return await _obter_resposta(cliente, texto_email, detalhe, especulativa)
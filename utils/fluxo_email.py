@@ -1,34 +1,124 @@
 """
 Fluxo completo de processamento de emails:
-1. Classificação: Produtivo / Improdutivo 
-2. Geração de resposta automática sugerida
+1. Classificação: Produtivo / Improdutivo (+ sub-rótulo)
+2. Resposta automática sugerida, do nível mais barato ao mais caro:
+   modelo por sub-rótulo → resposta aprovada parecida → cache → IA
+   (com a cota da Hugging Face no fim, o modelo por sub-rótulo substitui a IA)
 Autor: Micaías Viola
 Data: 2025-08-27
 """
 
-from utils.classifier import classificar_email
-from utils.hf_response import resposta_sugerida
+from utils import metricas
+from utils.backends import obter_backend
+from utils.cache import cache_resultados, chave_cache
+from utils.classifier import (
+    classificar_email_detalhado, modelo_do_backend, HF_API_URL, ORIGENS_PROVISORIAS
+)
+from utils.hf_response import resposta_sugerida, texto_fallback, CHAT_MODEL, PROMPT_VERSION
 from utils.hf_response import gerar_resposta
+from utils.limites import orcamento_upstream
+from utils.preprocessamento import versao_preprocessamento
+from utils.respostas import resposta_de_modelo, resposta_rapida
 
+# Nível da resposta → rótulo público: `reply_tier` da API e métrica reply_tier_total
+NIVEIS_PUBLICOS = {"template": "template", "aprovada": "approved", "cache": "cache",
+                   "ia": "llm", "fallback": "fallback"}
 
-def processar_email_com_resposta(texto_email: str) -> dict:
+
+def chave_classificacao(texto_email: str) -> str:
+    """
+    Chave da classificação detalhada no cache: inclui o backend, o modelo e
+    a versão do pré-processamento (trocar CLASSIFIER_BACKEND ou as regras de
+    limpeza não reaproveita decisões antigas).
+    """
+    backend = obter_backend(HF_API_URL)
+    return chave_cache(texto_email, modelo_do_backend(backend),
+                       f"{backend.nome}:detalhe:{versao_preprocessamento()}")
+
+
+def chave_resposta(texto_email: str, categoria: str) -> str:
+    """
+    Chave da resposta gerada no cache: modelo de chat, versão do prompt,
+    categoria e versão do pré-processamento (o prompt é montado com
+    preparar_para_chat; mudar a limpeza ou o orçamento muda o prompt).
+    """
+    return chave_cache(texto_email, CHAT_MODEL,
+                       f"{PROMPT_VERSION}:{categoria}:{versao_preprocessamento()}")
+
+
+def obter_classificacao(texto_email: str) -> dict:
+    """
+    Classificação detalhada (cache → heurísticas/IA). Decisões provisórias
+    (falha da API, cota no fim) não vão para o cache.
+    """
+    chave = chave_classificacao(texto_email)
+    detalhe = cache_resultados.obter(chave)
+    if detalhe is None:
+        detalhe = classificar_email_detalhado(texto_email)
+        # Fallbacks provisórios não são guardados para não "congelá-los"
+        if detalhe["origem"] not in ORIGENS_PROVISORIAS:
+            cache_resultados.guardar(chave, detalhe)
+    return detalhe
+
+
+def nivel_publico(nivel: str):
+    """Rótulo em inglês do nível da resposta (None se não houver)."""
+    return NIVEIS_PUBLICOS.get(nivel, nivel)
+
+
+def registrar_nivel(nivel: str):
+    metricas.respostas_por_nivel.inc(tier=nivel_publico(nivel))
+
+
+def processar_email_com_resposta(texto_email: str, ao_parcial=None) -> dict:
     """
     Classifica o email e gera a resposta automática sugerida.
+    Emails repetidos (mesmo texto normalizado) são servidos do cache.
 
     Args:
         texto_email (str): conteúdo do email
+        ao_parcial: opcional, chamada com o progresso antes do fim —
+            ao_parcial(categoria=..., subrotulo=...) logo após a classificação e
+            ao_parcial(trecho_resposta=trecho) com cada trecho novo do modelo (streaming)
 
     Returns:
-        dict: {'categoria': 'Produtivo'|'Improdutivo', 'resposta': 'texto gerado'}
+        dict: {'categoria': 'Produtivo'|'Improdutivo', 'resposta': 'texto gerado',
+               'subrotulo': sub-rótulo ou None,
+               'nivel_resposta': 'template'|'aprovada'|'cache'|'ia'|'fallback'}
     """
-    # Passo 1: Classificar o email
-    categoria = classificar_email(texto_email)
+    # Passo 1: Classificar o email (cache → IA)
+    detalhe = obter_classificacao(texto_email)
+    categoria = detalhe["categoria"]
+    if ao_parcial is not None:
+        ao_parcial(categoria=categoria, subrotulo=detalhe["subrotulo"])
+
+    # Passo 2: Modelo pronto ou resposta aprovada dispensam o LLM
+    resposta, nivel = resposta_rapida(texto_email, detalhe)
 
-    # Passo 2: Gerar a resposta sugerida
-    resposta = resposta_sugerida(texto_email, categoria)
+    # Passo 3: Gerar a resposta sugerida (cache → IA; sem cota → modelo de resposta)
+    if resposta is None:
+        chave = chave_resposta(texto_email, categoria)
+        resposta = cache_resultados.obter(chave)
+        nivel = "cache"
+        if resposta is None and orcamento_upstream.degradado():
+            resposta, nivel = resposta_de_modelo(texto_email, detalhe), "template"
+        if resposta is None:
+            ao_receber = None
+            if ao_parcial is not None:
+                def ao_receber(trecho):
+                    ao_parcial(trecho_resposta=trecho)
+            resposta = resposta_sugerida(texto_email, categoria, ao_receber)
+            if resposta != texto_fallback(categoria):
+                cache_resultados.guardar(chave, resposta)
+                nivel = "ia"
+            else:
+                nivel = "fallback"
+    registrar_nivel(nivel)
 
     # Retornar resultados
     return {
         "categoria": categoria,
-        "resposta": resposta
+        "resposta": resposta,
+        "subrotulo": detalhe["subrotulo"],
+        "nivel_resposta": nivel,
     }
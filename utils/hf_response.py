@@ -5,64 +5,68 @@ Modelo: HuggingFaceTB/SmolLM3-3B
 Autor: Micaías Viola
 Data: 2025-08-27
 """
-import re
 import os
-from dotenv import load_dotenv
-from huggingface_hub import InferenceClient
+import logging
+import time
 
-# Carregar token do .env
-load_dotenv()
-HF_TOKEN = os.getenv("HF_TOKEN") or os.getenv("HF_API_TOKEN")
-if not HF_TOKEN:
-    raise ValueError("Defina HF_TOKEN ou HF_API_TOKEN no .env")
+from utils import metricas
+from utils.config import Preguicoso, token_chat
+from utils.http_client import (
+    obter_sessao, executar_com_retry, circuito_chat, CircuitoAberto
+)
+from utils.preprocessamento import preparar_para_chat
+from utils.texto import FiltroRespostaIncremental, extrair_resposta, limpar_raciocinio
 
-# Inicializar cliente Hugging Face
-client = InferenceClient(api_key=HF_TOKEN)
+logger = logging.getLogger(__name__)
+
+# HF_CHAT_BASE_URL permite apontar para outro servidor compatível (ex.: mock local)
+HF_CHAT_BASE_URL = os.getenv("HF_CHAT_BASE_URL")
+
+
+def _criar_cliente_chat():
+    # huggingface_hub é pesado de importar: só entra no primeiro uso
+    from huggingface_hub import InferenceClient, configure_http_backend
+
+    # Usa a Session com pool de conexões
+    configure_http_backend(backend_factory=obter_sessao)
+    return InferenceClient(api_key=token_chat(), base_url=HF_CHAT_BASE_URL)
+
+
+_cliente_chat = Preguicoso(_criar_cliente_chat)
+
+
+def obter_cliente_chat():
+    """InferenceClient do processo, criado na primeira chamada (exige o token)."""
+    return _cliente_chat.obter()
+
+
+CHAT_MODEL = "HuggingFaceTB/SmolLM3-3B"
+# Incrementar sempre que os prompts mudarem (invalida o cache de respostas)
+PROMPT_VERSION = "2"
 
 
 def limpar_raciocinio_interno(texto: str) -> str:
-    
-    # Remove qualquer frase que pareça raciocínio interno ou conteúdo não solicitado.
-   
-    # Remove textos comuns de pensamento do modelo (em inglês e português)
-    padroes = [
-        r"(?i)(let me|i should|they want|maybe|so i|alright|let's|okay,|então vou|preciso|vou pensar|deixa eu).*",
-        r"(?i)(analisando|pensando|raciocínio|planejando).*"
-    ]
-    for padrao in padroes:
-        texto = re.sub(padrao, "", texto).strip() # Remove os textos que combinam com o padrão e retorna o texto limpo
-    return texto
+    """
+    Remove qualquer frase que pareça raciocínio interno ou conteúdo não solicitado
+    (padrões compilados em utils/texto.py).
+    """
+    return limpar_raciocinio(texto)
 
 def extrair_resposta_final(texto: str) -> str:
     """
     Extrai apenas a resposta formal final de uma saída do modelo,
-    removendo qualquer raciocínio interno.
+    removendo qualquer raciocínio interno (uma passada, ver utils/texto.py).
     """
+    return extrair_resposta(texto)
 
-    # 1) Limpa raciocínio interno
-    texto = limpar_raciocinio_interno(texto)
-
-    # 2) Tenta encontrar mensagens que começam com cumprimentos
-    padrao = r"(?:Prezado|Prezada|Prezados|Olá|Caro|Cara|Bom dia|Boa tarde|Boa noite)[\s\S]+"
-    match = re.search(padrao, texto, flags=re.IGNORECASE)
-    if match:
-        return match.group(0).strip()
-
-    # 3) Se não encontrar, divide o texto em partes após duas quebras de linha (geralmente é a resposta)
-    partes = texto.strip().split("\n\n")
-    if len(partes) > 1:
-        return limpar_raciocinio_interno(partes[-1].strip())
-
-    # Caso nada seja detectado, retorna todo o texto limpo
-    return texto.strip()
-
-def gerar_resposta_chat(texto_email: str, categoria: str) -> str:
+def montar_prompt(texto_email: str, categoria: str) -> str:
     """
-    Gera resposta automática baseada na categoria do email
-    usando chat-completion da Hugging Face.
+    Monta o prompt do chat-completion de acordo com a categoria do email.
+    O email entra limpo e cortado no orçamento de CHAT_MODEL (início + fim).
     """
+    texto_email = preparar_para_chat(texto_email, CHAT_MODEL)
     if categoria == "Produtivo": # Prompt especifico para o modelo Produtivo
-        prompt = (
+        return (
             "Você é um assistente profissional. "
             "IMPORTANTE: Sua tarefa é responder APENAS com a mensagem final pronta para envio. "
             "PROIBIDO explicar raciocínio, planejar a resposta ou dar justificativas. "
@@ -71,36 +75,103 @@ def gerar_resposta_chat(texto_email: str, categoria: str) -> str:
             f"Email recebido:\n{texto_email}\n\n"
             "Mensagem final:"
         )
-    else:  # Prompt especifico para o modelo Improdutivo
-        prompt = (
-            "Você é um assistente cordial. "
-            "IMPORTANTE: Sua tarefa é responder APENAS com a mensagem final pronta para envio. "
-            "PROIBIDO explicar raciocínio, planejar a resposta ou dar justificativas. "
-            "NÃO escreva nada sobre o que você vai fazer, NEM descreva seus pensamentos. "
-            "Responda SOMENTE em português, com uma mensagem curta, amigável e educada.\n\n"
-            f"Email recebido:\n{texto_email}\n\n"
-            "Mensagem final:"
-        )
+    # Prompt especifico para o modelo Improdutivo
+    return (
+        "Você é um assistente cordial. "
+        "IMPORTANTE: Sua tarefa é responder APENAS com a mensagem final pronta para envio. "
+        "PROIBIDO explicar raciocínio, planejar a resposta ou dar justificativas. "
+        "NÃO escreva nada sobre o que você vai fazer, NEM descreva seus pensamentos. "
+        "Responda SOMENTE em português, com uma mensagem curta, amigável e educada.\n\n"
+        f"Email recebido:\n{texto_email}\n\n"
+        "Mensagem final:"
+    )
+
+def _completar_em_streaming(cliente, prompt: str, ao_receber) -> str:
+    """
+    Chat-completion com stream=True: repassa a `ao_receber` cada trecho já
+    filtrado (FiltroRespostaIncremental) e devolve a resposta definitiva.
+    O retry cobre a abertura do stream; uma falha no meio vira exceção.
+    """
+    pedacos = executar_com_retry(
+        lambda: cliente.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            stream=True,
+        ),
+        circuito_chat,
+    )
+    filtro = FiltroRespostaIncremental()
+    inicio = time.perf_counter()
+    primeiro = True
+    for pedaco in pedacos:
+        if not pedaco.choices:
+            continue
+        texto = pedaco.choices[0].delta.content or ""
+        visivel = filtro.adicionar(texto)
+        if visivel:
+            if primeiro:
+                metricas.primeiro_token.observar(time.perf_counter() - inicio)
+                primeiro = False
+            ao_receber(visivel)
+    with metricas.cronometrar(metricas.pos_processamento, "postprocess",
+                              function="extrair_resposta_final"):
+        final = filtro.finalizar()
+    resto = filtro.restante(final)
+    if resto:
+        ao_receber(resto)
+    return final
+
+
+def gerar_resposta_chat(texto_email: str, categoria: str, ao_receber=None) -> str:
+    """
+    Gera resposta automática baseada na categoria do email
+    usando chat-completion da Hugging Face.
+    Com `ao_receber` (função que recebe cada trecho de texto) a resposta vem
+    em streaming e os trechos já filtrados são repassados conforme chegam.
+    """
+    prompt = montar_prompt(texto_email, categoria)
+    inicio = time.perf_counter()
+    resultado = "error"
 
     try:
-        # 1) Envia o prompt para o modelo de chat da Hugging Face
-        completion = client.chat.completions.create(
-            model="HuggingFaceTB/SmolLM3-3B",
-            messages=[{"role": "user", "content": prompt}],
+        # 1) Envia o prompt para o modelo de chat da Hugging Face (com retry/circuit breaker)
+        cliente = obter_cliente_chat()
+        if ao_receber is not None:
+            resposta_final = _completar_em_streaming(cliente, prompt, ao_receber)
+            resultado = "ok"
+            return resposta_final
+
+        completion = executar_com_retry(
+            lambda: cliente.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=[{"role": "user", "content": prompt}],
+            ),
+            circuito_chat,
         )
 
         # 2) Extrai a resposta do modelo, pega a primeira resposta gerada
         resposta = completion.choices[0].message["content"].strip() 
 
         # 3) Usa a função para extrair a resposta final para garantir que a resposta venha sem o raciocínio interno
-        resposta_final = extrair_resposta_final(resposta)
+        with metricas.cronometrar(metricas.pos_processamento, "postprocess",
+                                  function="extrair_resposta_final"):
+            resposta_final = extrair_resposta_final(resposta)
 
-        print(f"[LOG] Resposta final:\n{resposta_final}\n")
+        logger.debug("Resposta final:\n%s", resposta_final)
+        resultado = "ok"
         return resposta_final
 
+    except CircuitoAberto:
+        logger.warning("Chat fora do ar (circuito aberto) → texto de fallback")
+        resultado = "circuit_open"
+        return texto_fallback(categoria)
     except Exception as e:
-        print(f"[LOG] Erro ao gerar resposta via Hugging Face: {e}")
+        logger.error("Erro ao gerar resposta via Hugging Face: %s", e)
         return texto_fallback(categoria)
+    finally:
+        decorrido = time.perf_counter() - inicio
+        metricas.geracao_resposta.observar(decorrido, outcome=resultado)
+        metricas.acumular_tempo("reply", decorrido)
 
 # 4) Textos de fallback seguros para casos de falha
 def texto_fallback(categoria: str) -> str:
@@ -111,8 +182,8 @@ def texto_fallback(categoria: str) -> str:
         return "Obrigado pelo seu email. Desejamos um ótimo dia!"
 
 # Alias da geração de resposta para facilitar a importação em outros modulos
-def resposta_sugerida(texto_email: str, categoria: str) -> str:
+def resposta_sugerida(texto_email: str, categoria: str, ao_receber=None) -> str:
     """Sugere uma resposta para o email baseado na categoria"""
-    return gerar_resposta_chat(texto_email, categoria)
+    return gerar_resposta_chat(texto_email, categoria, ao_receber)
 
 gerar_resposta = gerar_resposta_chat
@@ -0,0 +1,317 @@
+"""
+Camada HTTP compartilhada para as chamadas à Hugging Face:
+  - Session com pool de conexões keep-alive por worker
+  - Retentativas com backoff exponencial + jitter, respeitando Retry-After
+    e o "estimated_time" dos 503 de modelo carregando
+  - Circuit breaker: com o upstream fora do ar, falha na hora (→ fallback)
+  - Cada tentativa entra no orçamento da Hugging Face (utils/limites.py)
+Autor: Micaías Viola
+Data: 2025-09-12
+"""
+import asyncio
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils import metricas
+from utils.limites import orcamento_upstream
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIGURAÇÕES
+# ==============================
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", 10))  # hosts distintos
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", 20))          # conexões por host
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 60))
+HTTP_MAX_TENTATIVAS = int(os.getenv("HTTP_MAX_TENTATIVAS", 3))
+HTTP_BACKOFF_BASE = float(os.getenv("HTTP_BACKOFF_BASE", 0.5))       # segundos
+HTTP_BACKOFF_MAX = float(os.getenv("HTTP_BACKOFF_MAX", 8))
+HTTP_ESPERA_MAX = float(os.getenv("HTTP_ESPERA_MAX", 20))            # teto p/ Retry-After
+CIRCUIT_LIMITE_FALHAS = int(os.getenv("CIRCUIT_LIMITE_FALHAS", 5))
+CIRCUIT_TEMPO_RESET = float(os.getenv("CIRCUIT_TEMPO_RESET", 30))    # segundos aberto
+
+# Status que valem nova tentativa; os demais 4xx são erro nosso e não adianta repetir
+STATUS_RETENTAVEIS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitoAberto(Exception):
+    """O upstream está marcado como fora do ar; nem tenta a chamada."""
+
+
+class FalhaUpstream(Exception):
+    """A chamada falhou de vez (erro não retentável ou tentativas esgotadas)."""
+
+    def __init__(self, mensagem: str, status: int = None):
+        super().__init__(mensagem)
+        self.status = status
+
+
+# ==============================
+# SESSION COMPARTILHADA
+# ==============================
+_sessao = None
+_sessao_pid = None
+_sessao_lock = threading.Lock()
+
+
+def obter_sessao() -> requests.Session:
+    """
+    Session única por processo (recriada após fork, pois sockets não
+    podem ser compartilhados entre workers do gunicorn).
+    """
+    global _sessao, _sessao_pid
+    if _sessao is None or _sessao_pid != os.getpid():
+        with _sessao_lock:
+            if _sessao is None or _sessao_pid != os.getpid():
+                sessao = requests.Session()
+                adaptador = HTTPAdapter(
+                    pool_connections=HTTP_POOL_CONNECTIONS,
+                    pool_maxsize=HTTP_POOL_MAXSIZE,
+                )
+                sessao.mount("https://", adaptador)
+                sessao.mount("http://", adaptador)
+                _sessao, _sessao_pid = sessao, os.getpid()
+    return _sessao
+
+
+# ==============================
+# CIRCUIT BREAKER
+# ==============================
+class CircuitBreaker:
+    """
+    Fechado → chamadas normais.
+    Aberto → após N falhas seguidas; recusa tudo por `tempo_reset` segundos.
+    Meio-aberto → depois disso deixa UMA chamada de teste passar;
+    sucesso fecha o circuito, falha reabre.
+    """
+
+    def __init__(self, nome: str, limite_falhas: int = CIRCUIT_LIMITE_FALHAS,
+                 tempo_reset: float = CIRCUIT_TEMPO_RESET):
+        self.nome = nome
+        self.limite_falhas = limite_falhas
+        self.tempo_reset = tempo_reset
+        self._falhas = 0
+        self._aberto_ate = 0.0
+        self._teste_em_andamento = False
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self) -> str:
+        if self._falhas < self.limite_falhas:
+            return "fechado"
+        if time.monotonic() < self._aberto_ate:
+            return "aberto"
+        return "meio-aberto"
+
+    def permitir(self) -> bool:
+        with self._lock:
+            estado = self.estado
+            if estado == "fechado":
+                return True
+            if estado == "meio-aberto" and not self._teste_em_andamento:
+                self._teste_em_andamento = True
+                return True
+            return False
+
+    def liberar_teste(self):
+        """
+        Devolve a vaga de teste sem contar sucesso nem falha (chamada
+        cancelada ou interrompida antes de ter um desfecho).
+        """
+        with self._lock:
+            self._teste_em_andamento = False
+
+    def registrar_sucesso(self):
+        with self._lock:
+            self._falhas = 0
+            self._teste_em_andamento = False
+
+    def registrar_falha(self):
+        with self._lock:
+            self._falhas += 1
+            self._teste_em_andamento = False
+            if self._falhas >= self.limite_falhas:
+                self._aberto_ate = time.monotonic() + self.tempo_reset
+                logger.warning("Circuito '%s' aberto por %.0fs", self.nome, self.tempo_reset)
+
+
+# Um circuito por upstream, compartilhado entre threads do worker
+circuito_classificador = CircuitBreaker("zero-shot")
+circuito_chat = CircuitBreaker("chat-completion")
+
+
+# ==============================
+# BACKOFF
+# ==============================
+def calcular_espera(tentativa: int, resposta=None) -> float:
+    """
+    Quanto esperar antes da próxima tentativa (tentativa começa em 0).
+    Prioridade: Retry-After → estimated_time (503 modelo carregando) →
+    backoff exponencial com jitter total.
+    """
+    if resposta is not None:
+        retry_after = resposta.headers.get("Retry-After")
+        espera = None
+        if retry_after:
+            try:
+                espera = float(retry_after)
+            except ValueError:
+                try:
+                    espera = email.utils.parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    # Header malformado → segue para o backoff exponencial
+                    logger.debug("Retry-After inválido: %r", retry_after)
+        if espera is not None:
+            return max(0.0, min(espera, HTTP_ESPERA_MAX))
+
+        if resposta.status_code == 503:
+            try:
+                estimado = float(resposta.json().get("estimated_time", 0))
+            except Exception:
+                estimado = 0
+            if estimado > 0:
+                return min(estimado, HTTP_ESPERA_MAX)
+
+    teto = min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * (2 ** tentativa))
+    return random.uniform(0, teto)
+
+
+def _resposta_de(resultado_ou_erro):
+    """Extrai o objeto de resposta HTTP (requests/httpx) de um retorno ou exceção."""
+    if hasattr(resultado_ou_erro, "status_code"):
+        return resultado_ou_erro
+    return getattr(resultado_ou_erro, "response", None)
+
+
+def _avaliar(resultado, erro, circuito: CircuitBreaker):
+    """
+    Classifica o desfecho de uma tentativa.
+    Retorna (sucesso, retentavel, resposta_http).
+    """
+    resposta = _resposta_de(erro if erro is not None else resultado)
+    status = getattr(resposta, "status_code", None)
+    orcamento_upstream.registrar(resposta, circuito.nome)
+
+    if erro is None and (status is None or status < 400):
+        circuito.registrar_sucesso()
+        return True, False, resposta
+
+    if status is not None and status not in STATUS_RETENTAVEIS:
+        # Erro do cliente: não adianta repetir, mas o upstream respondeu
+        circuito.registrar_sucesso()
+        return False, False, resposta
+
+    circuito.registrar_falha()
+    return False, True, resposta
+
+
+def _registrar_tentativa(circuito: CircuitBreaker, inicio: float, sucesso: bool, retentavel: bool):
+    """Histograma por tentativa + tempo no Server-Timing (etapa = nome do circuito)."""
+    decorrido = time.perf_counter() - inicio
+    desfecho = "ok" if sucesso else ("retryable_error" if retentavel else "client_error")
+    metricas.tentativas_upstream.observar(decorrido, circuit=circuito.nome, outcome=desfecho)
+    metricas.acumular_tempo(circuito.nome, decorrido)
+
+
+def _registrar_retentativa(circuito: CircuitBreaker, espera: float, tentativa: int,
+                           max_tentativas: int, status, erro):
+    logger.warning("Falha em '%s' (status=%s, erro=%s), tentativa %d/%d",
+                   circuito.nome, status, erro, tentativa + 1, max_tentativas)
+    metricas.retentativas_upstream.inc(circuit=circuito.nome)
+    metricas.espera_retentativa.observar(espera, circuit=circuito.nome)
+    metricas.acumular_tempo("retry_wait", espera)
+
+
+def executar_com_retry(chamada, circuito: CircuitBreaker, max_tentativas: int = None):
+    """
+    Executa `chamada()` com retentativas e circuit breaker.
+    `chamada` pode devolver uma Response (status verificado aqui) ou qualquer
+    outro objeto; exceções com `.response` (requests/huggingface_hub) têm o
+    status analisado para decidir se vale repetir.
+    Lança CircuitoAberto ou FalhaUpstream.
+    """
+    max_tentativas = max_tentativas or HTTP_MAX_TENTATIVAS
+    ultimo_status = None
+    for tentativa in range(max_tentativas):
+        if not circuito.permitir():
+            raise CircuitoAberto(f"Circuito '{circuito.nome}' aberto")
+
+        resultado, erro = None, None
+        inicio = time.perf_counter()
+        try:
+            resultado = chamada()
+        except Exception as e:
+            erro = e
+        except BaseException:
+            # Interrompida (ex.: timeout do gevent) sem desfecho: libera o teste do meio-aberto
+            circuito.liberar_teste()
+            raise
+
+        sucesso, retentavel, resposta = _avaliar(resultado, erro, circuito)
+        _registrar_tentativa(circuito, inicio, sucesso, retentavel)
+        if sucesso:
+            return resultado
+        ultimo_status = getattr(resposta, "status_code", None)
+        if not retentavel or tentativa == max_tentativas - 1:
+            logger.warning("Falha em '%s' (status=%s, erro=%s), tentativa %d/%d",
+                           circuito.nome, ultimo_status, erro, tentativa + 1, max_tentativas)
+            break
+        espera = calcular_espera(tentativa, resposta)
+        _registrar_retentativa(circuito, espera, tentativa, max_tentativas, ultimo_status, erro)
+        time.sleep(espera)
+
+    raise FalhaUpstream(f"Falha definitiva em '{circuito.nome}'", ultimo_status)
+
+
+async def executar_com_retry_async(chamada, circuito: CircuitBreaker, max_tentativas: int = None):
+    """Versão assíncrona de executar_com_retry (`chamada` é uma função async)."""
+    max_tentativas = max_tentativas or HTTP_MAX_TENTATIVAS
+    ultimo_status = None
+    for tentativa in range(max_tentativas):
+        if not circuito.permitir():
+            raise CircuitoAberto(f"Circuito '{circuito.nome}' aberto")
+
+        resultado, erro = None, None
+        inicio = time.perf_counter()
+        try:
+            resultado = await chamada()
+        except Exception as e:
+            erro = e
+        except BaseException:
+            # Cancelada (ex.: resposta especulativa descartada) sem desfecho:
+            # sem liberar, o meio-aberto recusaria todas as chamadas seguintes
+            circuito.liberar_teste()
+            raise
+
+        sucesso, retentavel, resposta = _avaliar(resultado, erro, circuito)
+        _registrar_tentativa(circuito, inicio, sucesso, retentavel)
+        if sucesso:
+            return resultado
+        ultimo_status = getattr(resposta, "status_code", None)
+        if not retentavel or tentativa == max_tentativas - 1:
+            logger.warning("Falha em '%s' (status=%s, erro=%s), tentativa %d/%d",
+                           circuito.nome, ultimo_status, erro, tentativa + 1, max_tentativas)
+            break
+        espera = calcular_espera(tentativa, resposta)
+        _registrar_retentativa(circuito, espera, tentativa, max_tentativas, ultimo_status, erro)
+        await asyncio.sleep(espera)
+
+    raise FalhaUpstream(f"Falha definitiva em '{circuito.nome}'", ultimo_status)
+
+
+def post_json(url: str, payload: dict, headers: dict, circuito: CircuitBreaker,
+              timeout: float = HTTP_TIMEOUT):
+    """POST com a Session compartilhada + retry/circuit breaker; retorna o JSON."""
+    sessao = obter_sessao()
+    resposta = executar_com_retry(
+        lambda: sessao.post(url, headers=headers, json=payload, timeout=timeout),
+        circuito,
+    )
+    return resposta.json()
@@ -0,0 +1,207 @@
+"""
+Leitura em fluxo de caixas de email para classificação em massa.
+Fontes suportadas: mbox, Maildir, pasta com .eml/.txt/.pdf e JSONL.
+Cada fonte é um gerador de (id, carregar): uma mensagem por vez em memória,
+ainda crua (bytes, caminho ou registro JSON); `carregar()` decodifica MIME,
+extrai o PDF e devolve o texto. Quem processa chama `carregar()` dentro do
+próprio tratamento de erros (e no pool de threads/processos), então um item
+corrompido vira um erro daquele item em vez de derrubar a leitura.
+`pular` descarta as primeiras mensagens antes de decodificá-las (retomada
+a partir do checkpoint sem refazer MIME/PDF do que já foi processado).
+Autor: Micaías Viola
+Data: 2025-09-22
+"""
+import email
+import functools
+import html
+import json
+import logging
+import mailbox
+import os
+import re
+from email import policy
+
+from utils.email_processor import extract_text_from_pdf
+
+logger = logging.getLogger(__name__)
+
+EXTENSOES_DIRETORIO = (".eml", ".txt", ".pdf")
+CAMPOS_TEXTO_JSONL = ("email_content", "body", "text", "texto", "conteudo")
+CAMPOS_ID_JSONL = ("id", "request_id", "message_id")
+
+_TAGS_HTML = re.compile(r"<[^>]+>")
+
+
+# ==============================
+# MIME → TEXTO
+# ==============================
+def _texto_de_html(conteudo: str) -> str:
+    return html.unescape(_TAGS_HTML.sub(" ", conteudo))
+
+
+def texto_da_mensagem(mensagem: email.message.EmailMessage) -> str:
+    """
+    Junta assunto + corpo (text/plain; se não houver, text/html sem tags)
+    + texto dos anexos PDF.
+    """
+    partes = []
+    assunto = mensagem.get("Subject")
+    if assunto:
+        partes.append(str(assunto))
+
+    corpo = mensagem.get_body(preferencelist=("plain", "html"))
+    if corpo is not None:
+        try:
+            conteudo = corpo.get_content()
+        except (LookupError, UnicodeDecodeError):
+            conteudo = (corpo.get_payload(decode=True) or b"").decode("utf-8", errors="ignore")
+        if corpo.get_content_subtype() == "html":
+            conteudo = _texto_de_html(conteudo)
+        partes.append(conteudo)
+
+    for anexo in mensagem.iter_attachments():
+        if anexo.get_content_type() == "application/pdf":
+            dados = anexo.get_payload(decode=True)
+            if dados:
+                try:
+                    partes.append(extract_text_from_pdf(dados))
+                except Exception as e:
+                    logger.warning("Falha ao ler anexo PDF '%s': %s", anexo.get_filename(), e)
+
+    return "\n\n".join(p.strip() for p in partes if p and p.strip())
+
+
+def _texto_de_bytes_eml(dados: bytes) -> str:
+    return texto_da_mensagem(email.message_from_bytes(dados, policy=policy.default))
+
+
+# ==============================
+# FONTES
+# ==============================
+def ler_mbox(caminho: str, pular: int = 0):
+    """
+    Lê um mbox linha a linha, sem indexar o arquivo: cada mensagem é
+    delimitada pela linha "From " e processada assim que termina.
+    As `pular` primeiras só têm os delimitadores contados (nem guardadas).
+    """
+    with open(caminho, "rb") as f:
+        indice, atual, iniciada = 0, [], False
+        for linha in f:
+            if linha.startswith(b"From ") and iniciada:
+                if indice >= pular:
+                    yield f"{caminho}#{indice}", functools.partial(
+                        _texto_de_bytes_eml, b"".join(atual[1:]))
+                indice, atual = indice + 1, []
+            iniciada = True
+            if indice >= pular:
+                atual.append(linha)
+        if iniciada and indice >= pular:
+            yield f"{caminho}#{indice}", functools.partial(_texto_de_bytes_eml, b"".join(atual[1:]))
+
+
+def ler_maildir(caminho: str, pular: int = 0):
+    """Mensagens em ordem estável (chaves ordenadas): a retomada depende dela."""
+    caixa = mailbox.Maildir(caminho, factory=None, create=False)
+    for indice, chave in enumerate(sorted(caixa.iterkeys())):
+        if indice >= pular:
+            yield chave, functools.partial(_texto_de_bytes_eml, caixa.get_bytes(chave))
+
+
+def ler_arquivo(caminho: str) -> str:
+    nome = caminho.lower()
+    if nome.endswith(".pdf"):
+        return extract_text_from_pdf(caminho)
+    with open(caminho, "rb") as f:
+        dados = f.read()
+    if nome.endswith(".eml"):
+        return _texto_de_bytes_eml(dados)
+    return dados.decode("utf-8", errors="ignore")
+
+
+def ler_diretorio(caminho: str, pular: int = 0):
+    """Percorre a pasta (recursivamente, em ordem estável) lendo .eml/.txt/.pdf."""
+    indice = 0
+    for raiz, pastas, arquivos in os.walk(caminho):
+        pastas.sort()
+        for nome in sorted(arquivos):
+            if nome.lower().endswith(EXTENSOES_DIRETORIO):
+                if indice >= pular:
+                    completo = os.path.join(raiz, nome)
+                    yield os.path.relpath(completo, caminho), functools.partial(ler_arquivo, completo)
+                indice += 1
+
+
+def _texto_do_registro_jsonl(registro: dict) -> str:
+    texto = next((registro[c] for c in CAMPOS_TEXTO_JSONL if c in registro), "")
+    titulo = registro.get("title") or registro.get("subject")
+    return f"{titulo}\n\n{texto}" if titulo else texto
+
+
+def _texto_da_linha_jsonl(linha: str) -> str:
+    registro = json.loads(linha)
+    if not isinstance(registro, dict):
+        raise ValueError(f"Linha não é um objeto JSON: {linha.strip()[:80]}")
+    return _texto_do_registro_jsonl(registro)
+
+
+def ler_jsonl(caminho: str, pular: int = 0):
+    """
+    Uma mensagem JSON por linha (ex.: requests.jsonl). Uma linha inválida
+    fica com o número da linha como id e falha só ao ser carregada.
+    """
+    with open(caminho, encoding="utf-8") as f:
+        indice = 0
+        for numero, linha in enumerate(f, 1):
+            if not linha.strip():
+                continue
+            indice += 1
+            if indice <= pular:
+                continue
+            try:
+                registro = json.loads(linha)
+            except ValueError:
+                registro = None
+            if not isinstance(registro, dict):
+                yield str(numero), functools.partial(_texto_da_linha_jsonl, linha)
+                continue
+            ident = next((registro[c] for c in CAMPOS_ID_JSONL if c in registro), numero)
+            yield str(ident), functools.partial(_texto_do_registro_jsonl, registro)
+
+
+def detectar_tipo(caminho: str) -> str:
+    if os.path.isdir(caminho):
+        if all(os.path.isdir(os.path.join(caminho, p)) for p in ("cur", "new", "tmp")):
+            return "maildir"
+        return "diretorio"
+    nome = caminho.lower()
+    if nome.endswith(".jsonl"):
+        return "jsonl"
+    if nome.endswith(EXTENSOES_DIRETORIO):
+        return "arquivo"
+    with open(caminho, "rb") as f:
+        if f.read(5) == b"From ":
+            return "mbox"
+    raise ValueError(f"Não foi possível detectar o tipo da fonte: {caminho}")
+
+
+def itens_da_fonte(caminho: str, tipo: str = "auto", pular: int = 0):
+    """Gerador de (id, carregar) para qualquer fonte suportada, a partir da mensagem `pular`."""
+    tipo = detectar_tipo(caminho) if tipo == "auto" else tipo
+    if tipo == "mbox":
+        return ler_mbox(caminho, pular)
+    if tipo == "maildir":
+        return ler_maildir(caminho, pular)
+    if tipo == "diretorio":
+        return ler_diretorio(caminho, pular)
+    if tipo == "jsonl":
+        return ler_jsonl(caminho, pular)
+    if tipo == "arquivo":
+        return iter([] if pular else
+                    [(os.path.basename(caminho), functools.partial(ler_arquivo, caminho))])
+    raise ValueError(f"Tipo de fonte inválido: {tipo}")
+
+
+def ler_fonte(caminho: str, tipo: str = "auto", pular: int = 0):
+    """Gerador de (id, texto): itens_da_fonte já carregados (um erro interrompe a leitura)."""
+    for ident, carregar in itens_da_fonte(caminho, tipo, pular):
+        yield ident, carregar()
@@ -0,0 +1,132 @@
+"""
+Aquecimento e prontidão do worker.
+Por padrão tudo que é caro (cliente de chat, huggingface_hub, motor de PDF,
+modelos locais) nasce no primeiro uso. WARMUP escolhe quando aquecer:
+  - off        → preguiçoso (padrão): o primeiro usuário paga a criação
+  - background → cada worker aquece numa thread logo ao subir; /readyz
+                 responde 503 até terminar
+  - import     → aquece na importação do app. Com `gunicorn --preload` isso
+                 acontece uma vez no master e os workers herdam a memória já
+                 aquecida no fork (copy-on-write; ver gunicorn.conf.py)
+Além dos clientes e modelos, o aquecimento indexa as respostas aprovadas e
+roda o que for registrado com registrar_aquecimento (ex.: templates do Flask).
+Autor: Micaías Viola
+Data: 2025-09-24
+"""
+import gc
+import importlib
+import logging
+import os
+import threading
+import time
+
+from utils.backends import CLASSIFIER_BACKEND, obter_backend
+from utils.classifier import HF_API_URL, CANDIDATE_LABELS
+from utils.config import token_chat, token_classificador
+from utils.email_processor import PDF_ENGINE
+from utils.hf_response import obter_cliente_chat
+from utils.respostas import obter_indice_respostas
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIGURAÇÕES
+# ==============================
+WARMUP = os.getenv("WARMUP", "off").lower()
+
+# Módulo importado por cada motor de PDF (ver utils/email_processor.py)
+MODULOS_PDF = {
+    "pypdfium2": "pypdfium2",
+    "pypdf": "pypdf",
+    "pypdf2": "PyPDF2",
+    "pdfplumber": "pdfplumber",
+    "pdfminer": "pdfminer.high_level",
+}
+
+_estado = {"aquecido": False, "em_andamento": False, "erro": None, "duracao_s": None}
+_lock = threading.Lock()
+_extras = []  # funções registradas pela aplicação
+
+
+def registrar_aquecimento(funcao):
+    """Inclui `funcao()` no aquecimento (chamar antes de iniciar_aquecimento)."""
+    _extras.append(funcao)
+    return funcao
+
+
+def aquecer():
+    """
+    Cria de antemão os objetos preguiçosos. Não faz chamadas de rede:
+    só importa módulos, monta clientes e carrega modelos locais.
+    """
+    with _lock:
+        if _estado["aquecido"] or _estado["em_andamento"]:
+            return
+        _estado["em_andamento"] = True
+
+    inicio = time.perf_counter()
+    try:
+        obter_cliente_chat()
+        backend = obter_backend(HF_API_URL)
+        if CLASSIFIER_BACKEND == "embedding":
+            backend.aquecer(CANDIDATE_LABELS)
+        else:
+            backend.aquecer()
+        importlib.import_module(MODULOS_PDF.get(PDF_ENGINE.lower(), PDF_ENGINE))
+        obter_indice_respostas().carregar()
+        for funcao in _extras:
+            funcao()
+        _estado["aquecido"] = True
+        _estado["erro"] = None
+    except Exception as e:
+        logger.exception("Falha no aquecimento")
+        _estado["erro"] = str(e)
+    finally:
+        _estado["duracao_s"] = round(time.perf_counter() - inicio, 3)
+        _estado["em_andamento"] = False
+    logger.info("Aquecimento concluído em %.3fs", _estado["duracao_s"])
+
+
+def aquecer_antes_do_fork():
+    """
+    Aquece e congela os objetos atuais no GC: a coleta dos workers não toca
+    mais nessas páginas, então elas continuam compartilhadas após o fork.
+    """
+    aquecer()
+    gc.collect()
+    gc.freeze()
+
+
+def iniciar_aquecimento():
+    """Aplica WARMUP (chamado uma vez na importação do app)."""
+    if WARMUP == "import":
+        aquecer_antes_do_fork()
+    elif WARMUP == "background":
+        threading.Thread(target=aquecer, name="aquecimento", daemon=True).start()
+    elif WARMUP != "off":
+        logger.warning("WARMUP inválido: '%s' (use off, background ou import)", WARMUP)
+
+
+def verificar_prontidao() -> tuple:
+    """
+    (pronto, detalhes) para /readyz: configuração válida e, se o
+    aquecimento foi pedido, concluído sem erro.
+    """
+    verificacoes = {}
+    try:
+        token_chat()
+        if CLASSIFIER_BACKEND == "remoto":
+            token_classificador()
+        verificacoes["config"] = "ok"
+    except ValueError as e:
+        verificacoes["config"] = str(e)
+
+    if WARMUP == "off":
+        verificacoes["warmup"] = "lazy"
+    elif _estado["erro"]:
+        verificacoes["warmup"] = _estado["erro"]
+    else:
+        verificacoes["warmup"] = "ok" if _estado["aquecido"] else "pending"
+
+    pronto = verificacoes["config"] == "ok" and verificacoes["warmup"] in ("ok", "lazy")
+    return pronto, verificacoes
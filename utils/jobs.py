@@ -0,0 +1,175 @@
+"""
+Fila de jobs de classificação em segundo plano.
+  - POST cria o job e responde na hora com o id
+  - um pool limitado de threads roda o fluxo completo
+  - fila cheia → FilaCheia (a rota devolve 429)
+  - estado/resultado ficam num store com expiração (memória e SQLite
+    compartilhado entre os workers; JOBS_SQLITE_PATH vazio = só memória)
+Autor: Micaías Viola
+Data: 2025-09-19
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.cache import CacheLRU, CacheSQLite, caminho_sqlite
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIGURAÇÕES
+# ==============================
+JOBS_MAX_WORKERS = int(os.getenv("JOBS_MAX_WORKERS", 4))      # jobs rodando ao mesmo tempo
+JOBS_MAX_PENDENTES = int(os.getenv("JOBS_MAX_PENDENTES", 32))  # jobs esperando na fila
+JOBS_TTL = float(os.getenv("JOBS_TTL", 15 * 60))               # segundos até expirar
+# Qualquer worker do gunicorn precisa achar o job criado por outro
+JOBS_SQLITE_PATH = caminho_sqlite("JOBS_SQLITE_PATH", "classifyemail-jobs.sqlite")
+# Intervalo mínimo entre gravações do progresso parcial (streaming), em segundos
+JOBS_PARCIAL_INTERVALO = float(os.getenv("JOBS_PARCIAL_INTERVALO", 0.05))
+
+# Estados possíveis
+PENDENTE, PROCESSANDO, CONCLUIDO, ERRO = "pending", "running", "done", "error"
+ESTADOS_FINAIS = (CONCLUIDO, ERRO)
+
+
+class FilaCheia(Exception):
+    """Não há vaga na fila de jobs (backpressure)."""
+
+
+class GerenciadorJobs:
+    """
+    Executa `funcao(*args)` em segundo plano e guarda o estado de cada job.
+    Com parcial=True a função é chamada como `funcao(*args, ao_parcial=f)`;
+    f(**campos) atualiza job["parcial"] e acorda quem espera em
+    aguardar_mudanca; f(trecho_resposta=...) acrescenta um trecho à resposta
+    em streaming (job["parcial"]["resposta"]), publicada no máximo a cada
+    JOBS_PARCIAL_INTERVALO. Cada publicação vai também para o SQLite: o SSE
+    atendido por outro worker do gunicorn recebe os trechos da resposta.
+    """
+
+    def __init__(self, funcao, max_workers: int = JOBS_MAX_WORKERS,
+                 max_pendentes: int = JOBS_MAX_PENDENTES, ttl: float = JOBS_TTL,
+                 caminho_sqlite: str = JOBS_SQLITE_PATH, parcial: bool = False):
+        self.funcao = funcao
+        self.parcial = parcial
+        self.ttl = ttl
+        self._memoria = CacheLRU(max_itens=10000, ttl=ttl)
+        self._disco = CacheSQLite(caminho_sqlite, ttl=ttl, tabela="jobs") if caminho_sqlite else None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        # Vagas = rodando + esperando; acabou a vaga, recusa
+        self._vagas = threading.BoundedSemaphore(max_workers + max_pendentes)
+        self._mudou = threading.Condition()
+
+    # ---------- store ----------
+    def _salvar(self, job: dict):
+        """
+        Grava na memória e no SQLite. Falha do SQLite (ex.: "database is
+        locked") só é registrada: o job segue e os outros workers o veem na
+        próxima gravação que der certo.
+        """
+        job["atualizado_em"] = time.time()
+        self._memoria.guardar(job["id"], dict(job))
+        if self._disco is not None:
+            try:
+                self._disco.guardar(job["id"], job)
+            except sqlite3.Error as e:
+                logger.warning("Erro ao gravar job %s no SQLite: %s", job["id"], e)
+        with self._mudou:
+            self._mudou.notify_all()
+
+    def obter(self, job_id: str):
+        """Estado atual do job (dict) ou None se não existe/expirou."""
+        job = self._memoria.obter(job_id)
+        if job is None and self._disco is not None:
+            try:
+                job = self._disco.obter(job_id)
+            except sqlite3.Error as e:
+                logger.warning("Erro ao ler job %s do SQLite: %s", job_id, e)
+        return dict(job) if job is not None else None
+
+    # ---------- execução ----------
+    def submeter(self, *args, extras: dict = None) -> str:
+        """Enfileira o job e retorna o id. Lança FilaCheia se não houver vaga."""
+        if not self._vagas.acquire(blocking=False):
+            raise FilaCheia("Fila de processamento cheia. Tente novamente em instantes.")
+
+        # Qualquer falha antes de o job chegar ao pool devolve a vaga
+        try:
+            job = {
+                "id": uuid.uuid4().hex,
+                "estado": PENDENTE,
+                "resultado": None,
+                "erro": None,
+                "parcial": {},
+                "criado_em": time.time(),
+                **(extras or {}),
+            }
+            self._salvar(job)
+            self._executor.submit(self._rodar, job, args)
+        except BaseException:
+            self._vagas.release()
+            raise
+        return job["id"]
+
+    def _ao_parcial(self, job: dict):
+        ultimo = [0.0]
+        pendentes = []  # trechos da resposta ainda não publicados
+
+        def atualizar(trecho_resposta: str = None, **campos):
+            if trecho_resposta:
+                pendentes.append(trecho_resposta)
+                if "resposta" not in job["parcial"]:
+                    campos.setdefault("resposta", "")
+            forcar = any(c not in job["parcial"] for c in campos)  # 1ª vez de cada campo
+            agora = time.monotonic()
+            if not (forcar or agora - ultimo[0] >= JOBS_PARCIAL_INTERVALO):
+                return
+            # A resposta só é remontada ao publicar (no máximo a cada
+            # JOBS_PARCIAL_INTERVALO), não a cada trecho do modelo
+            if pendentes:
+                anterior = campos.get("resposta", job["parcial"].get("resposta", ""))
+                campos["resposta"] = anterior + "".join(pendentes)
+                pendentes.clear()
+            job["parcial"] = {**job["parcial"], **campos}
+            ultimo[0] = agora
+            self._salvar(job)
+        return atualizar
+
+    def _rodar(self, job: dict, args: tuple):
+        try:
+            job["estado"] = PROCESSANDO
+            self._salvar(job)
+            if self.parcial:
+                job["resultado"] = self.funcao(*args, ao_parcial=self._ao_parcial(job))
+            else:
+                job["resultado"] = self.funcao(*args)
+            job["estado"] = CONCLUIDO
+        except Exception as e:
+            logger.exception("Job %s falhou: %s", job["id"], e)
+            job["erro"] = str(e)
+            job["estado"] = ERRO
+        finally:
+            try:
+                self._salvar(job)
+            finally:
+                self._vagas.release()
+
+    def aguardar_mudanca(self, job_id: str, desde: float, timeout: float = 1.0):
+        """
+        Espera até o job ser atualizado depois de `desde` (ou o timeout) e
+        devolve o estado. Jobs de outros workers (SQLite) são vistos por polling.
+        """
+        limite = time.monotonic() + timeout
+        while True:
+            job = self.obter(job_id)
+            if job is None or job["atualizado_em"] > desde:
+                return job
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                return job
+            with self._mudou:
+                self._mudou.wait(min(restante, 0.25))
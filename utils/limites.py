@@ -0,0 +1,285 @@
+"""
+Limites de uso:
+  - por cliente: token bucket por chave de API (API_KEY) ou IP nas rotas que
+    chamam os modelos → 429 com Retry-After
+  - orçamento da Hugging Face: conta as chamadas do worker numa janela, lê
+    os headers de rate limit e registra os 429; com a cota no fim o fluxo
+    passa a usar só heurísticas e modelos de resposta (sem IA remota)
+Os dois são por processo: com N workers do gunicorn o limite efetivo por
+cliente é até N vezes maior, e HF_ORCAMENTO_CHAMADAS deve ser dividido
+entre os workers.
+Autor: Micaías Viola
+Data: 2025-10-10
+"""
+import email.utils
+import hashlib
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from utils import metricas
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIGURAÇÕES
+# ==============================
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+RATE_LIMIT_POR_MINUTO = float(os.getenv("RATE_LIMIT_POR_MINUTO", 30))   # reposição
+RATE_LIMIT_RAJADA = float(os.getenv("RATE_LIMIT_RAJADA", 10))           # capacidade do balde
+RATE_LIMIT_MAX_CLIENTES = int(os.getenv("RATE_LIMIT_MAX_CLIENTES", 10000))
+# Atrás de um proxy confiável (Heroku, nginx): o IP do cliente vem do X-Forwarded-For
+RATE_LIMIT_CONFIAR_PROXY = os.getenv("RATE_LIMIT_CONFIAR_PROXY", "false").lower() == "true"
+# Chaves aceitas no header X-API-Key (API_KEY, separadas por vírgula)
+CHAVES_API = {c.strip() for c in os.getenv("API_KEY", "").split(",") if c.strip()}
+
+HF_ORCAMENTO_CHAMADAS = int(os.getenv("HF_ORCAMENTO_CHAMADAS", 0))    # 0 = sem limite conhecido
+HF_ORCAMENTO_JANELA = float(os.getenv("HF_ORCAMENTO_JANELA", 3600))   # segundos
+HF_ORCAMENTO_RESERVA = float(os.getenv("HF_ORCAMENTO_RESERVA", 0.1))  # fração → estado "low"
+HF_ORCAMENTO_PAUSA_429 = float(os.getenv("HF_ORCAMENTO_PAUSA_429", 60))  # sem Retry-After
+
+# Headers de rate limit aceitos (o primeiro presente vale)
+_HEADERS_RESTANTE = ("X-RateLimit-Remaining", "RateLimit-Remaining")
+_HEADERS_LIMITE = ("X-RateLimit-Limit", "RateLimit-Limit")
+_HEADERS_RESET = ("X-RateLimit-Reset", "RateLimit-Reset")
+
+NORMAL, BAIXO, ESGOTADO = "normal", "low", "exhausted"
+
+
+# ==============================
+# LIMITE POR CLIENTE
+# ==============================
+class BaldeTokens:
+    """
+    Token bucket: começa cheio com `capacidade` fichas e repõe `taxa` fichas
+    por segundo. Não é thread-safe (o LimitadorClientes serializa o acesso).
+    """
+
+    def __init__(self, capacidade: float, taxa: float):
+        self.capacidade = capacidade
+        self.taxa = taxa
+        self._fichas = capacidade
+        self._ultimo = time.monotonic()
+
+    def consumir(self, custo: float = 1.0) -> float:
+        """Tira `custo` fichas e devolve 0; sem fichas suficientes, devolve a espera em segundos."""
+        agora = time.monotonic()
+        self._fichas = min(self.capacidade, self._fichas + (agora - self._ultimo) * self.taxa)
+        self._ultimo = agora
+        custo = min(custo, self.capacidade)  # custo maior que o balde nunca passaria
+        if self._fichas >= custo:
+            self._fichas -= custo
+            return 0.0
+        return (custo - self._fichas) / self.taxa if self.taxa > 0 else float("inf")
+
+
+class LimitadorClientes:
+    """Um balde por cliente; os menos recentes são descartados acima de `max_clientes`."""
+
+    def __init__(self, por_minuto: float = RATE_LIMIT_POR_MINUTO,
+                 rajada: float = RATE_LIMIT_RAJADA, max_clientes: int = RATE_LIMIT_MAX_CLIENTES):
+        self.taxa = por_minuto / 60
+        self.rajada = rajada
+        self.max_clientes = max_clientes
+        self._baldes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def verificar(self, cliente: str, custo: float = 1.0) -> float:
+        """0 se a requisição pode seguir; senão, segundos até haver fichas."""
+        with self._lock:
+            balde = self._baldes.get(cliente)
+            if balde is None:
+                balde = self._baldes[cliente] = BaldeTokens(self.rajada, self.taxa)
+                while len(self._baldes) > self.max_clientes:
+                    self._baldes.popitem(last=False)
+            self._baldes.move_to_end(cliente)
+            return balde.consumir(custo)
+
+
+def chave_cliente(chave_api: str, ip: str, chaves_validas: set) -> str:
+    """
+    Identidade usada no limite: a chave de API, se for uma das configuradas
+    (guardada só como hash), senão o IP — chaves inventadas não ganham balde novo.
+    """
+    if chave_api and chave_api in chaves_validas:
+        return "chave:" + hashlib.sha256(chave_api.encode("utf-8")).hexdigest()[:16]
+    return f"ip:{ip or 'desconhecido'}"
+
+
+def chave_api_valida(chave_api: str, chaves_validas: set = None) -> bool:
+    """A chave do header X-API-Key é uma das configuradas em API_KEY (comparação em tempo constante)."""
+    chaves_validas = CHAVES_API if chaves_validas is None else chaves_validas
+    if not chave_api:
+        return False
+    return any(secrets.compare_digest(chave_api.encode("utf-8"), c.encode("utf-8"))
+               for c in chaves_validas)
+
+
+def ip_cliente(endereco_remoto: str, encaminhado: str = None) -> str:
+    """IP do cliente: o primeiro do X-Forwarded-For, se o proxy for confiável."""
+    if RATE_LIMIT_CONFIAR_PROXY and encaminhado:
+        return encaminhado.split(",")[0].strip()
+    return endereco_remoto or ""
+
+
+limitador_clientes = LimitadorClientes()
+
+
+def verificar_limite(chave_api: str, ip: str, endpoint: str, custo: float = 1.0) -> float:
+    """
+    Cobra `custo` fichas do cliente. Retorna 0 se pode seguir; senão os
+    segundos para o Retry-After (e conta a recusa em rate_limited_total).
+    """
+    if not RATE_LIMIT_ENABLED:
+        return 0.0
+    espera = limitador_clientes.verificar(chave_cliente(chave_api, ip, CHAVES_API), custo)
+    if espera:
+        metricas.requisicoes_limitadas.inc(endpoint=endpoint)
+        logger.info("Limite por cliente atingido em '%s' (espera %.1fs)", endpoint, espera)
+    return espera
+
+
+# ==============================
+# ORÇAMENTO DA HUGGING FACE
+# ==============================
+def _numero(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _cabecalho_numerico(cabecalhos, nomes: tuple):
+    """Valor numérico do primeiro header presente entre `nomes` (ou None)."""
+    for nome in nomes:
+        valor = cabecalhos.get(nome)
+        if valor is not None:
+            return _numero(valor)
+    return None
+
+
+def _segundos_ate(reset: float, agora: float) -> float:
+    """X-RateLimit-Reset em segundos até o reset ou, se for um número enorme, um timestamp."""
+    return max(reset - agora if reset > 1e9 else reset, 0.0)
+
+
+class OrcamentoUpstream:
+    """
+    Estimativa da cota restante da Hugging Face:
+      - conta cada tentativa numa janela fixa de `janela` segundos
+        (limite = HF_ORCAMENTO_CHAMADAS; 0 = só os headers/429 valem)
+      - se a resposta trouxer X-RateLimit-Remaining (e -Limit), os valores
+        informados mandam até o X-RateLimit-Reset (sem ele, até a janela virar);
+        restante zerado → esgotada até o reset
+      - um 429 marca a cota como esgotada até o Retry-After (ou `pausa_429`)
+    Estados: normal → low (restante ≤ reserva) → exhausted (zerou ou 429).
+    """
+
+    def __init__(self, limite: int = HF_ORCAMENTO_CHAMADAS, janela: float = HF_ORCAMENTO_JANELA,
+                 reserva: float = HF_ORCAMENTO_RESERVA, pausa_429: float = HF_ORCAMENTO_PAUSA_429):
+        self.limite = limite
+        self.janela = janela
+        self.reserva = reserva
+        self.pausa_429 = pausa_429
+        self._inicio_janela = time.time()
+        self._usadas = 0
+        self._restante_informado = None   # dos headers de rate limit
+        self._limite_informado = None
+        self._informado_ate = None        # X-RateLimit-Reset dos valores informados
+        self._esgotado_ate = 0.0
+        self._lock = threading.Lock()
+
+    def _renovar_janela(self, agora: float):
+        if agora >= self._inicio_janela + self.janela:
+            self._inicio_janela = agora
+            self._usadas = 0
+            self._restante_informado = self._limite_informado = self._informado_ate = None
+        elif self._informado_ate is not None and agora >= self._informado_ate:
+            # A cota do upstream já renovou: os valores informados não valem mais
+            self._restante_informado = self._limite_informado = self._informado_ate = None
+
+    def registrar(self, resposta=None, circuito: str = ""):
+        """Uma tentativa de chamada (com a resposta HTTP, se houver)."""
+        agora = time.time()
+        status = getattr(resposta, "status_code", None)
+        cabecalhos = getattr(resposta, "headers", None) or {}
+        with self._lock:
+            self._renovar_janela(agora)
+            self._usadas += 1
+
+            restante = _cabecalho_numerico(cabecalhos, _HEADERS_RESTANTE)
+            if restante is not None:
+                self._restante_informado = restante
+                self._limite_informado = _cabecalho_numerico(cabecalhos, _HEADERS_LIMITE)
+                reset = _cabecalho_numerico(cabecalhos, _HEADERS_RESET)
+                self._informado_ate = None if reset is None else agora + _segundos_ate(reset, agora)
+                if restante <= 0 and self._informado_ate is not None:
+                    self._esgotado_ate = max(self._esgotado_ate, self._informado_ate)
+
+            if status == 429:
+                pausa = self._pausa(cabecalhos, agora)
+                self._esgotado_ate = max(self._esgotado_ate, agora + pausa)
+        if status == 429:
+            metricas.upstream_429.inc(circuit=circuito)
+            logger.warning("429 da Hugging Face em '%s' → cota esgotada por %.0fs", circuito, pausa)
+
+    def _pausa(self, cabecalhos, agora: float) -> float:
+        retry_after = cabecalhos.get("Retry-After")
+        if retry_after:
+            segundos = _numero(retry_after)
+            if segundos is None:
+                try:
+                    segundos = email.utils.parsedate_to_datetime(retry_after).timestamp() - agora
+                except (TypeError, ValueError):
+                    segundos = None
+            if segundos is not None:
+                return max(segundos, 0.0)
+        reset = _cabecalho_numerico(cabecalhos, _HEADERS_RESET)
+        if reset is not None:
+            return _segundos_ate(reset, agora)
+        return self.pausa_429
+
+    def _restante_e_limite(self) -> tuple:
+        with self._lock:
+            self._renovar_janela(time.time())
+            if self._restante_informado is not None:
+                return max(int(self._restante_informado), 0), self._limite_informado or self.limite
+            if self.limite > 0:
+                return max(self.limite - self._usadas, 0), self.limite
+            return None, 0
+
+    def restante(self):
+        """Chamadas restantes estimadas na janela, ou None se não há limite conhecido."""
+        return self._restante_e_limite()[0]
+
+    def estado(self) -> str:
+        if time.time() < self._esgotado_ate:
+            return ESGOTADO
+        restante, limite = self._restante_e_limite()
+        if restante is None:
+            return NORMAL
+        if restante <= 0:
+            return ESGOTADO
+        if limite and restante <= limite * self.reserva:
+            return BAIXO
+        return NORMAL
+
+    def degradado(self) -> bool:
+        """Cota no fim (low ou exhausted): o fluxo deve evitar chamadas remotas."""
+        return self.estado() != NORMAL
+
+    def atualizar_metricas(self):
+        restante = self.restante()
+        metricas.orcamento_restante.definir(-1 if restante is None else restante)
+        atual = self.estado()
+        for estado in (NORMAL, BAIXO, ESGOTADO):
+            metricas.orcamento_estado.definir(1 if estado == atual else 0, state=estado)
+
+
+orcamento_upstream = OrcamentoUpstream()
+# Recalcula na hora do /metrics (a pausa de um 429 expira sem nenhuma chamada);
+# orcamento_restante é exportado antes de orcamento_estado e atualiza os dois
+metricas.orcamento_restante.atualizar = orcamento_upstream.atualizar_metricas
@@ -0,0 +1,311 @@
+"""
+Telemetria da aplicação:
+  - Contadores e histogramas no formato texto do Prometheus (sem dependências),
+    expostos em /metrics
+  - Tempos por etapa da requisição atual (contextvar) → header Server-Timing
+  - Configuração do logging (nível por LOG_LEVEL, formato texto ou JSON)
+As métricas são por processo: com vários workers do gunicorn, cada um expõe
+as suas (o Prometheus agrega por instância).
+Autor: Micaías Viola
+Data: 2025-09-22
+"""
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# ==============================
+# CONFIGURAÇÕES
+# ==============================
+PREFIXO = "classifyemail_"
+# Em segundos: cobre desde a busca de palavras-chave (µs) até o modelo de chat (dezenas de s)
+BUCKETS_PADRAO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                  0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatar_rotulos(nomes: tuple, valores: tuple, extra: str = "") -> str:
+    pares = [f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+# ==============================
+# MÉTRICAS
+# ==============================
+class Contador:
+    """Contador monotônico, opcionalmente com rótulos."""
+
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = ()):
+        self.nome = PREFIXO + nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, valor: float = 1.0, **rotulos):
+        chave = tuple(rotulos.get(r, "") for r in self.rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def valor(self, **rotulos) -> float:
+        chave = tuple(rotulos.get(r, "") for r in self.rotulos)
+        with self._lock:
+            return self._valores.get(chave, 0.0)
+
+    def exportar(self) -> list:
+        with self._lock:
+            itens = sorted(self._valores.items())
+        return [f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {valor:g}"
+                for chave, valor in itens]
+
+
+class Medidor:
+    """
+    Valor instantâneo (gauge), opcionalmente com rótulos. Se `atualizar` for
+    definido, é chamado antes de cada exportação para recalcular os valores.
+    """
+
+    tipo = "gauge"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = ()):
+        self.nome = PREFIXO + nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.atualizar = None
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def definir(self, valor: float, **rotulos):
+        chave = tuple(rotulos.get(r, "") for r in self.rotulos)
+        with self._lock:
+            self._valores[chave] = valor
+
+    def valor(self, **rotulos) -> float:
+        chave = tuple(rotulos.get(r, "") for r in self.rotulos)
+        with self._lock:
+            return self._valores.get(chave, 0.0)
+
+    def exportar(self) -> list:
+        if self.atualizar is not None:
+            self.atualizar()
+        with self._lock:
+            itens = sorted(self._valores.items())
+        return [f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {valor:g}"
+                for chave, valor in itens]
+
+
+class Histograma:
+    """Histograma com buckets cumulativos (_bucket, _sum, _count)."""
+
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, rotulos: tuple = (), buckets: tuple = BUCKETS_PADRAO):
+        self.nome = PREFIXO + nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # chave → [contagens por bucket..., soma, total]
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float, **rotulos):
+        chave = tuple(rotulos.get(r, "") for r in self.rotulos)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [0] * len(self.buckets) + [0.0, 0]
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie[i] += 1
+                    break
+            serie[-2] += valor
+            serie[-1] += 1
+
+    def exportar(self) -> list:
+        with self._lock:
+            itens = sorted((chave, list(serie)) for chave, serie in self._series.items())
+        linhas = []
+        for chave, serie in itens:
+            acumulado = 0
+            for limite, contagem in zip(self.buckets, serie):
+                acumulado += contagem
+                rotulos = _formatar_rotulos(self.rotulos, chave, f'le="{limite:g}"')
+                linhas.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+            rotulos = _formatar_rotulos(self.rotulos, chave, 'le="+Inf"')
+            linhas.append(f"{self.nome}_bucket{rotulos} {serie[-1]}")
+            rotulos = _formatar_rotulos(self.rotulos, chave)
+            linhas.append(f"{self.nome}_sum{rotulos} {serie[-2]:.6f}")
+            linhas.append(f"{self.nome}_count{rotulos} {serie[-1]}")
+        return linhas
+
+
+class Registro:
+    """Conjunto de métricas exportadas juntas em /metrics."""
+
+    def __init__(self):
+        self._metricas = []
+
+    def registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def exportar(self) -> str:
+        linhas = []
+        for metrica in self._metricas:
+            linhas.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+            linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+            linhas.extend(metrica.exportar())
+        return "\n".join(linhas) + "\n"
+
+
+registro = Registro()
+
+# --- HTTP ---
+requisicoes_http = registro.registrar(Histograma(
+    "http_request_seconds", "Duração das requisições HTTP", ("endpoint", "method", "status")))
+
+# --- Limites ---
+requisicoes_limitadas = registro.registrar(Contador(
+    "rate_limited_total", "Requisições recusadas (429) pelo limite por cliente", ("endpoint",)))
+
+# --- Classificação ---
+filtro_palavras_chave = registro.registrar(Histograma(
+    "keyword_filter_seconds", "Tempo da normalização + busca de palavras-chave"))
+fallback_heuristico = registro.registrar(Histograma(
+    "fallback_seconds", "Ativações (e tempo) da classificação só por heurística", ("reason",)))
+decisoes = registro.registrar(Contador(
+    "decisions_total", "Classificações por caminho de decisão", ("path",)))
+categorias = registro.registrar(Contador(
+    "classifications_total", "Classificações por categoria final", ("category",)))
+
+# --- Upstream (Hugging Face) ---
+tentativas_upstream = registro.registrar(Histograma(
+    "upstream_attempt_seconds", "Duração de cada tentativa de chamada à Hugging Face",
+    ("circuit", "outcome")))
+retentativas_upstream = registro.registrar(Contador(
+    "upstream_retries_total", "Retentativas de chamadas à Hugging Face", ("circuit",)))
+espera_retentativa = registro.registrar(Histograma(
+    "upstream_backoff_seconds", "Espera (backoff/Retry-After) antes de cada retentativa",
+    ("circuit",)))
+upstream_429 = registro.registrar(Contador(
+    "upstream_throttled_total", "Respostas 429 (cota/limite) da Hugging Face", ("circuit",)))
+orcamento_restante = registro.registrar(Medidor(
+    "upstream_budget_remaining",
+    "Chamadas à Hugging Face restantes na janela do orçamento (-1 = sem limite conhecido)"))
+orcamento_estado = registro.registrar(Medidor(
+    "upstream_budget_state",
+    "Estado do orçamento da Hugging Face: 1 no estado atual (normal, low, exhausted)",
+    ("state",)))
+
+# --- Resposta sugerida ---
+geracao_resposta = registro.registrar(Histograma(
+    "reply_generation_seconds", "Geração da resposta sugerida (inclui retentativas)",
+    ("outcome",)))
+pos_processamento = registro.registrar(Histograma(
+    "reply_postprocess_seconds", "Limpeza da saída do modelo de chat", ("function",)))
+primeiro_token = registro.registrar(Histograma(
+    "reply_first_token_seconds", "Streaming: do início da geração ao primeiro trecho mostrado"))
+respostas_por_nivel = registro.registrar(Contador(
+    "reply_tier_total", "Respostas servidas por nível (template, approved, cache, llm, fallback)",
+    ("tier",)))
+
+# --- Entrada ---
+extracao_pdf = registro.registrar(Histograma(
+    "pdf_extraction_seconds", "Extração de texto de PDF", ("engine",)))
+caracteres_descartados = registro.registrar(Contador(
+    "input_dropped_chars_total",
+    "Caracteres do email descartados antes dos modelos (limit, cleanup, truncation)",
+    ("stage",)))
+uploads_recusados = registro.registrar(Contador(
+    "upload_rejected_total",
+    "Uploads recusados antes da leitura completa (extension, content, encoding)",
+    ("reason",)))
+
+
+# ==============================
+# TEMPOS POR REQUISIÇÃO (Server-Timing)
+# ==============================
+_tempos_requisicao = contextvars.ContextVar("tempos_requisicao", default=None)
+# Threads de um pool rodando com uma cópia do contexto somam no mesmo dict
+_tempos_lock = threading.Lock()
+
+
+def iniciar_coleta():
+    """Começa a acumular os tempos por etapa no contexto atual (1 por requisição)."""
+    tempos = {}
+    _tempos_requisicao.set(tempos)
+    return tempos
+
+
+def acumular_tempo(etapa: str, segundos: float):
+    """Soma `segundos` à etapa da requisição atual (ignora fora de requisição)."""
+    tempos = _tempos_requisicao.get()
+    if tempos is not None:
+        with _tempos_lock:
+            tempos[etapa] = tempos.get(etapa, 0.0) + segundos
+
+
+def server_timing(tempos: dict = None) -> str:
+    """Valor do header Server-Timing (ex.: 'hf;dur=812.4, reply;dur=1530.0')."""
+    tempos = _tempos_requisicao.get() if tempos is None else tempos
+    if not tempos:
+        return ""
+    return ", ".join(f"{etapa};dur={segundos * 1000:.1f}" for etapa, segundos in tempos.items())
+
+
+@contextmanager
+def cronometrar(histograma: Histograma, etapa: str = None, **rotulos):
+    """Observa a duração do bloco no histograma e, se `etapa`, no Server-Timing."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        decorrido = time.perf_counter() - inicio
+        histograma.observar(decorrido, **rotulos)
+        if etapa:
+            acumular_tempo(etapa, decorrido)
+
+
+# ==============================
+# LOGGING
+# ==============================
+_CAMPOS_PADRAO = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class FormatadorJSON(logging.Formatter):
+    """Uma linha JSON por evento; campos passados em `extra=` viram chaves."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        evento = {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for chave, valor in vars(record).items():
+            if chave not in _CAMPOS_PADRAO:
+                evento[chave] = valor
+        if record.exc_info:
+            evento["exc"] = self.formatException(record.exc_info)
+        return json.dumps(evento, ensure_ascii=False, default=str)
+
+
+def configurar_logging():
+    """Nível por LOG_LEVEL (padrão INFO); LOG_FORMAT=json para uma linha JSON por evento."""
+    nivel = os.getenv("LOG_LEVEL", "INFO").upper()
+    manipulador = logging.StreamHandler()
+    if os.getenv("LOG_FORMAT", "texto").lower() == "json":
+        manipulador.setFormatter(FormatadorJSON())
+    else:
+        manipulador.setFormatter(logging.Formatter(
+            "%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    logging.basicConfig(level=nivel, handlers=[manipulador], force=True)
@@ -0,0 +1,148 @@
+"""
+Motor de palavras-chave para as heurísticas do classificador.
+Todas as listas viram UMA regex compilada (em forma de trie) na importação,
+então uma única passada pelo texto encontra as ocorrências de todas as
+categorias, com posição e respeitando palavras inteiras. Termos de uma
+palavra também casam no plural ("documentos", "reuniões", "cupons").
+Autor: Micaías Viola
+Data: 2025-09-08
+"""
+import json
+import os
+import re
+
+# ==============================
+# LISTAS PADRÃO
+# ==============================
+# Heurísticas — primeiro filtro rápido
+KEYWORDS_PRODUTIVO = [
+    "proposta", "orçamento", "reunião", "documento", "contrato", "pedido",
+    "suporte", "assistência", "erro", "problema", "bloqueio", "relatório",
+    "projeto", "implementação", "análise", "negócio", "parceria", "pagamento"
+]
+
+# Golpes e spam explícitos — prioridade máxima
+KEYWORDS_GOLPE = [
+    "parabéns", "contemplado", "benefício exclusivo", "últimos dígitos do cpf",
+    "clique no link", "carro zero", "pix imediato", "ganhou", "prêmio", "sorteio",
+    "transferência imediata", "oferta imperdível", "bônus garantido", "resgate seu benefício"
+]
+
+# Marketing genérico (não golpe, mas improdutivo)
+KEYWORDS_MARKETING = [
+    "desconto", "promoção", "ganhe", "oferta", "cupom", "publicidade",
+    "cashback", "black friday", "frete grátis", "oferta relâmpago"
+]
+
+# Arquivo JSON opcional com termos extras por categoria, ex.:
+# {"golpe": ["..."], "marketing": ["..."], "produtivo": ["..."]}
+KEYWORDS_FILE = os.getenv("KEYWORDS_FILE")
+
+
+def _normalizar_termo(termo: str) -> str:
+    return " ".join(termo.lower().split())
+
+
+def plural(palavra: str) -> str:
+    """Plural regular em português (reunião → reuniões, cupom → cupons, erro → erros)."""
+    if palavra.endswith("ão"):
+        return palavra[:-2] + "ões"
+    if palavra.endswith("m"):
+        return palavra[:-1] + "ns"
+    if palavra.endswith(("r", "z")):
+        return palavra + "es"
+    if palavra.endswith("s"):
+        return palavra  # bônus, lápis: invariáveis
+    return palavra + "s"
+
+
+def carregar_listas(caminho: str = None) -> dict:
+    """
+    Monta {categoria: [termos]} a partir das listas padrão e, se houver,
+    acrescenta os termos do arquivo JSON indicado (ou de KEYWORDS_FILE).
+    """
+    listas = {
+        "golpe": list(KEYWORDS_GOLPE),
+        "marketing": list(KEYWORDS_MARKETING),
+        "produtivo": list(KEYWORDS_PRODUTIVO),
+    }
+    caminho = caminho or KEYWORDS_FILE
+    if caminho:
+        with open(caminho, encoding="utf-8") as f:
+            extras = json.load(f)
+        for categoria, termos in extras.items():
+            listas.setdefault(categoria, []).extend(termos)
+    return listas
+
+
+def _trie_para_regex(termos) -> str:
+    """
+    Converte uma lista de termos numa alternância em forma de trie
+    (prefixos comuns fatorados), ex.: oferta(?:\\s+relâmpago)?
+    O motor de regex só testa cada prefixo uma vez, por isso o custo
+    quase não cresce com milhares de termos.
+    """
+    trie = {}
+    for termo in termos:
+        no = trie
+        for char in termo:
+            no = no.setdefault(char, {})
+        no[""] = {}  # fim de termo
+
+    def _montar(no) -> str:
+        fim = "" in no
+        ramos = []
+        for char in sorted(k for k in no if k):
+            atomo = r"\s+" if char == " " else re.escape(char)
+            ramos.append(atomo + _montar(no[char]))
+        if not ramos:
+            return ""
+        corpo = ramos[0] if len(ramos) == 1 else "(?:" + "|".join(ramos) + ")"
+        # Ramos são testados antes do fim → preferência pelo termo mais longo
+        if fim:
+            return (corpo if len(ramos) > 1 else "(?:" + corpo + ")") + "?"
+        return corpo
+
+    return _montar(trie)
+
+
+class MotorPalavrasChave:
+    """
+    Encontra, numa só passada, todas as palavras-chave de todas as categorias.
+    Casamento sem diferenciar maiúsculas, apenas palavras inteiras (termos de
+    uma palavra também no plural, informado como o termo no singular) e,
+    havendo sobreposição, o termo mais longo vence.
+    """
+
+    def __init__(self, listas: dict):
+        self.categorias_por_termo = {}
+        self.termo_por_forma = {}  # forma no texto (singular ou plural) → termo da lista
+        for categoria, termos in listas.items():
+            for termo in termos:
+                termo = _normalizar_termo(termo)
+                if termo:
+                    self.categorias_por_termo.setdefault(termo, set()).add(categoria)
+                    self.termo_por_forma[termo] = termo
+        for termo in list(self.categorias_por_termo):
+            if " " not in termo:
+                self.termo_por_forma.setdefault(plural(termo), termo)
+        self.categorias = tuple(listas)
+        padrao = _trie_para_regex(self.termo_por_forma) or "(?!)"
+        self.regex = re.compile(rf"(?<!\w)(?:{padrao})(?!\w)", re.IGNORECASE)
+
+    def buscar(self, texto: str) -> dict:
+        """
+        Retorna {categoria: [(termo, inicio, fim), ...]} com todas as
+        ocorrências no texto (categorias sem ocorrência ficam com lista vazia).
+        """
+        ocorrencias = {categoria: [] for categoria in self.categorias}
+        for match in self.regex.finditer(texto):
+            forma = _normalizar_termo(match.group(0))
+            termo = self.termo_por_forma.get(forma, forma)
+            for categoria in self.categorias_por_termo.get(termo, ()):
+                ocorrencias[categoria].append((termo, match.start(), match.end()))
+        return ocorrencias
+
+
+# Motor compartilhado, compilado uma vez na importação
+motor_palavras_chave = MotorPalavrasChave(carregar_listas())
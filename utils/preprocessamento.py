@@ -0,0 +1,181 @@
+"""
+Pré-processamento do texto antes dos modelos.
+Garante que o tamanho do payload (e a latência) fique limitado seja qual
+for o tamanho do email ou do PDF:
+  1. Corte bruto (PREPROC_MAX_CARACTERES, início + fim) antes de qualquer regex
+  2. clean_email_content: tira respostas citadas, encaminhamentos,
+     assinaturas e avisos legais
+  3. Orçamento de tokens por modelo:
+       - classificação → até PREPROC_MAX_TRECHOS trechos (início, meio, fim)
+         classificados juntos e com os scores agregados
+       - resposta → uma janela início + fim no prompt
+O que foi descartado em cada etapa vai para o log e para /metrics.
+Autor: Micaías Viola
+Data: 2025-09-29
+"""
+import logging
+import os
+
+from utils import metricas
+from utils.email_processor import clean_email_content
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIGURAÇÕES
+# ==============================
+# Estimativa conservadora para português (tokenizers BPE/SentencePiece)
+CARACTERES_POR_TOKEN = float(os.getenv("CARACTERES_POR_TOKEN", 3.5))
+# Limite antes da limpeza (o restante do pipeline nunca vê mais que isso)
+PREPROC_MAX_CARACTERES = int(os.getenv("PREPROC_MAX_CARACTERES", 100000))
+# Trechos classificados por email longo (1 = só o início)
+PREPROC_MAX_TRECHOS = max(1, int(os.getenv("PREPROC_MAX_TRECHOS", 3)))
+# Versão das regras de limpeza/corte: suba quando mudar o que chega aos
+# modelos, para que o cache não sirva decisões do pipeline anterior
+PREPROC_VERSAO = "2"
+# Fração da janela do prompt reservada ao início do email (o resto vai para o fim)
+FRACAO_INICIO = 0.7
+MARCADOR_CORTE = " [...] "
+
+# Tokens do email que cabem em cada modelo (descontados template/hipótese)
+ORCAMENTO_TOKENS = {
+    "joeddav/xlm-roberta-large-xnli": 448,                               # 512 - hipótese
+    "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2": 128,  # max_seq_length
+    "HuggingFaceTB/SmolLM3-3B": 1024,                                    # latência do chat
+}
+ORCAMENTO_TOKENS_PADRAO = int(os.getenv("ORCAMENTO_TOKENS_PADRAO", 512))
+# Ajustes sem mexer no código: ORCAMENTO_TOKENS="modelo=256,outro/modelo=1024"
+for _item in filter(None, os.getenv("ORCAMENTO_TOKENS", "").split(",")):
+    _modelo, _, _tokens = _item.rpartition("=")
+    ORCAMENTO_TOKENS[_modelo.strip()] = int(_tokens)
+
+
+def orcamento_caracteres(modelo: str) -> int:
+    """Orçamento do modelo convertido em caracteres."""
+    return int(ORCAMENTO_TOKENS.get(modelo, ORCAMENTO_TOKENS_PADRAO) * CARACTERES_POR_TOKEN)
+
+
+def versao_preprocessamento() -> str:
+    """Versão das regras + limites configurados (entra nas chaves de cache da classificação)."""
+    return f"{PREPROC_VERSAO}:{PREPROC_MAX_CARACTERES}:{PREPROC_MAX_TRECHOS}"
+
+
+def _registrar_descarte(etapa: str, caracteres: int):
+    if caracteres > 0:
+        metricas.caracteres_descartados.inc(caracteres, stage=etapa)
+
+
+def _ajustar_inicio(texto: str, posicao: int) -> int:
+    """Avança até o começo da próxima palavra (não corta palavras ao meio)."""
+    if posicao <= 0:
+        return 0
+    espaco = texto.find(" ", posicao)
+    return posicao if espaco == -1 else espaco + 1
+
+
+def _ajustar_fim(texto: str, posicao: int) -> int:
+    """Recua até o fim da palavra anterior."""
+    if posicao >= len(texto):
+        return len(texto)
+    espaco = texto.rfind(" ", 0, posicao)
+    return posicao if espaco <= 0 else espaco
+
+
+def _inicio_e_fim(texto: str, limite: int, separador: str) -> str:
+    inicio = int(limite * FRACAO_INICIO)
+    fim = limite - inicio
+    return (texto[:_ajustar_fim(texto, inicio)] + separador
+            + texto[_ajustar_inicio(texto, len(texto) - fim):])
+
+
+def limpar(texto: str) -> str:
+    """Corte bruto + clean_email_content. Usado antes das heurísticas."""
+    texto = texto or ""
+    if len(texto) > PREPROC_MAX_CARACTERES:
+        _registrar_descarte("limit", len(texto) - PREPROC_MAX_CARACTERES)
+        texto = _inicio_e_fim(texto, PREPROC_MAX_CARACTERES, "\n")
+    tamanho = len(texto)
+    texto = clean_email_content(texto)
+    _registrar_descarte("cleanup", tamanho - len(texto))
+    return texto
+
+
+def dividir_em_trechos(texto: str, modelo: str, max_trechos: int = None) -> list:
+    """
+    Trechos (início, meio..., fim) que cabem no orçamento do modelo,
+    espaçados uniformemente ao longo do texto. Texto curto → [texto].
+    """
+    max_trechos = max_trechos or PREPROC_MAX_TRECHOS
+    limite = orcamento_caracteres(modelo)
+    if len(texto) <= limite:
+        return [texto]
+
+    quantidade = min(max_trechos, -(-len(texto) // limite))
+    if quantidade == 1:
+        trechos = [texto[:_ajustar_fim(texto, limite)]]
+    else:
+        passo = (len(texto) - limite) / (quantidade - 1)
+        trechos = []
+        for i in range(quantidade):
+            inicio = _ajustar_inicio(texto, round(i * passo))
+            trechos.append(texto[inicio:_ajustar_fim(texto, inicio + limite)])
+
+    cobertos = sum(len(t) for t in trechos)
+    descartados = max(0, len(texto) - cobertos)
+    _registrar_descarte("truncation", descartados)
+    if descartados:
+        logger.info("Email longo (%d caracteres) → %d trechos para %s, %d caracteres fora",
+                    len(texto), len(trechos), modelo, descartados)
+    return trechos
+
+
+def agregar_resultados(texto: str, resultados: list, pesos: list):
+    """
+    Junta os resultados (labels/scores) de cada trecho numa média ponderada
+    pelo tamanho do trecho, no mesmo formato da Inference API.
+    None se algum trecho falhou.
+    """
+    if len(resultados) == 1:
+        return resultados[0]
+    if any(not isinstance(r, dict) or "labels" not in r or "scores" not in r
+           for r in resultados):
+        return None
+
+    total = sum(pesos) or 1
+    somas = {}
+    for resultado, peso in zip(resultados, pesos):
+        for label, score in zip(resultado["labels"], resultado["scores"]):
+            somas[label] = somas.get(label, 0.0) + float(score) * peso / total
+    pares = sorted(somas.items(), key=lambda p: p[1], reverse=True)
+    return {"sequence": texto, "labels": [p[0] for p in pares], "scores": [p[1] for p in pares]}
+
+
+def classificar_em_trechos(classificar, textos: list, labels: list, modelo: str) -> list:
+    """
+    Divide cada texto em trechos, classifica todos numa única chamada a
+    `classificar(trechos, labels)` (contrato de BackendClassificador) e
+    agrega os scores de volta por texto.
+    """
+    trechos_por_texto = [dividir_em_trechos(texto, modelo) for texto in textos]
+    planos = [t for trechos in trechos_por_texto for t in trechos]
+    resultados = classificar(planos, labels) if planos else []
+
+    agregados = []
+    posicao = 0
+    for texto, trechos in zip(textos, trechos_por_texto):
+        parte = resultados[posicao:posicao + len(trechos)]
+        posicao += len(trechos)
+        agregados.append(agregar_resultados(texto, parte, [len(t) for t in trechos]))
+    return agregados
+
+
+def preparar_para_chat(texto: str, modelo: str) -> str:
+    """Texto limpo que cabe no prompt do modelo de chat (início + fim)."""
+    texto = limpar(texto)
+    limite = orcamento_caracteres(modelo)
+    if len(texto) <= limite:
+        return texto
+    _registrar_descarte("truncation", len(texto) - limite)
+    logger.info("Email longo (%d caracteres) → prompt com %d caracteres para %s",
+                len(texto), limite, modelo)
+    return _inicio_e_fim(texto, limite, MARCADOR_CORTE)
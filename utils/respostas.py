@@ -0,0 +1,260 @@
+"""
+Nível rápido de respostas, antes do modelo de chat:
+  1. Modelos de resposta por sub-rótulo (golpe, marketing, saudação...),
+     preenchidos com o nome do remetente quando ele assina o email
+  2. Resposta já aprovada de um email parecido (TF-IDF de palavras e
+     bigramas + cosseno, índice invertido em memória)
+Só quando nenhum dos dois serve o fluxo chama o LLM.
+Autor: Micaías Viola
+Data: 2025-09-26
+"""
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+
+from utils.config import Preguicoso
+
+# ==============================
+# CONFIGURAÇÕES
+# ==============================
+# Sub-rótulos respondidos só com o modelo (sem LLM)
+RESPOSTA_TEMPLATE_SUBROTULOS = {
+    s.strip() for s in os.getenv(
+        "RESPOSTA_TEMPLATE_SUBROTULOS", "golpe,marketing,pessoal,saudacao,curto").split(",")
+    if s.strip()
+}
+# Similaridade mínima (cosseno, 0–1) para reaproveitar uma resposta aprovada
+RESPOSTA_SIMILARIDADE_MIN = float(os.getenv("RESPOSTA_SIMILARIDADE_MIN", 0.8))
+# JSONL com as respostas aprovadas (compartilhado entre workers); vazio = só memória
+RESPOSTAS_APROVADAS_FILE = os.getenv("RESPOSTAS_APROVADAS_FILE")
+# Limites das aprovações (o arquivo e o índice em memória não crescem sem fim)
+RESPOSTA_APROVADA_MAX_EMAIL = int(os.getenv("RESPOSTA_APROVADA_MAX_EMAIL", 20000))        # caracteres
+RESPOSTA_APROVADA_MAX_RESPOSTA = int(os.getenv("RESPOSTA_APROVADA_MAX_RESPOSTA", 4000))   # caracteres
+RESPOSTAS_APROVADAS_MAX = int(os.getenv("RESPOSTAS_APROVADAS_MAX", 5000))                 # itens
+RESPOSTA_ASSINATURA = os.getenv("RESPOSTA_ASSINATURA", "Atenciosamente,\nEquipe")
+
+MODELOS_RESPOSTA = {
+    "golpe": (
+        "{saudacao}\n\nRecebemos sua mensagem. Por segurança, não compartilhamos senhas, "
+        "dados pessoais ou bancários e não realizamos pagamentos solicitados por email. "
+        "Se este contato for legítimo, utilize nossos canais oficiais.\n\n{assinatura}"
+    ),
+    "marketing": (
+        "{saudacao}\n\nObrigado pelo envio. No momento não temos interesse nesta oferta, "
+        "mas agradecemos o contato.\n\n{assinatura}"
+    ),
+    "pessoal": (
+        "{saudacao}\n\nObrigado pela mensagem! Ficamos felizes com o contato.\n\n{assinatura}"
+    ),
+    "saudacao": (
+        "{saudacao}\n\nMuito obrigado pelos votos! Desejamos o mesmo a você e a todos "
+        "os seus.\n\n{assinatura}"
+    ),
+    "curto": "{saudacao}\n\nObrigado pelo seu email. Desejamos um ótimo dia!\n\n{assinatura}",
+    "trabalho": (
+        "{saudacao}\n\nObrigado pela mensagem. Recebemos as informações e retornaremos "
+        "com os próximos passos em breve.\n\n{assinatura}"
+    ),
+    "solicitacao": (
+        "{saudacao}\n\nRecebemos sua solicitação. Estamos reunindo as informações e os "
+        "documentos pedidos e retornaremos em breve.\n\n{assinatura}"
+    ),
+    "suporte": (
+        "{saudacao}\n\nRecebemos seu pedido de suporte e nossa equipe técnica já está "
+        "analisando o problema. Retornaremos assim que houver uma atualização.\n\n{assinatura}"
+    ),
+}
+
+_DESPEDIDA = re.compile(
+    r"^(atenciosamente|att\.?|abraços?|grande abraço|um abraço|cordialmente|"
+    r"obrigad[oa]|saudações|beijos?|até mais)\b", re.IGNORECASE)
+_NOME = re.compile(r"^[A-ZÀ-Ý][\wÀ-ÿ'.-]*(?: [A-ZÀ-Ýa-z][\wÀ-ÿ'.-]*){0,3}$")
+_PALAVRAS = re.compile(r"\w+")
+
+
+# ==============================
+# MODELOS POR SUB-RÓTULO
+# ==============================
+def extrair_nome_remetente(texto: str):
+    """Primeira palavra da linha seguinte à despedida ('Atenciosamente,\\nJoão Silva')."""
+    linhas = [linha.strip() for linha in texto.splitlines() if linha.strip()]
+    for indice in range(len(linhas) - 2, -1, -1):
+        if _DESPEDIDA.match(linhas[indice]):
+            candidato = linhas[indice + 1]
+            if len(candidato) <= 40 and _NOME.match(candidato):
+                return candidato.split()[0]
+            return None
+    return None
+
+
+def preencher_modelo(subrotulo: str, texto_email: str) -> str:
+    nome = extrair_nome_remetente(texto_email)
+    return MODELOS_RESPOSTA[subrotulo].format(
+        saudacao=f"Olá, {nome}!" if nome else "Olá!",
+        assinatura=RESPOSTA_ASSINATURA,
+    )
+
+
+def resposta_de_modelo(texto_email: str, detalhe: dict) -> str:
+    """
+    Modelo de resposta para qualquer email (usado sem cota para o LLM):
+    o do sub-rótulo ou, sem sub-rótulo, o genérico da categoria.
+    """
+    subrotulo = detalhe.get("subrotulo")
+    if subrotulo not in MODELOS_RESPOSTA:
+        subrotulo = "trabalho" if detalhe.get("categoria") == "Produtivo" else "curto"
+    return preencher_modelo(subrotulo, texto_email)
+
+
+# ==============================
+# RESPOSTAS APROVADAS (vizinho mais próximo)
+# ==============================
+def _termos(texto: str) -> Counter:
+    palavras = _PALAVRAS.findall(texto.lower())
+    termos = Counter(palavras)
+    termos.update(f"{a} {b}" for a, b in zip(palavras, palavras[1:]))
+    return termos
+
+
+class IndiceCheio(Exception):
+    """O índice já tem RESPOSTAS_APROVADAS_MAX respostas aprovadas."""
+
+
+class IndiceRespostas:
+    """
+    Índice invertido de emails com resposta aprovada. O arquivo JSONL é
+    relido incrementalmente (só as linhas novas) a cada busca, então
+    aprovações feitas em outro worker aparecem aqui também.
+    """
+
+    def __init__(self, caminho: str = None, max_itens: int = RESPOSTAS_APROVADAS_MAX):
+        self.caminho = caminho
+        self.max_itens = max_itens
+        self._itens = []                      # {"email", "resposta", "categoria", "subrotulo"}
+        self._invertido = defaultdict(list)   # termo → [(id, peso_tf)]
+        self._df = Counter()
+        self._normas = None                   # recalculadas quando o índice muda
+        self._lido_ate = 0                    # bytes do arquivo já indexados
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._itens)
+
+    def _indexar(self, item: dict):
+        ident = len(self._itens)
+        self._itens.append(item)
+        for termo, contagem in _termos(item["email"]).items():
+            self._invertido[termo].append((ident, 1.0 + math.log(contagem)))
+            self._df[termo] += 1
+        self._normas = None
+
+    def _sincronizar(self):
+        if not self.caminho or not os.path.exists(self.caminho):
+            return
+        if os.path.getsize(self.caminho) <= self._lido_ate:
+            return
+        with open(self.caminho, "rb") as f:
+            f.seek(self._lido_ate)
+            dados = f.read()
+        fim = dados.rfind(b"\n") + 1  # ignora uma linha ainda sendo escrita
+        for linha in dados[:fim].splitlines():
+            if linha.strip():
+                self._indexar(json.loads(linha))
+        self._lido_ate += fim
+
+    def carregar(self):
+        """Indexa as aprovações já gravadas (aquecimento, antes do fork)."""
+        with self._lock:
+            self._sincronizar()
+            if self._itens and self._normas is None:
+                self._calcular_normas()
+
+    def _idf(self, termo: str) -> float:
+        return math.log((1 + len(self._itens)) / (1 + self._df[termo])) + 1.0
+
+    def _calcular_normas(self):
+        quadrados = [0.0] * len(self._itens)
+        for termo, postagens in self._invertido.items():
+            idf = self._idf(termo)
+            for ident, peso in postagens:
+                quadrados[ident] += (peso * idf) ** 2
+        self._normas = [math.sqrt(q) or 1.0 for q in quadrados]
+
+    def buscar(self, texto: str, categoria: str = None) -> tuple:
+        """(similaridade, item) do email aprovado mais parecido, ou (0.0, None)."""
+        with self._lock:
+            self._sincronizar()
+            if not self._itens:
+                return 0.0, None
+            if self._normas is None:
+                self._calcular_normas()
+
+            acumulado = defaultdict(float)
+            norma_consulta = 0.0
+            for termo, contagem in _termos(texto).items():
+                if termo not in self._df:
+                    continue
+                idf = self._idf(termo)
+                peso_consulta = (1.0 + math.log(contagem)) * idf
+                norma_consulta += peso_consulta ** 2
+                for ident, peso in self._invertido[termo]:
+                    acumulado[ident] += peso_consulta * peso * idf
+            if not acumulado:
+                return 0.0, None
+
+            # Termos desconhecidos também contam na norma da consulta
+            norma_consulta = math.sqrt(norma_consulta + sum(
+                (1.0 + math.log(c)) ** 2 for t, c in _termos(texto).items() if t not in self._df))
+            melhor, melhor_item = 0.0, None
+            for ident, produto in acumulado.items():
+                item = self._itens[ident]
+                if categoria and item.get("categoria") != categoria:
+                    continue
+                similaridade = produto / (norma_consulta * self._normas[ident])
+                if similaridade > melhor:
+                    melhor, melhor_item = similaridade, item
+            return melhor, melhor_item
+
+    def aprovar(self, email: str, resposta: str, categoria: str, subrotulo: str = None):
+        """
+        Registra uma resposta aprovada (no arquivo, se configurado).
+        Lança IndiceCheio quando já há `max_itens` aprovações.
+        """
+        item = {"email": email, "resposta": resposta, "categoria": categoria,
+                "subrotulo": subrotulo}
+        with self._lock:
+            self._sincronizar()
+            if len(self._itens) >= self.max_itens:
+                raise IndiceCheio(f"Limite de {self.max_itens} respostas aprovadas atingido.")
+            if not self.caminho:
+                self._indexar(item)
+                return
+            with open(self.caminho, "a", encoding="utf-8") as f:
+                f.write(json.dumps(item, ensure_ascii=False) + "\n")
+            self._sincronizar()
+
+
+_indice = Preguicoso(lambda: IndiceRespostas(RESPOSTAS_APROVADAS_FILE))
+
+
+def obter_indice_respostas() -> IndiceRespostas:
+    return _indice.obter()
+
+
+def resposta_rapida(texto_email: str, detalhe: dict) -> tuple:
+    """
+    Tenta responder sem o LLM. `detalhe` é o retorno de
+    classificar_email_detalhado. Retorna (resposta, nivel) com nivel
+    'template' ou 'aprovada', ou (None, None) se for preciso gerar.
+    """
+    subrotulo = detalhe.get("subrotulo")
+    if subrotulo in RESPOSTA_TEMPLATE_SUBROTULOS and subrotulo in MODELOS_RESPOSTA:
+        return preencher_modelo(subrotulo, texto_email), "template"
+
+    similaridade, item = obter_indice_respostas().buscar(texto_email, detalhe.get("categoria"))
+    if item is not None and similaridade >= RESPOSTA_SIMILARIDADE_MIN:
+        return item["resposta"], "aprovada"
+    return None, None
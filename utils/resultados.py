@@ -0,0 +1,104 @@
+"""
+Store de resultados exibidos na página /result.
+O cookie de sessão guarda só o id (e os ids do histórico); o conteúdo fica
+no servidor, com as mesmas camadas do cache de resultados:
+  1. Memória do processo — LRU com TTL
+  2. SQLite (RESULTADOS_SQLITE_PATH) — compartilhado entre os workers; vazio = só memória
+O id é derivado do conteúdo exibido: o mesmo email com o mesmo resultado
+gera o mesmo id e é guardado uma vez só.
+Autor: Micaías Viola
+Data: 2025-10-06
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from utils.cache import CacheLRU, CacheSQLite, caminho_sqlite, normalizar_texto
+from utils.config import Preguicoso
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIGURAÇÕES
+# ==============================
+RESULTADOS_TTL = float(os.getenv("RESULTADOS_TTL", 24 * 60 * 60))      # segundos
+RESULTADOS_MAX_ITENS = int(os.getenv("RESULTADOS_MAX_ITENS", 4096))     # camada memória
+# Camada disco: o id no cookie precisa valer em qualquer worker do gunicorn
+RESULTADOS_SQLITE_PATH = caminho_sqlite("RESULTADOS_SQLITE_PATH", "classifyemail-resultados.sqlite")
+RESULTADOS_HISTORICO = int(os.getenv("RESULTADOS_HISTORICO", 10))       # ids guardados no cookie
+
+
+def id_resultado(preview: str, categoria: str, resposta: str) -> str:
+    """Id curto (hash) do resultado; iguais no conteúdo → mesmo id."""
+    base = json.dumps([normalizar_texto(preview), categoria, resposta], ensure_ascii=False)
+    return hashlib.sha256(base.encode("utf-8")).hexdigest()[:32]
+
+
+class ArmazemResultados:
+    """
+    Guarda e lê resultados por id (memória → SQLite).
+    Erros do SQLite (banco travado, sem permissão) só são registrados: o
+    resultado fica na memória do worker em vez de a requisição falhar.
+    """
+
+    def __init__(self, max_itens: int = RESULTADOS_MAX_ITENS, ttl: float = RESULTADOS_TTL,
+                 caminho_sqlite: str = RESULTADOS_SQLITE_PATH):
+        self.ttl = ttl
+        self._memoria = CacheLRU(max_itens=max_itens, ttl=ttl)
+        self._disco = None
+        if caminho_sqlite:
+            try:
+                self._disco = CacheSQLite(caminho_sqlite, ttl=ttl, tabela="resultados")
+            except sqlite3.Error as e:
+                logger.warning("Store de resultados em disco indisponível (%s) → só memória", e)
+
+    def guardar(self, preview: str, categoria: str, resposta: str, **extras) -> str:
+        """
+        Guarda o resultado e devolve o id. Se já existe (deduplicação), só
+        renova o prazo de expiração e mantém a data de criação original.
+        """
+        resultado_id = id_resultado(preview, categoria, resposta)
+        registro = self.obter(resultado_id) or {
+            "id": resultado_id,
+            "original_content": preview,
+            "classification": categoria,
+            "response": resposta,
+            "criado_em": time.time(),
+            **extras,
+        }
+        self._memoria.guardar(resultado_id, registro)
+        if self._disco is not None:
+            try:
+                self._disco.guardar(resultado_id, registro)
+            except sqlite3.Error as e:
+                logger.warning("Erro ao gravar resultado no SQLite: %s", e)
+        return resultado_id
+
+    def obter(self, resultado_id: str):
+        """Resultado (dict) ou None se não existe/expirou."""
+        registro = self._memoria.obter(resultado_id)
+        if registro is None and self._disco is not None:
+            try:
+                registro = self._disco.obter(resultado_id)
+            except sqlite3.Error as e:
+                logger.warning("Erro ao ler resultado do SQLite: %s", e)
+            if registro is not None:
+                self._memoria.guardar(resultado_id, registro)
+        return dict(registro) if registro is not None else None
+
+
+def adicionar_ao_historico(historico: list, resultado_id: str,
+                           limite: int = RESULTADOS_HISTORICO) -> list:
+    """Novo histórico de ids (mais recente primeiro, sem repetição, até `limite`)."""
+    return ([resultado_id] + [i for i in historico or [] if i != resultado_id])[:limite]
+
+
+_armazem = Preguicoso(ArmazemResultados)
+
+
+def obter_armazem() -> ArmazemResultados:
+    """Store de resultados do processo (criado no primeiro uso)."""
+    return _armazem.obter()
@@ -0,0 +1,207 @@
+"""
+Processamento de texto usado em toda requisição, com os padrões compilados
+uma única vez na importação:
+  - limpeza do email recebido (citações, encaminhamentos, assinaturas, avisos)
+  - pós-processamento da saída do modelo de chat: numa única passada pelas
+    linhas remove o raciocínio interno e acha o cumprimento que abre a resposta
+  - a mesma lógica em versão incremental para o streaming
+O `.*` só aparece depois de uma frase fixa e para no fim da linha, e o
+cumprimento é buscado sem capturar o resto do texto: custo linear no tamanho
+da entrada mesmo em saídas patológicas.
+Autor: Micaías Viola
+Data: 2025-10-02
+"""
+import re
+
+# ==============================
+# PADRÕES
+# ==============================
+ESPACOS = re.compile(r"\s+")
+
+# Frases que parecem raciocínio interno do modelo (inglês e português):
+# dali até o fim da linha é descartado
+_FRASES_RACIOCINIO = (
+    r"let me|i should|they want|maybe|so i|alright|let's|okay,|então vou|preciso|"
+    r"vou pensar|deixa eu|analisando|pensando|raciocínio|planejando")
+RACIOCINIO = re.compile(_FRASES_RACIOCINIO, re.IGNORECASE)
+# A frase até o fim da linha (`.` não passa do "\n"): um sub() limpa o texto todo
+RACIOCINIO_ATE_FIM_DA_LINHA = re.compile(f"(?:{_FRASES_RACIOCINIO}).*", re.IGNORECASE)
+# Cumprimento que marca o início da resposta de verdade
+SAUDACAO = re.compile(
+    r"Prezado|Prezada|Prezados|Olá|Caro|Cara|Bom dia|Boa tarde|Boa noite",
+    re.IGNORECASE)
+# Maior frase de RACIOCINIO/SAUDACAO: no streaming é o que fica retido da linha
+MAIOR_PADRAO = 12
+
+# Email recebido
+# Início de uma resposta citada: tudo dali para baixo é o histórico da conversa
+INICIO_CITACAO = re.compile(
+    r"^(em .{0,120}escreveu:?|on .{0,120}wrote:?|-{2,} ?(original message|mensagem original) ?-{2,})$",
+    re.IGNORECASE)
+# Marcador de encaminhamento: some o marcador e o bloco de cabeçalhos, fica o corpo
+ENCAMINHADA = re.compile(
+    r"^(-{2,} ?(forwarded message|mensagem encaminhada) ?-{2,}|"
+    r"in[ií]cio da mensagem encaminhada:?|begin forwarded message:?)$",
+    re.IGNORECASE)
+CABECALHO = re.compile(
+    r"^(from|de|to|para|cc|cco|bcc|date|data|sent|enviad[oa]|reply-to|responder a)\s*:",
+    re.IGNORECASE)
+ASSUNTO = re.compile(r"^(subject|assunto)\s*:\s*", re.IGNORECASE)
+# Assinatura ("-- " ou despedida) e avisos legais: cortam o restante do email
+ASSINATURA = re.compile(
+    r"^(--\s*|_{5,}|atenciosamente|att\.?|abraços?|cordialmente|saudações|"
+    r"best regards|kind regards|regards)[,.!]?$",
+    re.IGNORECASE)
+AVISO = re.compile(
+    r"^(aviso( legal)?:|disclaimer:|confidencial(idade)?:|enviado do meu|sent from my|"
+    r"(esta|essa) (mensagem|e-?mail).{0,120}(confidencial|destinatário)|"
+    r"this (e-?mail|message).{0,120}(confidential|intended))",
+    re.IGNORECASE)
+
+
+def normalizar_espacos(texto: str) -> str:
+    """Qualquer sequência de espaços/quebras vira um espaço; sem bordas."""
+    return ESPACOS.sub(" ", texto or "").strip()
+
+
+# ==============================
+# EMAIL RECEBIDO
+# ==============================
+def limpar_email(texto: str) -> str:
+    """
+    Remove o que não é a mensagem em si — respostas citadas (linhas com '>'
+    e o histórico após "Em ..., Fulano escreveu:"), cabeçalhos de mensagens
+    encaminhadas (o assunto é mantido), assinaturas e avisos legais — e
+    normaliza os espaços.
+    Uma passada pelas linhas; os cortes só valem se sobrar algum texto antes.
+    Se tudo for removido, devolve o texto original normalizado.
+    """
+    mantidas = []
+    em_cabecalho = True  # cabeçalhos do topo ou logo após um encaminhamento
+    for linha in texto.splitlines():
+        linha = linha.strip()
+        if not linha:
+            continue
+        if em_cabecalho and CABECALHO.match(linha):
+            continue
+        if em_cabecalho and ASSUNTO.match(linha):
+            mantidas.append(ASSUNTO.sub("", linha))  # o assunto ajuda a classificar
+            continue
+        if ENCAMINHADA.match(linha):
+            em_cabecalho = True
+            continue
+        em_cabecalho = False
+        if linha.startswith(">"):
+            continue
+        if mantidas and (INICIO_CITACAO.match(linha) or ASSINATURA.match(linha)
+                         or AVISO.match(linha)):
+            break
+        mantidas.append(linha)
+
+    return normalizar_espacos(" ".join(mantidas) or texto)
+
+
+# ==============================
+# SAÍDA DO MODELO DE CHAT
+# ==============================
+def limpar_raciocinio(texto: str) -> str:
+    """Remove as frases de raciocínio (até o fim de cada linha) e as bordas."""
+    return RACIOCINIO_ATE_FIM_DA_LINHA.sub("", texto).strip()
+
+
+def extrair_resposta(texto: str) -> str:
+    """
+    Só a mensagem final pronta para envio:
+      1) a partir do primeiro cumprimento ("Prezado", "Olá"...), se houver
+         texto depois dele
+      2) senão, o último parágrafo (separado por linha em branco)
+      3) senão, todo o texto limpo
+    """
+    # Uma passada remove o raciocínio; a busca do cumprimento para no primeiro
+    limpo = RACIOCINIO_ATE_FIM_DA_LINHA.sub("", texto)
+    match = SAUDACAO.search(limpo)
+    if match:
+        resposta = limpo[match.start():].strip()
+        if len(resposta) > len(match.group(0)):
+            return resposta
+
+    partes = limpo.strip().split("\n\n")
+    if len(partes) > 1:
+        return partes[-1].strip()
+    return limpo.strip()
+
+
+class FiltroRespostaIncremental:
+    """
+    Versão incremental de extrair_resposta para o modo streaming.
+    Recebe os pedaços do modelo e devolve só o texto que já é seguro mostrar:
+      - nada até aparecer um cumprimento ("Prezado", "Olá"...)
+      - a linha é cortada na primeira frase de raciocínio, como em limpar_raciocinio;
+        dos últimos MAIOR_PADRAO caracteres da linha atual nada sai até
+        chegar mais texto, porque uma frase pode estar começando ali
+    Cada pedaço é examinado uma vez (mais a pequena cauda retida), então o
+    custo total é linear no tamanho da saída.
+    O texto definitivo continua sendo o de finalizar() (= extrair_resposta
+    da saída completa); quem mostra os pedaços deve substituí-los por ele.
+    """
+
+    def __init__(self):
+        self._bruto = []
+        self._cauda = ""           # fim da linha atual ainda não liberado
+        self._cortada = False      # linha atual já teve raciocínio: ignora até o "\n"
+        self._busca = ""           # antes do cumprimento: final do texto já liberado
+        self._achou_inicio = False
+        self._mostrado = []        # tudo o que adicionar() já devolveu
+
+    @property
+    def mostrado(self) -> str:
+        return "".join(self._mostrado)
+
+    def _liberar(self, seguro: str) -> str:
+        """Texto limpo e definitivo da linha → parte que deve ser mostrada."""
+        if self._achou_inicio:
+            return seguro
+        texto = self._busca + seguro
+        match = SAUDACAO.search(texto)
+        if not match:
+            self._busca = texto[-MAIOR_PADRAO:]
+            return ""
+        self._achou_inicio = True
+        self._busca = ""
+        return texto[match.start():]
+
+    def adicionar(self, pedaco: str) -> str:
+        """Acrescenta um pedaço da saída; devolve o texto novo a mostrar ('' se nenhum)."""
+        self._bruto.append(pedaco)
+        novo = []
+        segmentos = pedaco.split("\n")
+        for indice, segmento in enumerate(segmentos):
+            fim_de_linha = indice < len(segmentos) - 1
+            if not self._cortada:
+                self._cauda += segmento
+                match = RACIOCINIO.search(self._cauda)
+                if match:
+                    seguro, self._cauda, self._cortada = self._cauda[:match.start()], "", True
+                elif fim_de_linha:
+                    seguro, self._cauda = self._cauda, ""
+                else:
+                    corte = max(len(self._cauda) - MAIOR_PADRAO, 0)
+                    seguro, self._cauda = self._cauda[:corte], self._cauda[corte:]
+                novo.append(self._liberar(seguro))
+            if fim_de_linha:
+                novo.append(self._liberar("\n"))
+                self._cauda, self._cortada = "", False
+
+        texto = "".join(novo)
+        if texto:
+            self._mostrado.append(texto)
+        return texto
+
+    def finalizar(self) -> str:
+        """Resposta definitiva (mesmo resultado do modo sem streaming)."""
+        return extrair_resposta("".join(self._bruto).strip())
+
+    def restante(self, final: str) -> str:
+        """O que falta mostrar de `final`, se ele continua o que já foi mostrado."""
+        mostrado = self.mostrado
+        return final[len(mostrado):] if final.startswith(mostrado) else ""
@@ -0,0 +1,182 @@
+"""
+Leitura dos arquivos enviados pelo formulário (.txt e .pdf) sem carregar o
+upload inteiro (até MAX_CONTENT_LENGTH) em memória:
+  - o tipo é conferido pelos primeiros bytes (assinatura) antes de qualquer
+    leitura completa; extensão e conteúdo precisam bater
+  - .txt: só os primeiros UPLOAD_TXT_MAX_BYTES, decodificados em blocos como
+    UTF-8 (ou UTF-16 sem BOM, reconhecido pelos bytes nulos alternados); se
+    não for UTF-8, o charset-normalizer detecta a codificação
+  - .pdf: o stream vai direto para extract_text_from_pdf, que mapeia em
+    memória (mmap) os arquivos grandes já em disco
+O Werkzeug guarda uploads acima de 500 KB num arquivo temporário, então o
+stream é sempre posicionável.
+Autor: Micaías Viola
+Data: 2025-10-11
+"""
+import codecs
+import io
+import logging
+import os
+
+from charset_normalizer import from_bytes
+
+from utils import metricas
+from utils.email_processor import extract_text_from_pdf
+from utils.preprocessamento import PREPROC_MAX_CARACTERES
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONFIGURAÇÕES
+# ==============================
+# O pré-processamento corta em PREPROC_MAX_CARACTERES; 4 bytes por caractere
+# cobre qualquer texto UTF-8
+UPLOAD_TXT_MAX_BYTES = int(os.getenv("UPLOAD_TXT_MAX_BYTES", 4 * PREPROC_MAX_CARACTERES))
+TAMANHO_BLOCO = 64 * 1024
+TAMANHO_AMOSTRA = 4096       # bytes examinados para identificar o tipo
+
+EXTENSOES = {".txt": "texto", ".pdf": "pdf"}
+
+# Assinaturas de formatos binários comuns enviados por engano
+ASSINATURAS_BINARIAS = (
+    b"PK\x03\x04",          # zip, docx, xlsx
+    b"\xd0\xcf\x11\xe0",    # doc, xls, msg (OLE)
+    b"\x89PNG", b"\xff\xd8\xff", b"GIF8", b"RIFF",
+    b"\x1f\x8b", b"Rar!", b"7z\xbc\xaf",
+    b"MZ", b"\x7fELF",
+)
+_BOMS_TEXTO = (codecs.BOM_UTF8, codecs.BOM_UTF32_LE, codecs.BOM_UTF32_BE,
+               codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)
+# UTF-16 sem BOM: texto latino tem o byte alto nulo em quase todo caractere
+UTF16_MIN_NULOS = 0.5        # fração de nulos nas posições do byte alto
+UTF16_MAX_NULOS = 0.05       # fração de nulos nas posições do byte baixo
+# Caracteres de controle que não aparecem em texto (tab, quebras e ESC aparecem)
+_CONTROLE = bytes(b for b in range(32) if b not in (9, 10, 12, 13, 27))
+LIMITE_CONTROLE = 0.05       # fração da amostra
+# Em textos em português o charset-normalizer empata cp1252 com outras
+# páginas de código de um byte (cp1250, cp1258...) e troca "ã" por "ă";
+# nesses casos fica o cp1252, padrão do Windows em pt-BR
+CODIFICACAO_PREFERIDA = "cp1252"
+
+
+# ==============================
+# IDENTIFICAÇÃO DO TIPO
+# ==============================
+def parece_pdf(amostra: bytes) -> bool:
+    """Cabeçalho %PDF- nos primeiros 1024 bytes (a especificação admite lixo antes dele)."""
+    return b"%PDF-" in amostra[:1024]
+
+
+def codificacao_utf16(amostra: bytes):
+    """'utf-16-le' ou 'utf-16-be' se a amostra for UTF-16 sem BOM, senão None."""
+    pares, impares = amostra[0::2], amostra[1::2]
+    if not impares or amostra.startswith(_BOMS_TEXTO):
+        return None
+    nulos_pares = pares.count(0) / len(pares)
+    nulos_impares = impares.count(0) / len(impares)
+    if nulos_impares >= UTF16_MIN_NULOS and nulos_pares <= UTF16_MAX_NULOS:
+        codificacao = "utf-16-le"
+    elif nulos_pares >= UTF16_MIN_NULOS and nulos_impares <= UTF16_MAX_NULOS:
+        codificacao = "utf-16-be"
+    else:
+        return None
+    # Nulos alternados também aparecem em binários: o texto decodificado
+    # precisa ter tão poucos caracteres de controle quanto um .txt comum
+    texto = amostra[:len(amostra) // 2 * 2].decode(codificacao, errors="replace")
+    controle = sum(1 for c in texto if ord(c) < 32 and c not in "\t\n\x0c\r\x1b")
+    return codificacao if controle / len(texto) <= LIMITE_CONTROLE else None
+
+
+def farejar_tipo(amostra: bytes) -> str:
+    """
+    'pdf', 'texto' ou 'binario' a partir dos primeiros bytes do arquivo.
+    Só é 'pdf' com a assinatura no início: um texto que cita "%PDF-" continua texto.
+    """
+    if amostra.startswith(b"%PDF-"):
+        return "pdf"
+    if amostra.startswith(_BOMS_TEXTO) or codificacao_utf16(amostra):
+        return "texto"
+    if amostra.startswith(ASSINATURAS_BINARIAS) or b"\x00" in amostra:
+        return "binario"
+    controle = len(amostra) - len(amostra.translate(None, _CONTROLE))
+    if amostra and controle / len(amostra) > LIMITE_CONTROLE:
+        return "binario"
+    return "texto"
+
+
+def _recusar(motivo: str, mensagem: str):
+    metricas.uploads_recusados.inc(reason=motivo)
+    raise ValueError(mensagem)
+
+
+# ==============================
+# LEITURA
+# ==============================
+def _decodificar_detectando(dados: bytes) -> str:
+    """Texto em codificação desconhecida (latin-1, cp1252, UTF-16...)."""
+    melhor = from_bytes(dados).best()
+    if melhor is None:
+        _recusar("encoding", "Não foi possível identificar a codificação do arquivo .txt.")
+    if melhor.language == "Portuguese" and not melhor.encoding.startswith("utf"):
+        try:
+            texto = dados.decode(CODIFICACAO_PREFERIDA)
+            logger.info("Arquivo .txt em %s", CODIFICACAO_PREFERIDA)
+            return texto
+        except UnicodeDecodeError:
+            pass
+    logger.info("Arquivo .txt em %s", melhor.encoding)
+    return str(melhor)
+
+
+def ler_texto_limitado(stream, limite: int = UPLOAD_TXT_MAX_BYTES,
+                       codificacao: str = "utf-8-sig") -> str:
+    """
+    Lê no máximo `limite` bytes do stream (posicionável) em blocos,
+    decodificando cada um em `codificacao` (UTF-8 por padrão) conforme chega.
+    No primeiro bloco que não decodificar volta ao início e detecta a
+    codificação do trecho. Um caractere cortado no limite é descartado.
+    """
+    decodificador = codecs.getincrementaldecoder(codificacao)()
+    partes = []
+    lidos = 0
+    try:
+        while lidos < limite:
+            bloco = stream.read(min(TAMANHO_BLOCO, limite - lidos))
+            if not bloco:
+                partes.append(decodificador.decode(b"", final=True))
+                break
+            lidos += len(bloco)
+            partes.append(decodificador.decode(bloco))
+    except UnicodeDecodeError:
+        stream.seek(0)
+        return _decodificar_detectando(stream.read(limite))
+
+    if lidos >= limite:
+        logger.info("Arquivo .txt maior que %d bytes: lido só o início", limite)
+    return "".join(partes)
+
+
+def ler_upload(arquivo) -> str:
+    """
+    Texto de um upload (FileStorage do Werkzeug), .txt ou .pdf.
+    Lança ValueError com mensagem amigável se a extensão não for aceita ou
+    se o conteúdo não corresponder a ela (ex.: .docx renomeado para .txt).
+    """
+    nome = (arquivo.filename or "").lower()
+    extensao = os.path.splitext(nome)[1]
+    esperado = EXTENSOES.get(extensao)
+    if esperado is None:
+        _recusar("extension", "Formato não suportado. Envie .txt ou .pdf.")
+
+    stream = arquivo.stream
+    amostra = stream.read(TAMANHO_AMOSTRA)
+    stream.seek(0, io.SEEK_SET)
+    # .pdf aceita o cabeçalho após lixo inicial; .txt só é PDF com %PDF- no início
+    tipo = "pdf" if esperado == "pdf" and parece_pdf(amostra) else farejar_tipo(amostra)
+    if tipo != esperado:
+        logger.warning("Upload %s com conteúdo do tipo '%s' → recusado", extensao, tipo)
+        _recusar("content", f"O conteúdo do arquivo não é um {extensao} válido.")
+
+    if esperado == "pdf":
+        return extract_text_from_pdf(arquivo)
+    return ler_texto_limitado(stream, codificacao=codificacao_utf16(amostra) or "utf-8-sig")
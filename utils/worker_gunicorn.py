@@ -0,0 +1,52 @@
+"""
+Worker gthread do gunicorn com reciclagem sem perda de conexões.
+No gthread padrão, ao atingir max_requests o worker sai do loop na hora e
+fecha as conexões já aceitas que ainda não mandaram a requisição (o cliente
+recebe a conexão fechada sem resposta). Aqui, ao atingir o limite, o worker:
+  1. para de aceitar conexões (os outros workers atendem as novas)
+  2. responde com Connection: close e fecha as keep-alive ociosas
+  3. sai quando não restar conexão aberta (ou após graceful_timeout)
+Usado pelo perfil gthread de gunicorn.conf.py.
+Autor: Micaías Viola
+Data: 2025-10-12
+"""
+import sys
+import time
+
+from gunicorn.workers.gthread import ThreadWorker
+
+
+class ThreadWorkerGracioso(ThreadWorker):
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # O limite (já com jitter) passa a ser controlado aqui
+        self.limite_requisicoes = self.max_requests
+        self.max_requests = sys.maxsize
+        self._drenando_desde = None
+
+    def handle_request(self, req, conn):
+        if self._drenando_desde is None and self.nr + 1 >= self.limite_requisicoes:
+            self._iniciar_drenagem()
+        return super().handle_request(req, conn)
+
+    def _iniciar_drenagem(self):
+        self.log.info("Reciclando após %d requisições: sem novas conexões", self.nr + 1)
+        self._drenando_desde = time.monotonic()
+        self.max_keepalived = 0  # toda resposta daqui em diante fecha a conexão
+        with self._lock:
+            for sock in self.sockets:
+                try:
+                    self.poller.unregister(sock)
+                except (KeyError, ValueError):
+                    pass
+            for conn in self._keep:
+                conn.timeout = 0  # murder_keepalived fecha as ociosas na próxima volta
+
+    def murder_keepalived(self):
+        super().murder_keepalived()
+        if self._drenando_desde is None:
+            return
+        esgotado = time.monotonic() - self._drenando_desde > self.cfg.graceful_timeout
+        if self.nr_conns <= 0 or esgotado:
+            self.alive = False